@@ -67,6 +67,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Importação grava notícias e eventos do log em threads separadas:
+        # IMMEDIATE pega o lock de escrita no início da transação (espera até
+        # `timeout` em vez de falhar com "database is locked" no upgrade).
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -104,6 +111,52 @@ USE_L10N = True
 
 STATIC_URL = 'static/'
 
+# Importações (scraper)
+
+# Orçamento de coleta do processo, somando todas as importações em andamento
+# (importacoes/politeness.py): quem passar do limite espera a vez.
+IMPORTS_MAX_IN_FLIGHT = 32          # requisições simultâneas no processo
+IMPORTS_PER_HOST_CONNECTIONS = 4    # requisições simultâneas por host
+IMPORTS_HOST_RATE = 4.0             # requisições/s por host (token bucket; None = sem limite)
+IMPORTS_HOST_BURST = 8              # rajada permitida acima da taxa
+
+# Engine de download dos artigos: "threads" (ThreadPoolExecutor) ou "async"
+# (asyncio + aiohttp, um event loop por processo compartilhado entre imports).
+IMPORTS_ENGINE = "threads"
+IMPORTS_ASYNC_PER_JOB = 64          # downloads simultâneos por importação
+
+# GET condicional (ETag/Last-Modified) da homepage e das seções entre execuções.
+IMPORTS_CONDITIONAL_GET = True
+
+# Fila entre a listagem e os artigos (URLs em memória; cheia = a listagem espera).
+IMPORTS_LINK_QUEUE_SIZE = 500
+
+# Processos para parse lxml + XPaths dos artigos (0 = extrai na própria thread).
+IMPORTS_EXTRACTION_PROCESSES = 0
+
+# Worker de importações (`python manage.py import_worker`): o web só enfileira.
+IMPORTS_WORKER_CONCURRENCY = 2      # importações simultâneas por processo worker
+IMPORTS_WORKER_POLL_SECONDS = 5     # intervalo de consulta da fila quando vazia
+IMPORTS_SCHEDULER_REFRESH_SECONDS = 1.0  # leitura de configs criadas/editadas (cursor em updated_at)
+IMPORTS_REAP_SECONDS = 60           # varredura de jobs travados/configs presas
+IMPORTS_LEASE_SECONDS = 120         # lease de um job em execução (heartbeat a cada 1/3)
+
+# Intervalo adaptativo (ImportConfig.adaptive_interval; limites mín./máx. na config):
+# o intervalo mira em ~N notícias novas por execução, pelo ritmo observado.
+IMPORTS_ADAPTIVE_TARGET_NEW = 3     # notícias novas esperadas por execução
+IMPORTS_ADAPTIVE_HISTORY = 8        # jobs completos considerados
+IMPORTS_ADAPTIVE_WINDOW_HOURS = 24  # janela de published_at das notícias do veículo
+
+# Orçamento de tempo de uma importação (relógio de parede). Estourou: as etapas
+# param de começar trabalho novo e o job termina com os resultados parciais.
+IMPORTS_JOB_MAX_SECONDS = 900
+IMPORTS_STAGE_MAX_SECONDS = {"homepage": 60, "listing": 240}  # "articles": resto do job
+
+# Dashboard: segundos que um resultado (granularidade, de, até) fica em cache.
+# Importações com notícias novas invalidam antes (versão no banco, vale para o
+# import_worker). Cache local por processo: cada processo web guarda sua cópia.
+DASHBOARD_CACHE_SECONDS = 300
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,108 @@
+# dashboard/management/commands/bench_dashboard.py
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import Coalesce, TruncDate, TruncDay, TruncMonth, TruncYear
+from django.utils import timezone
+
+from dashboard.stats import build_stats, dashboard_stats, fold_rows, invalidate_cache, rollup_rows
+from noticias.models import News
+from noticias.rollup import rebuild
+from veiculos.models import Vehicle
+
+TRUNCS = {"day": TruncDay, "month": TruncMonth, "year": TruncYear}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark do dashboard numa tabela News sintética (padrão: 5M linhas): 3 GROUP BY x passada única "
+        "x rollup x cache. Tudo roda numa transação desfeita no final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5_000_000)
+        parser.add_argument("--vehicles", type=int, default=50)
+        parser.add_argument("--days", type=int, default=730, help="espalha as notícias pelos últimos N dias")
+
+    # --- dados sintéticos ----------------------------------------------------
+    def _populate(self, rows: int, n_vehicles: int, days: int):
+        types = [c for c, _ in Vehicle._meta.get_field("media_type").choices]
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(name=f"bench-{i}", media_type=types[i % len(types)], url=f"https://bench-{i}.local/")
+            for i in range(n_vehicles)
+        ])
+        vids = [v.pk for v in vehicles]
+        now = timezone.now()
+        adapt = connection.ops.adapt_datetimefield_value
+        table = connection.ops.quote_name(News._meta.db_table)
+        sql = (
+            f"INSERT INTO {table} (vehicle_id, url, title, subtitle, author, published_at, captured_at, content) "
+            "VALUES (%s, %s, %s, '', '', %s, %s, '')"
+        )
+        rnd = random.Random(42)
+        chunk = 20_000
+        with connection.cursor() as cur:
+            for start in range(0, rows, chunk):
+                batch = []
+                for i in range(start, min(rows, start + chunk)):
+                    captured = now - timedelta(seconds=rnd.randrange(days * 86400))
+                    published = None if i % 10 == 0 else captured - timedelta(hours=rnd.randrange(48))
+                    batch.append((vids[i % len(vids)], f"https://bench.local/n/{i}", f"Notícia {i}", adapt(published), adapt(captured)))
+                cur.executemany(sql, batch)
+        return now - timedelta(days=days), now
+
+    # --- variantes -----------------------------------------------------------
+    def _three_group_bys(self, g, dfrom, dto):
+        """Como o dashboard fazia: série, ranking e tipos em 3 consultas sobre News."""
+        qs = News.objects.filter(captured_at__range=(dfrom, dto))
+        list(qs.annotate(period=TRUNCS[g](Coalesce("published_at", "captured_at"))).values("period").annotate(total=Count("id")).order_by("period"))
+        list(qs.values("vehicle__name").annotate(total=Count("id")).order_by("-total")[:8])
+        list(qs.values("vehicle__media_type").annotate(total=Count("id")).order_by("-total"))
+
+    def _single_pass_news(self, g, dfrom, dto):
+        """Um GROUP BY (dia, veículo, tipo) sobre News e uma passada em memória."""
+        rows = (
+            News.objects.filter(captured_at__range=(dfrom, dto))
+            .annotate(day=TruncDate(Coalesce("published_at", "captured_at"), tzinfo=timezone.get_current_timezone()))
+            .values_list("day", "vehicle_id", "vehicle__media_type")
+            .annotate(total=Count("id"))
+            .order_by()
+        )
+        build_stats(fold_rows(rows.iterator(), g), g)
+
+    def _single_pass_rollup(self, g, dfrom, dto):
+        start, end = timezone.localdate(dfrom), timezone.localdate(dto)
+        build_stats(fold_rows(rollup_rows(start, end), g), g)
+
+    def _timed(self, label, fn):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        self.stdout.write(f"  {label:44s} {dt * 1000:10.1f} ms")
+        return dt
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            t0 = time.perf_counter()
+            dfrom, dto = self._populate(opts["rows"], opts["vehicles"], opts["days"])
+            self.stdout.write(f"{opts['rows']} notícias sintéticas em {time.perf_counter() - t0:.1f}s")
+            self._timed("rollup: rebuild completo", rebuild)
+
+            ranges = {"day": dto - timedelta(days=6), "month": dto - timedelta(days=150), "year": dfrom}
+            for g, start in ranges.items():
+                self.stdout.write(f"g={g} ({(dto - start).days + 1} dias)")
+                self._timed("News: 3 GROUP BY (antes)", lambda: self._three_group_bys(g, start, dto))
+                self._timed("News: 1 GROUP BY + passada única", lambda: self._single_pass_news(g, start, dto))
+                self._timed("rollup: passada única", lambda: self._single_pass_rollup(g, start, dto))
+                invalidate_cache()
+                s, e = timezone.localdate(start), timezone.localdate(dto)
+                self._timed("dashboard_stats (cache frio)", lambda: dashboard_stats(g, s, e))
+                self._timed("dashboard_stats (cache quente)", lambda: dashboard_stats(g, s, e))
+
+            transaction.set_rollback(True)
+        invalidate_cache()
+        self.stdout.write("Dados sintéticos descartados (rollback).")
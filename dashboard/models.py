@@ -1,3 +1,13 @@
 from django.db import models
 
-# Create your models here.
+
+class StatsVersion(models.Model):
+    """
+    Versão do cache do dashboard (linha única). Fica no banco porque as
+    importações rodam em outro processo (import_worker) e o cache padrão
+    (LocMemCache) é por processo.
+    """
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"v{self.version}"
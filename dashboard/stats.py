@@ -0,0 +1,103 @@
+# dashboard/stats.py
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum
+
+from noticias.models import DailyNewsCount
+from veiculos.models import Vehicle
+
+from .models import StatsVersion
+
+TOP_N = 8
+
+
+# =============================================================================
+# Agregação do dashboard
+#   - Uma passada só sobre as linhas (dia, veículo, tipo, total) preenche a
+#     série, o ranking e a divisão por tipo (antes: 3 GROUP BY no mesmo range).
+#   - Resultado em cache por (granularidade, de, até). A chave leva uma versão
+#     que `invalidate_cache()` incrementa quando uma importação grava notícias.
+#     A versão fica no banco (StatsVersion, 1 linha): o import_worker é outro
+#     processo e não enxerga o cache local do servidor web.
+# =============================================================================
+
+CACHE_VERSION_PK = 1
+
+GRANULARITY_FORMATS = {"day": "%d/%m", "month": "%m/%Y", "year": "%Y"}
+
+
+def _period(day, g: str):
+    if g == "month":
+        return day.replace(day=1)
+    if g == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def fold_rows(rows, g: str) -> dict:
+    """Uma passada por `rows` = (day, vehicle_id, media_type, total): série, ranking e tipos."""
+    series: dict = defaultdict(int)
+    by_vehicle: Counter = Counter()
+    by_type: Counter = Counter()
+    for day, vehicle_id, media_type, total in rows:
+        if not total or day is None:
+            continue
+        series[_period(day, g)] += total
+        by_vehicle[vehicle_id] += total
+        by_type[media_type] += total
+    return {"series": sorted(series.items()), "vehicles": by_vehicle, "types": by_type}
+
+
+def rollup_rows(start, end):
+    """Linhas do rollup no intervalo de dias [start, end]."""
+    return (
+        DailyNewsCount.objects
+        .filter(day__range=(start, end))
+        .values_list("day", "vehicle_id", "media_type", "total")
+        .iterator(chunk_size=5000)
+    )
+
+
+def build_stats(folded: dict, g: str) -> dict:
+    """Formata o resultado de `fold_rows` para o template (rótulos e listas do Chart.js)."""
+    fmt = GRANULARITY_FORMATS[g]
+    series_labels = [p.strftime(fmt) for p, _ in folded["series"]]
+    series_data = [int(n) for _, n in folded["series"]]
+
+    top = folded["vehicles"].most_common(TOP_N)
+    names = dict(Vehicle.objects.filter(pk__in=[vid for vid, _ in top]).values_list("id", "name"))
+    media_map = dict(Vehicle._meta.get_field("media_type").choices)
+    types = folded["types"].most_common()
+
+    return {
+        "series_labels": series_labels, "series_data": series_data,
+        "rank_labels": [names.get(vid, "—") for vid, _ in top], "rank_data": [int(n) for _, n in top],
+        "type_labels": [media_map.get(t, t or "—") for t, _ in types], "type_data": [int(n) for _, n in types],
+        "total_interval": int(sum(series_data)),
+    }
+
+
+def _cache_version() -> int:
+    version = StatsVersion.objects.filter(pk=CACHE_VERSION_PK).values_list("version", flat=True).first()
+    return version or 0
+
+
+def invalidate_cache() -> None:
+    """Descarta todos os resultados em cache (chamado quando uma importação grava notícias)."""
+    if not StatsVersion.objects.filter(pk=CACHE_VERSION_PK).update(version=F("version") + 1):
+        StatsVersion.objects.get_or_create(pk=CACHE_VERSION_PK, defaults={"version": 1})
+
+
+def dashboard_stats(g: str, start, end) -> dict:
+    """Estatísticas do período (dias locais `start`..`end`), com cache por (g, start, end)."""
+    key = f"dashboard:v{_cache_version()}:{g}:{start.isoformat()}:{end.isoformat()}"
+    stats = cache.get(key)
+    if stats is None:
+        stats = build_stats(fold_rows(rollup_rows(start, end), g), g)
+        stats["total_news"] = DailyNewsCount.objects.aggregate(n=Sum("total"))["n"] or 0
+        cache.set(key, stats, getattr(settings, "DASHBOARD_CACHE_SECONDS", 300))
+    return stats
@@ -1,3 +1,69 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from noticias.models import News
+from noticias.rollup import rebuild
+from veiculos.models import Vehicle
+
+from .stats import invalidate_cache
+
+
+class DashboardQueryTests(TestCase):
+    """O painel lê só o rollup diário: queries independentes do volume de notícias."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _add(self, vehicles, per_vehicle):
+        now = timezone.now()
+        for i in range(vehicles):
+            v = Vehicle.objects.create(name=f"V{Vehicle.objects.count()}", media_type="site", url=f"https://{i}.example/")
+            News.objects.bulk_create([
+                News(vehicle=v, url=f"https://{i}.example/{n}", title="t", content="x" * 1000,
+                     published_at=now - timedelta(days=n % 7))
+                for n in range(per_vehicle)
+            ])
+        rebuild()
+
+    def _get(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp, ctx.captured_queries
+
+    def test_constant_queries(self):
+        self._add(1, 5)
+        _, small = self._get(reverse("dashboard:index"))
+        self._add(12, 80)
+        _, large = self._get(reverse("dashboard:index"))
+        self.assertEqual(len(small), len(large))
+        for q in large:
+            self.assertNotIn('"noticias_news"', q["sql"])
+
+    def test_cached(self):
+        self._add(2, 10)
+        self.client.get(reverse("dashboard:index"))
+        with CaptureQueriesContext(connection) as ctx:
+            for g in ("day", "day"):
+                self.client.get(reverse("dashboard:index") + f"?g={g}")
+        # com cache: só a versão (banco) e a contagem de veículos por requisição
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+
+    def test_invalidation_from_other_process(self):
+        # o import_worker tem o próprio cache local: a versão precisa vir do banco
+        self._add(1, 5)
+        url = reverse("dashboard:index")
+        self.assertEqual(self.client.get(url).context["total_news"], 5)
+        self._add(1, 3)
+        self.assertEqual(self.client.get(url).context["total_news"], 5)  # ainda em cache
+        worker_cache = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "worker"}}
+        with override_settings(CACHES=worker_cache):
+            invalidate_cache()
+        self.assertEqual(self.client.get(url).context["total_news"], 8)
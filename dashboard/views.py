@@ -2,15 +2,12 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
-from django.db.models import Count
-from django.db.models.functions import TruncDay, TruncMonth, TruncYear, Coalesce
 from django.utils import timezone
 from django.views.generic import TemplateView
 
-from noticias.models import News
 from veiculos.models import Vehicle
+from .stats import dashboard_stats
 
-TOP_N = 8
 MAX_DAYS = 365 * 2  # limite de 2 anos por requisição
 
 class DashboardView(TemplateView):
@@ -58,66 +55,13 @@ class DashboardView(TemplateView):
         if (dto - dfrom).days > MAX_DAYS:
             dfrom = dto - timedelta(days=MAX_DAYS)
 
-        # define função de trunc conforme granularidade
-        if g == "day":
-            trunc, fmt = TruncDay, "%d/%m"
-        elif g == "month":
-            trunc, fmt = TruncMonth, "%m/%Y"
-        else:
-            trunc, fmt = TruncYear, "%Y"
-
-        # campo de data para agregação: published_at OU captured_at
-        dt_field = Coalesce("published_at", "captured_at")
-
-        # --- Série temporal
-        qs_series = (
-            News.objects
-            .filter(captured_at__range=(dfrom, dto))
-            .annotate(period=trunc(dt_field))
-            .values("period")
-            .annotate(total=Count("id"))
-            .order_by("period")
-        )
-
-        series_labels, series_data = [], []
-        for row in qs_series:
-            if row["period"]:
-                series_labels.append(row["period"].strftime(fmt))
-                series_data.append(int(row["total"]))
-
-        total_interval = int(sum(series_data))
-
-        # --- Ranking (top N)
-        qs_top = (
-            News.objects
-            .filter(captured_at__range=(dfrom, dto))
-            .values("vehicle__name")
-            .annotate(total=Count("id"))
-            .order_by("-total")[:TOP_N]
-        )
-        rank_labels = [r["vehicle__name"] for r in qs_top]
-        rank_data   = [int(r["total"]) for r in qs_top]
-
-        # --- Por tipo de veículo
-        media_map = dict(Vehicle._meta.get_field("media_type").choices)
-        qs_types = (
-            News.objects
-            .filter(captured_at__range=(dfrom, dto))
-            .values("vehicle__media_type")
-            .annotate(total=Count("id"))
-            .order_by("-total")
-        )
-        type_labels = [media_map.get(r["vehicle__media_type"], r["vehicle__media_type"] or "—") for r in qs_types]
-        type_data   = [int(r["total"]) for r in qs_types]
+        # série, ranking e tipos numa passada só pelo rollup diário (com cache)
+        stats = dashboard_stats(g, timezone.localdate(dfrom), timezone.localdate(dto))
 
         ctx.update({
             "granularity": g,
             "start": dfrom, "end": dto,
-            "series_labels": series_labels, "series_data": series_data,
-            "rank_labels": rank_labels,     "rank_data": rank_data,
-            "type_labels": type_labels,     "type_data": type_data,
-            "total_interval": total_interval,
-            "total_news": News.objects.count(),
+            **stats,
             "total_vehicles": Vehicle.objects.count(),
         })
         return ctx
@@ -0,0 +1,68 @@
+# importacoes/adaptive.py
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from noticias.models import News
+
+from .models import ImportConfig, ImportJob, ImportStatus
+
+
+# =============================================================================
+# Intervalo adaptativo (ImportConfig.adaptive_interval)
+#   - Ritmo observado (notícias novas por minuto) = o maior entre:
+#       * histórico dos jobs completos: new_count das últimas execuções dividido
+#         pelo tempo entre elas (IMPORTS_ADAPTIVE_HISTORY execuções);
+#       * datas de publicação: News do veículo com published_at nas últimas
+#         IMPORTS_ADAPTIVE_WINDOW_HOURS horas.
+#   - Intervalo ideal = tempo para surgirem IMPORTS_ADAPTIVE_TARGET_NEW notícias
+#     novas. O passo é suavizado (no máximo metade/dobro do intervalo atual) e
+#     limitado a [min_interval_minutes, max_interval_minutes] da config.
+#   - Execução "saturada" (todas as URLs encontradas eram novas) pode ter
+#     perdido notícias que saíram da listagem: o intervalo cai pela metade
+#     (menos na primeira execução, em que tudo é novo).
+#   - Só jobs completos ajustam o intervalo (parciais subestimam o ritmo).
+# =============================================================================
+
+def _completed_before(config: ImportConfig, started_at):
+    return ImportJob.objects.filter(config=config, status=ImportStatus.DONE, stop_reason="", started_at__lt=started_at)
+
+
+def observed_rate(config: ImportConfig, started_at, new_count: int, now=None) -> float:
+    """Notícias novas por minuto: o maior ritmo entre o histórico de jobs e as publicações."""
+    now = now or timezone.now()
+    history = max(2, getattr(settings, "IMPORTS_ADAPTIVE_HISTORY", 8))
+    runs = [(started_at, new_count)] + list(
+        _completed_before(config, started_at).order_by("-started_at").values_list("started_at", "new_count")[: history - 1]
+    )
+    rate_jobs = 0.0
+    if len(runs) >= 2:
+        # o new_count da execução mais antiga cobre o período anterior a ela: fica de fora
+        span = (runs[0][0] - runs[-1][0]).total_seconds() / 60
+        if span > 0:
+            rate_jobs = sum(n for _, n in runs[:-1]) / span
+
+    window_hours = getattr(settings, "IMPORTS_ADAPTIVE_WINDOW_HOURS", 24)
+    rate_pub = 0.0
+    if window_hours:
+        published = News.objects.filter(
+            vehicle_id=config.vehicle_id,
+            published_at__gt=now - timedelta(hours=window_hours), published_at__lte=now,
+        ).count()
+        rate_pub = published / (window_hours * 60)
+    return max(rate_jobs, rate_pub)
+
+
+def next_interval(config: ImportConfig, started_at, new_count: int, found_count: int, now=None) -> int:
+    """Novo intervalo (min) da config depois de uma execução completa."""
+    current = config.current_interval()
+    rate = observed_rate(config, started_at, new_count, now)
+    target = max(1, getattr(settings, "IMPORTS_ADAPTIVE_TARGET_NEW", 3))
+    ideal = target / rate if rate > 0 else float(config.max_interval_minutes or current)
+    interval = min(max(ideal, current / 2), current * 2)
+    if found_count and new_count >= found_count and _completed_before(config, started_at).exists():
+        interval = min(interval, current / 2)  # saturada: a listagem pode ter escondido notícias
+    return config.clamp_interval(interval)
@@ -0,0 +1,169 @@
+# importacoes/budget.py
+from __future__ import annotations
+
+import threading
+import time
+
+from django.db import close_old_connections, connection
+
+from .models import ImportJob, ImportStatus
+
+
+# =============================================================================
+# Orçamento de tempo e cancelamento de um job
+#   - Relógio de parede do job inteiro (IMPORTS_JOB_MAX_SECONDS) e de cada
+#     etapa (IMPORTS_STAGE_MAX_SECONDS: homepage, listing, articles).
+#   - Estourou (ou pediram cancelamento): as etapas param de começar trabalho
+#     novo — seções e artigos ainda não baixados são pulados — e o job termina
+#     normalmente com o que já foi coletado (resultados parciais gravados).
+#   - Downloads em voo não são interrompidos: o atraso máximo é o timeout de
+#     uma requisição, que também é encurtado para o tempo restante.
+#   - O cancelamento chega pelo banco (ImportJob.cancel_requested), consultado
+#     por uma thread própria a cada `poll_seconds`. A mesma thread para o job
+#     ("lease") se ele deixou de ser RUNNING (lease vencido: outro worker pode
+#     já estar rodando a importação); o heartbeat do worker faz o mesmo na hora
+#     em que a renovação falha (`cancel_running`).
+# =============================================================================
+
+class DeadlineExceeded(Exception):
+    """Trabalho pulado porque o job estourou o orçamento ou foi cancelado."""
+
+
+class Deadline:
+    def __init__(self, total_seconds: float | None = None, stage_seconds: dict | None = None):
+        now = time.monotonic()
+        self.started = now
+        self.job_deadline = now + total_seconds if total_seconds else None
+        self.stage_seconds = stage_seconds or {}
+        self.stage_name = ""
+        self.stage_deadline: float | None = None
+        self.hits: list[str] = []  # motivos de parada observados, em ordem
+        self._lock = threading.Lock()
+        self._canceled = threading.Event()
+        self._cancel_reason = "canceled"
+        self._watch_stop = threading.Event()
+        self._watcher: threading.Thread | None = None
+        self._job_id: int | None = None
+
+    # --- etapas -----------------------------------------------------------------
+    def stage(self, name: str) -> "Deadline":
+        """
+        Começa uma etapa com o seu orçamento. Estourar o prazo de uma etapa só
+        encerra aquela etapa; estourar o do job (ou cancelar) encerra todas.
+        """
+        self.stage_name = name
+        budget = self.stage_seconds.get(name)
+        self.stage_deadline = time.monotonic() + budget if budget else None
+        return self
+
+    def _limit(self) -> float | None:
+        limits = [d for d in (self.job_deadline, self.stage_deadline) if d is not None]
+        return min(limits) if limits else None
+
+    def remaining(self) -> float | None:
+        """Segundos até o prazo mais próximo (None = sem limite)."""
+        limit = self._limit()
+        return None if limit is None else max(0.0, limit - time.monotonic())
+
+    def timeout(self, default: float) -> float:
+        """Timeout de uma requisição: o padrão, encurtado para o tempo restante (mín. 1s)."""
+        left = self.remaining()
+        return default if left is None else max(1.0, min(default, left))
+
+    def _reason(self, stage: str | None = None) -> str:
+        if self._canceled.is_set():
+            return self._cancel_reason
+        now = time.monotonic()
+        if self.job_deadline is not None and now >= self.job_deadline:
+            return "budget"
+        if stage is not None and stage != self.stage_name:
+            return ""  # prazo de outra etapa não para esta
+        if self.stage_deadline is not None and now >= self.stage_deadline:
+            return f"stage:{self.stage_name}"
+        return ""
+
+    def expired(self, stage: str | None = None) -> bool:
+        """
+        True se o job foi cancelado ou estourou o prazo (do job ou da etapa atual).
+        Com `stage`, o prazo de etapa só conta se `stage` for a etapa atual —
+        para trabalho que atravessa etapas (artigos baixados durante a listagem).
+        """
+        reason = self._reason(stage)
+        if reason:
+            with self._lock:
+                if reason not in self.hits:
+                    self.hits.append(reason)
+        return bool(reason)
+
+    @property
+    def stop_reason(self) -> str:
+        """Por que o job parou antes do fim ('' se rodou inteiro); cancelamento/lease prevalece."""
+        if self._canceled.is_set() and self._cancel_reason in self.hits:
+            return self._cancel_reason
+        return self.hits[0] if self.hits else ""
+
+    @property
+    def canceled(self) -> bool:
+        return self._canceled.is_set()
+
+    def cancel(self, reason: str = "canceled"):
+        """Para o job: "canceled" (pedido do usuário) ou "lease" (o job não é mais deste worker)."""
+        with self._lock:
+            if not self._canceled.is_set():
+                self._cancel_reason = reason
+                self._canceled.set()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    # --- cancelamento pelo banco ------------------------------------------------
+    def watch(self, job_id: int, poll_seconds: float = 2.0) -> "Deadline":
+        """Inicia a thread que observa ImportJob.cancel_requested (e o status) deste job."""
+        def loop():
+            try:
+                while not self._watch_stop.wait(poll_seconds):
+                    close_old_connections()
+                    try:
+                        row = ImportJob.objects.filter(pk=job_id).values_list("status", "cancel_requested").first()
+                    except Exception:
+                        continue  # banco indisponível: tenta de novo no próximo ciclo
+                    if row is None or row[0] != ImportStatus.RUNNING:
+                        self.cancel("lease")  # lease vencido/reaper: o job foi tirado deste worker
+                        return
+                    if row[1]:
+                        self.cancel()
+                        return
+            finally:
+                connection.close()  # conexão própria desta thread
+
+        with _RUNNING_LOCK:
+            _RUNNING[job_id] = self
+        self._job_id = job_id
+
+        self._watcher = threading.Thread(target=loop, daemon=True, name=f"job-deadline-{job_id}")
+        self._watcher.start()
+        return self
+
+    def close(self):
+        self._watch_stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+        with _RUNNING_LOCK:
+            if _RUNNING.get(self._job_id) is self:
+                del _RUNNING[self._job_id]
+
+
+# Jobs em execução neste processo (para o heartbeat do worker parar um job sem lease)
+_RUNNING: dict[int, Deadline] = {}
+_RUNNING_LOCK = threading.Lock()
+
+
+def cancel_running(job_id: int, reason: str = "canceled") -> bool:
+    """Para o job `job_id` se ele roda neste processo. True se encontrou."""
+    with _RUNNING_LOCK:
+        deadline = _RUNNING.get(job_id)
+    if deadline is None:
+        return False
+    deadline.cancel(reason)
+    return True
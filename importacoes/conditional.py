@@ -0,0 +1,129 @@
+# importacoes/conditional.py
+from __future__ import annotations
+
+import hashlib
+import threading
+
+from lxml import html
+
+from .fetcher import HttpClient
+from .models import ListingPageState
+
+
+# =============================================================================
+# GET condicional e impressão digital das páginas de listagem (homepage e seções)
+#   - Guarda, por importação e URL, o ETag/Last-Modified da última resposta
+#     completa (ListingPageState) e manda If-None-Match/If-Modified-Since.
+#   - 304: a página não mudou -> nada a baixar nem a reler. Seção sem mudança
+#     não tem links novos; a homepage reaproveita as editorias guardadas.
+#   - Sites sem validadores: guarda o hash dos links extraídos da seção
+#     (links_digest). Mesmo hash da última execução = seção sem novidade:
+#     pula a consulta do delta e os artigos dela.
+#   - Validadores e hash só valem para a versão da config que os gravou (XPaths
+#     mudaram = GET completo) e só são gravados quando o job termina inteiro:
+#     um job parcial não pode esconder links que ficaram sem baixar.
+#   - Pelo mesmo motivo, página com algum artigo que falhou (download, extração
+#     ou gravação) não tem o estado atualizado (`discard`): na próxima execução
+#     ela é lida de novo e o artigo volta pelo delta.
+#   - Refresh periódico (refresh_existing_hours) não usa GET condicional.
+# =============================================================================
+
+class ListingCache:
+    def __init__(self, config, enabled: bool = True):
+        self.config = config
+        self.enabled = enabled
+        self.version = config.updated_at
+        self.states = {s.url: s for s in ListingPageState.objects.filter(config=config)} if enabled else {}
+        self.not_modified = 0
+        self.bytes_avoided = 0
+        self.same_digest = 0  # seções 200 com os mesmos links da última execução
+        self._pending: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _valid(self, url: str) -> ListingPageState | None:
+        state = self.states.get(url)
+        if state is None or state.config_version != self.version:
+            return None
+        return state
+
+    def headers(self, url: str) -> dict:
+        state = self._valid(url) if self.enabled else None
+        if state is None:
+            return {}
+        headers = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+        return headers
+
+    def fetch(self, client: HttpClient, url: str, timeout: int | None = None, stop=None) -> html.HtmlElement | None:
+        """GET condicional: devolve o HtmlElement, ou None se a página não mudou (304)."""
+        resp = client.get(url, timeout=timeout, stop=stop, headers=self.headers(url))
+        if resp.status_code == 304:
+            state = self.states.get(url)
+            with self._lock:
+                self.not_modified += 1
+                self.bytes_avoided += state.content_length if state is not None else 0
+            return None
+        etag, last_modified = resp.headers.get("ETag", ""), resp.headers.get("Last-Modified", "")
+        if self.enabled:
+            with self._lock:
+                self._pending[url] = {
+                    "etag": etag[:300], "last_modified": last_modified[:100],
+                    "content_length": len(resp.content), "links": [], "links_digest": "",
+                }
+        return html.fromstring(resp.content)
+
+    def stored_links(self, url: str) -> list[str]:
+        state = self._valid(url)
+        return list(state.links) if state is not None else []
+
+    def remember_links(self, url: str, links):
+        """Guarda links derivados da página (editorias da homepage) junto dos validadores."""
+        with self._lock:
+            if url in self._pending:
+                self._pending[url]["links"] = sorted(links)
+
+    def same_links(self, url: str, links) -> bool:
+        """
+        Registra o hash dos links extraídos da página e diz se é igual ao da
+        última execução completa (mesma versão da config).
+        """
+        digest = links_digest(links)
+        state = self._valid(url) if self.enabled else None
+        with self._lock:
+            if url in self._pending:
+                self._pending[url]["links_digest"] = digest
+            same = bool(links) and state is not None and state.links_digest == digest
+            if same:
+                self.same_digest += 1
+        return same
+
+    def discard(self, urls):
+        """Não grava o estado novo destas páginas (fica o da última execução completa)."""
+        with self._lock:
+            for url in urls:
+                self._pending.pop(url, None)
+
+    def save(self) -> int:
+        """Grava (upsert) os validadores das respostas completas deste job."""
+        if not self._pending:
+            return 0
+        ListingPageState.objects.bulk_create(
+            [ListingPageState(config=self.config, url=url, config_version=self.version, **data)
+             for url, data in self._pending.items()],
+            update_conflicts=True, unique_fields=["config", "url"],
+            update_fields=["etag", "last_modified", "content_length", "links", "links_digest",
+                           "config_version", "updated_at"],
+        )
+        return len(self._pending)
+
+
+def links_digest(links) -> str:
+    """Hash estável (independe da ordem) de um conjunto de URLs."""
+    h = hashlib.sha256()
+    for url in sorted(set(links)):
+        h.update(url.encode("utf-8", "surrogatepass"))
+        h.update(b"\n")
+    return h.hexdigest()
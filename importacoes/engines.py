@@ -0,0 +1,216 @@
+# importacoes/engines.py
+from __future__ import annotations
+
+import asyncio
+import atexit
+import concurrent.futures
+import queue
+import threading
+from typing import Iterable
+
+from django.conf import settings
+
+from .budget import DeadlineExceeded
+from .fetcher import DEFAULT_HEADERS, HttpClient
+from .politeness import CrawlBudget, crawl_budget
+
+_DONE = object()
+
+
+# =============================================================================
+# Engines de coleta de artigos
+#   Um engine recebe as URLs de artigo (lista ou iterável que chega aos poucos,
+#   como o pipeline.LinkStream) e um `handle(url, content, error)` e devolve a
+#   lista de retornos de `handle` (em ordem de conclusão). Com `stop()` verdadeiro (prazo do
+#   job/cancelamento), URLs ainda não baixadas vão para o `handle` com erro
+#   DeadlineExceeded, sem requisição. O download é do engine; extração
+#   e persistência continuam no `handle` (mesmo código nos dois engines), o que
+#   garante os mesmos ImportJob/News para qualquer engine.
+#     - threads: ThreadPoolExecutor, uma thread bloqueada por requisição.
+#     - async:   um event loop por processo (thread daemon) compartilhado por
+#                todas as importações; aiohttp + semáforo por job.
+#   Nos dois, teto global, teto por host e taxa por host são os do orçamento de
+#   coleta do processo (politeness.CrawlBudget), o mesmo da homepage e das seções.
+# =============================================================================
+
+class ThreadedEngine:
+    name = "threads"
+
+    def run(self, urls: Iterable[str], handle, *, client: HttpClient, timeout: int, max_workers: int,
+            stop=None) -> list:
+        def work(url):
+            if stop is not None and stop():
+                return handle(url, None, DeadlineExceeded(url))
+            try:
+                content = client.get(url, timeout=timeout, stop=stop).content  # espera a vez no orçamento
+            except Exception as e:
+                return handle(url, None, e)
+            return handle(url, content, None)
+
+        # cada thread puxa a próxima URL da fonte (lista ou LinkStream, que bloqueia
+        # até a listagem produzir mais): os downloads começam com a primeira URL
+        source = iter(urls)
+        lock = threading.Lock()
+        results: list = []
+
+        def worker():
+            while True:
+                with lock:  # gerador: um next() por vez
+                    url = next(source, _DONE)
+                if url is _DONE:
+                    return
+                results.append(work(url))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
+            for f in [ex.submit(worker) for _ in range(max_workers)]:
+                f.result()
+        return results
+
+
+class AsyncEngine:
+    """
+    Mantém centenas de downloads em voo com poucas threads.
+    Limites (na ordem em que são adquiridos): por job -> orçamento de coleta
+    (por host -> taxa do host -> global, `CrawlBudget.aslot`).
+    """
+    name = "async"
+
+    def __init__(self, per_job: int = 64, budget: CrawlBudget | None = None):
+        self.per_job = per_job
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._session = None
+
+    # --- event loop compartilhado ---------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True, name="imports-async-engine").start()
+                self._loop = loop
+            return self._loop
+
+    async def _get_session(self):
+        import aiohttp  # dependência só do engine async
+
+        if self._session is None:
+            budget = self.budget or crawl_budget()
+            self._session = aiohttp.ClientSession(
+                headers=DEFAULT_HEADERS,
+                connector=aiohttp.TCPConnector(limit=budget.max_in_flight, limit_per_host=budget.per_host),
+            )
+        return self._session
+
+    # --- download -----------------------------------------------------------
+    async def _fetch_one(self, session, url: str, timeout: int, client: HttpClient, stop=None) -> bytes:
+        import aiohttp
+
+        if stop is not None and stop():
+            raise DeadlineExceeded(url)
+        async with (self.budget or crawl_budget()).aslot(url, stop=stop) as waited:
+            client.note_wait(waited)
+            if stop is not None and stop():  # checado com a vaga em mãos: a fila esvazia sem requisições
+                raise DeadlineExceeded(url)
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                resp.raise_for_status()
+                return await resp.read()
+
+    async def _fetch_all(self, urls: Iterable[str], timeout: int, job_sem: asyncio.Semaphore, out: queue.Queue,
+                         client: HttpClient, stop=None):
+        try:
+            session = await self._get_session()
+            loop = asyncio.get_running_loop()
+            source = iter(urls)
+            streaming = not isinstance(urls, (list, tuple))
+            tasks: set[asyncio.Task] = set()
+
+            async def one(url):
+                # a vaga do job só volta depois do `handle` (run): corpo baixado esperando
+                # extração/gravação também conta no limite por job
+                try:
+                    item = (url, await self._fetch_one(session, url, timeout, client, stop), None)
+                except Exception as e:
+                    item = (url, None, e)
+                except BaseException:
+                    job_sem.release()
+                    raise
+                out.put(item)
+
+            while True:
+                await job_sem.acquire()  # no máximo `per_job` URLs entre a fonte e o fim do `handle`
+                if streaming:  # next() pode bloquear esperando a listagem: fora do loop
+                    url = await loop.run_in_executor(None, next, source, _DONE)
+                else:
+                    url = next(source, _DONE)
+                if url is _DONE:
+                    job_sem.release()
+                    break
+                task = asyncio.create_task(one(url))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            out.put(None)  # sentinela: fim dos downloads
+
+    def close(self):
+        """Fecha a sessão aiohttp e para o loop (registrado em atexit)."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(timeout=5)
+            except Exception:
+                pass
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+
+    def run(self, urls: Iterable[str], handle, *, client: HttpClient, timeout: int, max_workers: int,
+            stop=None) -> list:
+        loop = self._ensure_loop()
+        # no máximo `per_job` itens em `out` (cada um segura uma vaga do job até o handle terminar)
+        out: queue.Queue = queue.Queue()
+        job_sem = asyncio.Semaphore(self.per_job)
+        fut = asyncio.run_coroutine_threadsafe(self._fetch_all(urls, timeout, job_sem, out, client, stop), loop)
+
+        def handle_and_release(url, content, error):
+            try:
+                return handle(url, content, error)
+            finally:
+                loop.call_soon_threadsafe(job_sem.release)  # corpo liberado: próxima URL
+
+        # Extração/persistência fora do event loop, à medida que os downloads chegam
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
+            pending = []
+            while True:
+                item = out.get()
+                if item is None:
+                    break
+                pending.append(ex.submit(handle_and_release, *item))
+            fut.result()
+            return [f.result() for f in pending]
+
+
+_ENGINES: dict[str, object] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_engine(name: str | None = None):
+    """
+    Devolve o engine pelo nome (padrão: settings.IMPORTS_ENGINE).
+    O engine async é único por processo para compartilhar loop e limites.
+    """
+    name = (name or getattr(settings, "IMPORTS_ENGINE", "threads") or "threads").lower()
+    with _ENGINES_LOCK:
+        if name not in _ENGINES:
+            if name == "threads":
+                _ENGINES[name] = ThreadedEngine()
+            elif name == "async":
+                _ENGINES[name] = AsyncEngine(per_job=getattr(settings, "IMPORTS_ASYNC_PER_JOB", 64))
+                atexit.register(_ENGINES[name].close)
+            else:
+                raise ValueError(f"Engine de importação desconhecido: {name!r}")
+        return _ENGINES[name]
@@ -0,0 +1,450 @@
+# importacoes/extraction.py
+from __future__ import annotations
+
+import atexit
+import concurrent.futures
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from lxml import etree, html
+from dateutil import parser as dateparser
+
+from django.conf import settings
+from django.utils import timezone
+
+from .joblog import JsonLogger
+
+# Este módulo não toca no ORM: roda igual na thread do job ou em um processo
+# do pool de extração (ver ExtractionPool).
+
+
+# =============================================================================
+# Helpers de XPath e texto
+# =============================================================================
+
+def _text(nodes, default: str = "") -> str:
+    """
+    Concatena o texto de uma lista de nós/strings, já com trim e remoção de vazio.
+    """
+    if not nodes:
+        return default
+    parts: list[str] = []
+    for n in nodes:
+        if isinstance(n, str):
+            s = n.strip()
+            if s:
+                parts.append(s)
+        elif hasattr(n, "text_content"):
+            s = n.text_content().strip()
+            if s:
+                parts.append(s)
+    return " ".join(parts).strip()
+
+def _strings_from_nodes(nodes) -> list[str]:
+    """
+    Extrai hrefs/strings a partir de resultados de XPath (string ou elemento).
+    """
+    out: list[str] = []
+    for n in nodes:
+        if isinstance(n, str):
+            s = n.strip()
+            if s:
+                out.append(s)
+        else:
+            href = n.get("href")
+            if href:
+                out.append(href)
+            else:
+                inner = n.xpath(".//@href")
+                if inner:
+                    out.append(inner[0])
+    return out
+
+
+# =============================================================================
+# Parser de data PT-BR tolerante (robusto a ruídos comuns)
+# =============================================================================
+
+PT_WEEKDAYS = [
+    "segunda", "segunda-feira", "terca", "terça", "terça-feira",
+    "quarta", "quarta-feira", "quinta", "quinta-feira",
+    "sexta", "sexta-feira", "sabado", "sábado", "domingo",
+]
+
+PT_MONTHS = {
+    r"janeiro|jan": "January",
+    r"fevereiro|fev": "February",
+    r"mar[cç]o|mar": "March",
+    r"abril|abr": "April",
+    r"maio|mai": "May",
+    r"junho|jun": "June",
+    r"julho|jul": "July",
+    r"agosto|ago": "August",
+    r"setembro|set": "September",
+    r"outubro|out": "October",
+    r"novembro|nov": "November",
+    r"dezembro|dez": "December",
+}
+
+_CLEAN_TAIL = [
+    r"\batualizado[:\s]*.*$",  # remove tudo após "Atualizado:"
+    r"\bpublicado[:\s]*.*$",
+    r"\|\s*.*$",               # barra vertical e o resto
+    r"–\s*.*$", r"—\s*.*$",    # travessão e o resto
+]
+
+def parse_news_datetime(raw: str) -> datetime | None:
+    """
+    Converte variações PT-BR para datetime "aware".
+    Ex.: 'Quarta-Feira, 20 de Agosto de 2025, 11h:30 | Atualizado: ...'
+         '20/08/2025 14:03', '2025-08-21T14:03-04:00', '21 ago 2025 10h'
+    """
+    if not raw:
+        return None
+
+    txt = " ".join(str(raw).strip().split())
+    low = txt
+
+    # 1) corta cauda (Atualizado:, pipes, travessão)
+    for pat in _CLEAN_TAIL:
+        low = re.sub(pat, "", low, flags=re.IGNORECASE).strip()
+
+    # 2) remove dia da semana
+    for wd in PT_WEEKDAYS:
+        low = re.sub(rf"\b{wd}\b,?", "", low, flags=re.IGNORECASE)
+
+    # 3) normaliza conectores/horários
+    low = re.sub(r"\bàs\b|\bas\b", " ", low, flags=re.IGNORECASE)
+    low = re.sub(r"\bde\b", " ", low, flags=re.IGNORECASE)
+    low = re.sub(r"(\d{1,2})h[:]?(\d{2})", r"\1:\2", low)  # 11h30 / 11h:30 -> 11:30
+    low = re.sub(r"(\d{1,2})h(?!\d)", r"\1:00", low)       # 11h -> 11:00
+
+    # 4) meses PT -> EN (dateutil entende melhor)
+    for pt_regex, en in PT_MONTHS.items():
+        low = re.sub(rf"\b({pt_regex})\b", en, low, flags=re.IGNORECASE)
+
+    candidate = " ".join(low.split(",")).strip()
+
+    # 5) tenta com dateutil
+    dt = None
+    try:
+        dt = dateparser.parse(candidate, dayfirst=True, fuzzy=True)
+    except Exception:
+        dt = None
+
+    # 6) fallback dd/mm/aaaa (c/ hora opcional)
+    if dt is None:
+        m = re.search(
+            r"(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})(?:\s+(\d{1,2}):(\d{2})(?::(\d{2}))?)?",
+            candidate,
+        )
+        if m:
+            d, mth, y, hh, mm, ss = m.groups()
+            y = int("20" + y) if len(y) == 2 else int(y)
+            hh = int(hh) if hh else 0
+            mm = int(mm) if mm else 0
+            ss = int(ss) if ss else 0
+            try:
+                dt = datetime(y, int(mth), int(d), hh, mm, ss)
+            except Exception:
+                dt = None
+
+    if dt:
+        if timezone.is_naive(dt):
+            dt = timezone.make_aware(dt, timezone.get_current_timezone())
+        return dt
+    return None
+
+
+# =============================================================================
+# XPaths genéricos de fallback
+# =============================================================================
+
+GENERIC_LISTING_XPATHS = [
+    "//article//a/@href",
+    "//h2//a/@href",
+    "//h3//a/@href",
+    "//a[contains(@href,'/noticia') or contains(@href,'/news') or contains(@href,'/materia')]/@href",
+]
+
+GENERIC_CONTENT_XPATHS = [
+    "//article//p",
+    "//main//p",
+    "//*[contains(@class,'content') or contains(@class,'article')]//p",
+]
+
+META_DATE_FALLBACKS = [
+    "//meta[@property='article:published_time']/@content",
+    "//meta[@itemprop='datePublished']/@content",
+    "//meta[@name='pubdate']/@content",
+    "//time/@datetime",
+    "//*[contains(@class,'date')][1]",
+]
+
+
+TITLE_FALLBACKS = [
+    "//meta[@property='og:title']/@content",
+    "//title",
+    "//*[self::h1 or self::h2][1]",
+]
+
+
+# =============================================================================
+# Extração de um artigo (bytes + XPaths -> registro simples)
+# =============================================================================
+
+ARTICLE_XPATH_FIELDS = {
+    "title": "article_title_xpath",
+    "subtitle": "article_subtitle_xpath",
+    "author": "article_author_xpath",
+    "content": "article_content_xpath",
+    "date": "article_date_xpath",
+    "section": "article_section_name_xpath",
+}
+
+def article_xpaths(config) -> dict[str, str]:
+    """XPaths de artigo da ImportConfig como dict simples (picklable)."""
+    return {k: (getattr(config, attr) or "").strip() for k, attr in ARTICLE_XPATH_FIELDS.items()}
+
+def xpath_cache_key(config) -> tuple:
+    """Versão da config para o cache de XPaths compilados (muda a cada save)."""
+    return (config.pk, config.updated_at.isoformat() if config.updated_at else "")
+
+
+# =============================================================================
+# Cache de XPaths compilados (lxml.etree.XPath)
+#   - Compila uma vez por config/versão em vez de a cada artigo.
+#   - Por thread: o avaliador do lxml tem lock interno, então um objeto
+#     compartilhado serializaria as threads de artigo.
+#   - Expressão inválida fica guardada como exceção e é relançada no uso
+#     (mesmo log de antes); o form já barra isso no save.
+# =============================================================================
+
+_xpath_local = threading.local()
+
+def validate_xpath(expr: str) -> None:
+    """Levanta etree.XPathSyntaxError se a expressão não compilar."""
+    etree.XPath(expr)
+
+def _compile(expr: str):
+    try:
+        return etree.XPath(expr)
+    except Exception as e:
+        return e
+
+def _compile_all(xpaths: dict[str, str]) -> dict:
+    compiled = {k: _compile(v) for k, v in xpaths.items() if v}
+    compiled["title_fallbacks"] = [(xp, _compile(xp)) for xp in TITLE_FALLBACKS]
+    compiled["content_fallbacks"] = [(xp, _compile(xp)) for xp in GENERIC_CONTENT_XPATHS]
+    compiled["date_fallbacks"] = [(xp, _compile(xp)) for xp in META_DATE_FALLBACKS]
+    return compiled
+
+def compiled_xpaths(xpaths: dict[str, str], cache_key: tuple | None = None) -> dict:
+    """
+    XPaths compilados para `xpaths`. Com `cache_key` (ver xpath_cache_key),
+    reaproveita a compilação da thread enquanto a config não mudar.
+    """
+    if cache_key is None:
+        return _compile_all(xpaths)
+    cache = getattr(_xpath_local, "cache", None)
+    if cache is None:
+        cache = _xpath_local.cache = {}
+    config_id, version = cache_key[0], cache_key[1:]
+    hit = cache.get(config_id)
+    if hit is not None and hit[0] == version:
+        return hit[1]
+    compiled = _compile_all(xpaths)
+    cache[config_id] = (version, compiled)
+    return compiled
+
+def _run(xp, doc):
+    if isinstance(xp, Exception):
+        raise xp
+    return xp(doc)
+
+def _first_text(xps: list[tuple], doc: html.HtmlElement, log: JsonLogger) -> str:
+    for expr, xp in xps:
+        try:
+            val = _text(_run(xp, doc))
+            if val:
+                log.ok("XPath de fallback executado", stage="xpath", where="fallback", xpath=expr)
+                return val
+        except Exception:
+            continue
+    return ""
+
+def extract_article(content_bytes: bytes, aurl: str, xpaths: dict[str, str], cache_key: tuple | None = None) -> dict:
+    """
+    Faz o parse do HTML e aplica os XPaths (com fallbacks) de um artigo.
+    Devolve um dict com os campos extraídos, `ok` (False se faltou título ou
+    conteúdo) e os eventos de log gerados, que o job anexa ao seu logger.
+    Sem `cache_key`, os XPaths são compilados a cada chamada.
+    """
+    log = JsonLogger()
+    cx = compiled_xpaths(xpaths, cache_key)
+    rec = {
+        "url": aurl, "ok": False,
+        "title": "", "subtitle": "", "author": "", "content": "",
+        "published_at": None, "section_name": "",
+        "events": log.events,
+    }
+
+    try:
+        art = html.fromstring(content_bytes)
+        log.ok("GET 200 (artigo)", stage="http-get", url=aurl)
+    except Exception as e:
+        log.error("Falha ao carregar artigo", stage="article", url=aurl, exc=e)
+        return rec
+
+    # --- Título
+    title = ""
+    if xpaths.get("title"):
+        try:
+            nodes = _run(cx["title"], art)
+            title = _text(nodes)
+            log.ok("XPath executado (título)", stage="xpath", xpath=xpaths["title"], nodes=len(nodes))
+        except Exception as e:
+            log.error("Erro de XPath (título)", stage="xpath", xpath=xpaths["title"], url=aurl, exc=e)
+    if not title:
+        title = _first_text(cx["title_fallbacks"], art, log)
+    if not title:
+        log.error("Título vazio", stage="article-title", url=aurl)
+        return rec
+
+    # --- Subtítulo
+    subtitle = ""
+    if xpaths.get("subtitle"):
+        try:
+            subtitle = _text(_run(cx["subtitle"], art))
+            log.ok("XPath executado (subtítulo)", stage="xpath", xpath=xpaths["subtitle"])
+        except Exception as e:
+            log.error("Erro de XPath (subtítulo)", stage="xpath", xpath=xpaths["subtitle"], url=aurl, exc=e)
+
+    # --- Autor
+    author = ""
+    if xpaths.get("author"):
+        try:
+            author = _text(_run(cx["author"], art))
+            log.ok("XPath executado (autor)", stage="xpath", xpath=xpaths["author"])
+        except Exception as e:
+            log.error("Erro de XPath (autor)", stage="xpath", xpath=xpaths["author"], url=aurl, exc=e)
+
+    # --- Conteúdo
+    content = ""
+    if xpaths.get("content"):
+        try:
+            nodes = _run(cx["content"], art)
+            content = _text(nodes)
+            log.ok("XPath executado (conteúdo)", stage="xpath", xpath=xpaths["content"], nodes=len(nodes), chars=len(content))
+        except Exception as e:
+            log.error("Erro de XPath (conteúdo)", stage="xpath", xpath=xpaths["content"], url=aurl, exc=e)
+    if not content:
+        for xp, compiled in cx["content_fallbacks"]:
+            try:
+                nodes = _run(compiled, art)
+                content = _text(nodes)
+            except Exception:
+                continue
+            if content:
+                log.ok("Fallback de conteúdo", stage="article-content", xpath=xp, nodes=len(nodes), chars=len(content))
+                break
+    if not content:
+        log.error("Conteúdo vazio", stage="article-content", url=aurl)
+        return rec
+
+    # --- Data de publicação
+    published_at = None
+    if xpaths.get("date"):
+        try:
+            ds = _text(_run(cx["date"], art))
+            if ds:
+                published_at = parse_news_datetime(ds)
+                if published_at:
+                    log.ok("Data parseada", stage="article-date", value=str(published_at), url=aurl)
+                else:
+                    log.warn("Data não parseável (usaremos captured_at)", stage="article-date", raw_date=ds, url=aurl)
+        except Exception as e:
+            log.error("Erro de XPath (data)", stage="xpath", xpath=xpaths["date"], url=aurl, exc=e)
+    if not published_at:
+        for xp, compiled in cx["date_fallbacks"]:
+            try:
+                val = _text(_run(compiled, art))
+            except Exception:
+                val = ""
+            if val:
+                dt = parse_news_datetime(val)
+                if dt:
+                    published_at = dt
+                    log.ok("Data parseada (fallback)", stage="article-date-fallback", value=str(dt), xpath=xp, url=aurl)
+                    break
+    if not published_at:
+        published_at = timezone.now()
+        log.warn("Usando data/hora da captura", stage="article-date-fallback", value=str(published_at), url=aurl)
+
+    # --- Seção (nome dentro do artigo; quem resolve o Section é o job)
+    section_name = ""
+    if xpaths.get("section"):
+        try:
+            section_name = _text(_run(cx["section"], art))
+            if section_name:
+                log.ok("Seção identificada", stage="article-section-name", section=section_name, url=aurl)
+        except Exception as e:
+            log.error("Erro de XPath (seção no artigo)", stage="xpath", xpath=xpaths["section"], url=aurl, exc=e)
+
+    rec.update(
+        ok=True, title=title, subtitle=subtitle, author=author, content=content,
+        published_at=published_at, section_name=section_name,
+    )
+    return rec
+
+
+# =============================================================================
+# Pool de processos para a extração (opcional)
+#   settings.IMPORTS_EXTRACTION_PROCESSES > 0 liga um ProcessPoolExecutor
+#   único por processo: parse + XPaths escalam entre núcleos (fora do GIL) e
+#   as gravações no banco continuam no processo principal.
+# =============================================================================
+
+_pool: concurrent.futures.ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def _init_worker(settings_module: str):
+    # "spawn" não herda o estado do Django; basta o settings p/ o timezone
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+
+def get_extraction_pool() -> concurrent.futures.ProcessPoolExecutor | None:
+    global _pool
+    workers = getattr(settings, "IMPORTS_EXTRACTION_PROCESSES", 0) or 0
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "app.settings"),),
+            )
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+def run_extraction(content_bytes: bytes, aurl: str, xpaths: dict[str, str], cache_key: tuple | None = None) -> dict:
+    """
+    `extract_article` no pool de processos, se configurado; senão, na thread atual.
+    Se o pool quebrar (processo filho morto), descarta-o e extrai localmente.
+    """
+    global _pool
+    pool = get_extraction_pool()
+    if pool is None:
+        return extract_article(content_bytes, aurl, xpaths, cache_key)
+    try:
+        return pool.submit(extract_article, content_bytes, aurl, xpaths, cache_key).result()
+    except BrokenProcessPool:
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return extract_article(content_bytes, aurl, xpaths, cache_key)
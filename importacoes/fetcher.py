@@ -0,0 +1,115 @@
+# importacoes/fetcher.py
+from __future__ import annotations
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import html
+
+from .politeness import CrawlBudget, crawl_budget
+
+
+# =============================================================================
+# Camada HTTP do scraper (sessão com pool keep-alive)
+#   - Uma Session compartilhada por importação: threads reaproveitam as
+#     conexões TCP/TLS já abertas com o mesmo host.
+#   - Pool por host dimensionado por `max_workers` e limitado por `per_host`
+#     (pool_block=True: a thread espera uma conexão livre em vez de abrir mais).
+#   - Toda requisição pede vaga ao orçamento de coleta do processo
+#     (politeness.CrawlBudget: teto global, teto e taxa por host).
+# =============================================================================
+
+DEFAULT_HEADERS = {
+    "User-Agent": "NewsScraperEdu/1.0 (+https://example.local)",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+# Quantos hosts diferentes mantêm pool vivo ao mesmo tempo (homepage, CDN, etc.)
+POOL_HOSTS = 32
+
+
+class HttpClient:
+    """
+    Cliente HTTP de uma importação. Use como context manager ou chame close().
+    """
+
+    def __init__(self, max_workers: int = 8, per_host: int | None = None, timeout: int = 25,
+                 budget: CrawlBudget | None = None):
+        self.timeout = timeout
+        self.budget = budget if budget is not None else crawl_budget()
+        self.throttled = 0        # requisições que esperaram vaga/taxa
+        self.wait_seconds = 0.0   # tempo total de espera por vaga/taxa
+        self._wait_lock = threading.Lock()
+        self.pool_size = max(1, min(max_workers, per_host or max_workers))
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(
+            pool_connections=POOL_HOSTS,
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._adapter = adapter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception:
+            pass
+
+    def note_wait(self, seconds: float):
+        """Contabiliza espera por vaga/taxa (também usada pelo engine async)."""
+        if seconds >= 0.01:
+            with self._wait_lock:
+                self.throttled += 1
+                self.wait_seconds += seconds
+
+    def get(self, url: str, timeout: int | None = None, stop=None, headers: dict | None = None) -> requests.Response:
+        """
+        GET com a sessão do pool, dentro dos limites do orçamento de coleta.
+        Levanta HTTPError p/ status de erro; DeadlineExceeded se `stop()` ficar
+        verdadeiro enquanto espera a vez. `headers` extras (ex.: If-None-Match):
+        um 304 volta como resposta normal, sem corpo.
+        """
+        with self.budget.slot(url, stop=stop) as waited:
+            self.note_wait(waited)
+            resp = self.session.get(url, timeout=timeout or self.timeout, headers=headers)
+        resp.raise_for_status()
+        return resp
+
+    def fetch(self, url: str, timeout: int | None = None, stop=None) -> html.HtmlElement:
+        """GET + parse lxml, como o antigo `_fetch`."""
+        return html.fromstring(self.get(url, timeout=timeout, stop=stop).content)
+
+    def stats(self) -> dict:
+        """
+        Reaproveitamento de conexões (somando os pools vivos do urllib3):
+        requests feitos, conexões abertas e quantos requests reusaram conexão.
+        """
+        requests_made = connections = 0
+        hosts = set()
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_made += getattr(pool, "num_requests", 0)
+            connections += getattr(pool, "num_connections", 0)
+            hosts.add(pool.host)
+        return {
+            "requests": requests_made,
+            "connections": connections,
+            "reused": max(0, requests_made - connections),
+            "hosts": len(hosts),
+            "pool_size": self.pool_size,
+            "throttled": self.throttled,
+            "throttle_wait_s": round(self.wait_seconds, 2),
+        }
@@ -1,5 +1,15 @@
 from django import forms
 from .models import ImportConfig
+from .extraction import validate_xpath
+
+# Campos com um único XPath (o de editorias é validado linha a linha)
+XPATH_FIELDS = [
+    "listing_link_xpath",
+    "article_section_name_xpath",
+    "article_date_xpath", "article_title_xpath",
+    "article_subtitle_xpath", "article_author_xpath",
+    "article_content_xpath",
+]
 
 class ImportConfigForm(forms.ModelForm):
     class Meta:
@@ -7,6 +17,8 @@ class ImportConfigForm(forms.ModelForm):
         fields = [
             "vehicle", "name",
             "interval_minutes", "enabled",
+            "adaptive_interval", "min_interval_minutes", "max_interval_minutes",
+            "delta_crawl", "refresh_existing_hours",
             "editorial_xpaths", "listing_link_xpath",
             "article_section_name_xpath",
             "article_date_xpath", "article_title_xpath",
@@ -23,3 +35,27 @@ class ImportConfigForm(forms.ModelForm):
             "article_author_xpath": forms.Textarea(attrs={"rows": 2, "placeholder": "//*[contains(@class,'author')]"}),
             "article_content_xpath": forms.Textarea(attrs={"rows": 3, "placeholder": "//*[contains(@class,'article-body')]"}),
         }
+
+    def clean(self):
+        """Compila os XPaths no save: expressão inválida falha aqui, não a cada artigo."""
+        cleaned = super().clean()
+        for name in XPATH_FIELDS:
+            expr = (cleaned.get(name) or "").strip()
+            if expr:
+                try:
+                    validate_xpath(expr)
+                except Exception as e:
+                    self.add_error(name, f"XPath inválido: {e}")
+        lo, hi = cleaned.get("min_interval_minutes"), cleaned.get("max_interval_minutes")
+        if lo is not None and hi is not None and lo > hi:
+            self.add_error("max_interval_minutes", "O máximo não pode ser menor que o mínimo.")
+        lines = (cleaned.get("editorial_xpaths") or "").splitlines()
+        for i, line in enumerate(lines, start=1):
+            expr = line.strip()
+            if not expr:
+                continue
+            try:
+                validate_xpath(expr)
+            except Exception as e:
+                self.add_error("editorial_xpaths", f"Linha {i}: XPath inválido ({expr}): {e}")
+        return cleaned
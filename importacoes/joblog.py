@@ -0,0 +1,58 @@
+# importacoes/joblog.py
+from __future__ import annotations
+
+import traceback
+from datetime import datetime
+
+
+# =============================================================================
+# Logger estruturado (eventos JSON; no job, gravados em ImportEvent)
+#   - Seguro: nunca derruba a importação por erro de log.
+#   - Convenção de níveis: info | ok | warn | skip | error
+#   - 'stage' é SEMPRE keyword-only (obrigatório passar como stage="...")
+# =============================================================================
+
+class JsonLogger:
+    def __init__(self):
+        self.events = []
+
+    def _event(self, level, msg, *, stage=None, url=None, xpath=None, **extra):
+        return {
+            "level": level,                          # 'info' | 'ok' | 'warn' | 'skip' | 'error'
+            "msg": str(msg).strip(),
+            "stage": stage or "",
+            "url": url or "",
+            "xpath": xpath or "",
+            "ts": datetime.now().strftime("%H:%M:%S"),
+            **({k: v for k, v in extra.items() if v is not None}),
+        }
+
+    def extend(self, events):
+        """Anexa eventos já montados (ex.: vindos da extração em outro processo)."""
+        for ev in events or []:
+            self._safe_append(ev)
+
+    def _safe_append(self, ev):
+        try:
+            self.events.append(ev)
+        except Exception as e:
+            # Não deixa o logger quebrar a execução
+            self.events.append({
+                "level": "error",
+                "msg": f"[logger-fail] {type(e).__name__}: {e}",
+                "stage": "logger",
+                "ts": datetime.now().strftime("%H:%M:%S"),
+            })
+
+    # A partir daqui, 'stage' é keyword-only graças ao "*"
+    def info(self, msg, *, stage=None, **extra): self._safe_append(self._event("info", msg, stage=stage, **extra))
+    def ok  (self, msg, *, stage=None, **extra): self._safe_append(self._event("ok"  , msg, stage=stage, **extra))
+    def warn(self, msg, *, stage=None, **extra): self._safe_append(self._event("warn", msg, stage=stage, **extra))
+    def skip(self, msg, *, stage=None, **extra): self._safe_append(self._event("skip", msg, stage=stage, **extra))
+
+    def error(self, msg, *, stage=None, exc: Exception | None = None, **extra):
+        # Inclui tipo e traceback curto se for exceção Python
+        if exc is not None and "trace" not in extra:
+            extra["trace"] = "".join(traceback.format_exception(exc, limit=6))
+            extra["exc_type"] = type(exc).__name__
+        self._safe_append(self._event("error", msg, stage=stage, **extra))
@@ -0,0 +1,206 @@
+# importacoes/jobqueue.py
+from __future__ import annotations
+
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from .models import ImportConfig, ImportEvent, ImportJob, ImportStatus
+
+
+# =============================================================================
+# Fila de importações no banco
+#   - A fila são os próprios ImportJob com status QUEUED (ordem: queued_at, id).
+#   - O web só enfileira (enqueue_import); quem executa é o `import_worker`,
+#     em outro processo/máquina, com concorrência limitada por worker.
+#   - No máximo um job QUEUED por importação (constraint parcial): pedir
+#     "Executar agora" duas vezes não duplica a execução.
+#   - Claim com lease: o job pego recebe `lease_expires_at`, renovado pelo
+#     heartbeat do worker. Lease vencido = worker morto: o job vira FAILED e
+#     a importação volta a ser agendável (expire_leases).
+#       * PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED (workers não disputam
+#         a mesma linha nem esperam uns pelos outros).
+#       * SQLite: UPDATE condicional (status=QUEUED -> RUNNING); se dois
+#         workers disputam o mesmo job, só um UPDATE afeta a linha.
+# =============================================================================
+
+def lease_seconds() -> int:
+    return int(getattr(settings, "IMPORTS_LEASE_SECONDS", 120))
+
+
+def worker_name(slot: int | str = "") -> str:
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{name}/{slot}" if slot != "" else name
+
+
+def enqueue_import(config_id: int) -> tuple[ImportJob, bool]:
+    """Põe a importação na fila. Devolve (job, criado); se já havia um na fila, devolve esse."""
+    try:
+        with transaction.atomic():
+            job = ImportJob.objects.create(
+                config_id=config_id, status=ImportStatus.QUEUED, queued_at=timezone.now(),
+            )
+    except IntegrityError:
+        return ImportJob.objects.get(config_id=config_id, status=ImportStatus.QUEUED), False
+    # a config só aparece "na fila" se não estiver rodando agora
+    ImportConfig.objects.filter(pk=config_id).exclude(status=ImportStatus.RUNNING).update(
+        status=ImportStatus.QUEUED,
+    )
+    return job, True
+
+
+def _candidates():
+    """Jobs da fila, do mais antigo, de importações sem job rodando."""
+    busy = ImportJob.objects.filter(status=ImportStatus.RUNNING).values("config_id")
+    return (
+        ImportJob.objects
+        .filter(status=ImportStatus.QUEUED)
+        .exclude(config_id__in=busy)
+        .order_by("queued_at", "id")
+    )
+
+
+def claim_next(worker: str) -> ImportJob | None:
+    """
+    Pega o próximo job da fila, marcando-o RUNNING com lease para este worker.
+    None se a fila estiver vazia.
+    """
+    expire_leases()
+    now = timezone.now()
+    claim = {
+        "status": ImportStatus.RUNNING, "started_at": now, "worker": worker[:100],
+        "lease_expires_at": now + timedelta(seconds=lease_seconds()), "heartbeat_at": now,
+    }
+
+    if connections[ImportJob.objects.db].features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = _candidates().select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            for field, value in claim.items():
+                setattr(job, field, value)
+            job.save(update_fields=list(claim))
+            return job
+
+    while True:
+        candidate = _candidates().values_list("id", flat=True).first()
+        if candidate is None:
+            return None
+        if ImportJob.objects.filter(pk=candidate, status=ImportStatus.QUEUED).update(**claim):
+            return ImportJob.objects.get(pk=candidate)
+        # outro worker levou este job: tenta o próximo
+
+
+def renew_leases(job_ids) -> set[int]:
+    """Heartbeat: estende o lease dos jobs ainda RUNNING. Devolve os ids cujo lease foi perdido."""
+    job_ids = set(job_ids)
+    if not job_ids:
+        return set()
+    now = timezone.now()
+    live = ImportJob.objects.filter(pk__in=job_ids, status=ImportStatus.RUNNING)
+    live.update(lease_expires_at=now + timedelta(seconds=lease_seconds()), heartbeat_at=now)
+    return job_ids - set(live.values_list("id", flat=True))
+
+
+def finish_job(job: ImportJob, fields) -> bool:
+    """
+    Grava o fim do job (`fields` do objeto) só se ele ainda é de quem o executa:
+    RUNNING e com o mesmo worker. False = o job foi tirado dele (lease vencido,
+    reaper) e o status atual não pode ser sobrescrito.
+    """
+    return bool(
+        ImportJob.objects.filter(pk=job.pk, status=ImportStatus.RUNNING, worker=job.worker)
+        .update(**{f: getattr(job, f) for f in fields})
+    )
+
+
+def expire_leases(now=None) -> list[int]:
+    """Jobs RUNNING com lease vencido (worker morto/travado) viram FAILED. Devolve os ids."""
+    now = now or timezone.now()
+    expired = []
+    stale = ImportJob.objects.filter(status=ImportStatus.RUNNING, lease_expires_at__lt=now)
+    for job_id, config_id, worker in stale.values_list("id", "config_id", "worker"):
+        # condicional: com vários workers expirando ao mesmo tempo, só um vence
+        if not stale.filter(pk=job_id).update(status=ImportStatus.FAILED, finished_at=now, stop_reason="lease"):
+            continue
+        ImportConfig.objects.filter(pk=config_id, status=ImportStatus.RUNNING).update(status=ImportStatus.FAILED)
+        _log_event(job_id, "error", f"Lease do worker {worker or '?'} expirou sem heartbeat", "lease")
+        expired.append(job_id)
+    return expired
+
+
+def reap_stale(now=None) -> dict:
+    """
+    Reaper (roda a cada ciclo do agendador; também em `manage.py reap_imports`):
+      - jobs com lease vencido -> FAILED (expire_leases);
+      - jobs RUNNING sem lease (rodados fora do worker) além do orçamento
+        do job + folga -> FAILED;
+      - configs presas em RUNNING/QUEUED sem job ativo (processo morreu no
+        meio) -> FAILED/IDLE, para voltarem a ser agendadas.
+    """
+    now = now or timezone.now()
+    expired = expire_leases(now)
+
+    stale = []
+    max_seconds = getattr(settings, "IMPORTS_JOB_MAX_SECONDS", None)
+    if max_seconds:
+        cutoff = now - timedelta(seconds=max_seconds + lease_seconds())
+        orphans = ImportJob.objects.filter(
+            status=ImportStatus.RUNNING, lease_expires_at__isnull=True, started_at__lt=cutoff,
+        )
+        for job_id in orphans.values_list("id", flat=True):
+            if orphans.filter(pk=job_id).update(status=ImportStatus.FAILED, finished_at=now, stop_reason="stale"):
+                _log_event(job_id, "error", "Job sem worker passou do prazo máximo; marcado como falho", "stale")
+                stale.append(job_id)
+
+    active = ImportJob.objects.filter(
+        config_id=OuterRef("pk"), status__in=[ImportStatus.QUEUED, ImportStatus.RUNNING],
+    )
+    stuck = ImportConfig.objects.filter(~Exists(active))
+    reset = (
+        stuck.filter(status=ImportStatus.RUNNING).update(status=ImportStatus.FAILED)
+        + stuck.filter(status=ImportStatus.QUEUED).update(status=ImportStatus.IDLE)
+    )
+    return {"expired": expired, "stale": stale, "configs_reset": reset}
+
+
+def request_cancel(job_id: int) -> str:
+    """
+    Cancela um job: na fila, sai dela na hora; rodando, o pedido vai para o
+    banco e o job para no próximo ponto de checagem (resultados parciais
+    gravados). Devolve "canceled" | "requested" | "finished".
+    """
+    now = timezone.now()
+    job = ImportJob.objects.only("id", "config_id").get(pk=job_id)
+    if ImportJob.objects.filter(pk=job_id, status=ImportStatus.QUEUED).update(
+        status=ImportStatus.CANCELED, finished_at=now, stop_reason="canceled",
+    ):
+        ImportConfig.objects.filter(pk=job.config_id, status=ImportStatus.QUEUED).update(status=ImportStatus.IDLE)
+        return "canceled"
+    if ImportJob.objects.filter(pk=job_id, status=ImportStatus.RUNNING).update(cancel_requested=True):
+        return "requested"
+    return "finished"
+
+
+def _log_event(job_id: int, level: str, msg: str, stage: str) -> None:
+    """Acrescenta um evento ao log de um job que não está mais com o seu worker."""
+    for _ in range(3):
+        last = ImportEvent.objects.filter(job_id=job_id).aggregate(m=Max("seq"))["m"] or 0
+        try:
+            with transaction.atomic():
+                ImportEvent.objects.create(
+                    job_id=job_id, seq=last + 1, level=level, stage=stage, msg=msg,
+                    ts=timezone.localtime().strftime("%H:%M:%S"),
+                )
+            return
+        except IntegrityError:
+            continue  # o logger do job gravou um lote nesse meio tempo: tenta depois dele
+
+
+def queue_depth() -> int:
+    return ImportJob.objects.filter(status=ImportStatus.QUEUED).count()
@@ -0,0 +1,168 @@
+# importacoes/legacy_log.py
+from __future__ import annotations
+
+import json
+import re
+
+from django.db import transaction
+
+from .models import ImportEvent, ImportJob
+
+
+# =============================================================================
+# Logs antigos (ImportJob.log)
+#   Antes de ImportEvent o log ia inteiro para ImportJob.log: dict {"events"},
+#   lista, JSONL, objetos concatenados ou texto puro. Os parsers tolerantes
+#   continuam aqui para converter esses jobs em linhas de ImportEvent (comando
+#   `import_legacy_logs`). A tela do job só lê: sem conversão num GET, que
+#   disputaria o lock de escrita do SQLite com as importações em andamento.
+# =============================================================================
+
+# -------------------- FALLBACK p/ logs texto (já tínhamos) --------------------
+def parse_legacy_log_to_events(text: str) -> dict:
+    if not text:
+        return {"events": []}
+    events = []
+    ts_re = re.compile(r"^\[(?P<ts>\d{2}:\d{2}:\d{2})\]\s*")
+    url_re = re.compile(r"(https?://\S+)")
+    stage_re = re.compile(r"\[(?P<stage>[a-zA-Z0-9_\-]+)\]")
+    xp_tail = re.compile(r"\|\s*(?P<xp>//.+)$")
+
+    current_article = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        m_ts = ts_re.match(line)
+        ts = m_ts.group("ts") if m_ts else None
+        body = line[m_ts.end():].strip() if m_ts else line
+        low = body.lower()
+
+        level = "info"
+        if "falha" in low or "error" in low or "exception" in low or "traceback" in low:
+            level = "error"
+        elif "warn" in low or "aviso" in low:
+            level = "warn"
+        elif "skip" in low or "ignorado" in low:
+            level = "skip"
+        elif "xpath ok" in low or "get 200" in low or "ok" in low:
+            level = "ok"
+
+        m_st = stage_re.search(body)
+        stage = (m_st.group("stage") if m_st else None) or (
+            "xpath" if "xpath" in low else "http-get" if "get 200" in low else "log"
+        )
+
+        m_url = url_re.search(body)
+        url = m_url.group(1) if m_url else None
+        if url:
+            current_article = url
+
+        m_xp = xp_tail.search(body)
+        xp = m_xp.group("xp").strip() if m_xp else None
+
+        events.append({
+            "level": level,
+            "stage": stage,
+            "ts": ts,
+            "msg": body,
+            "url": url or current_article,
+            "xpath": xp,
+            "article_url": current_article,
+        })
+    return {"events": events}
+
+# -------------------- NOVOS PARSERS TOLERANTES --------------------------------
+def _split_json_objects(s: str):
+    """Se o log veio como {...}{...}{...}, separa objetos balanceando chaves."""
+    objs = []
+    depth = 0
+    start = None
+    in_str = False
+    esc = False
+    for i, ch in enumerate(s):
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == '\\':
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+            continue
+        if ch == '{':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0 and start is not None:
+                objs.append(s[start:i+1])
+                start = None
+    return objs
+
+def _parse_log_any(job_log: str):
+    """Aceita dict{'events':...}, list, JSONL e objetos concatenados."""
+    if not job_log:
+        return []
+
+    # 1) dict ou list
+    try:
+        data = json.loads(job_log)
+        if isinstance(data, dict) and isinstance(data.get("events"), list):
+            return data["events"]
+        if isinstance(data, list):
+            return data
+    except Exception:
+        pass
+
+    # 2) JSON lines (um objeto por linha)
+    events = []
+    has_jsonl = False
+    for line in job_log.splitlines():
+        t = line.strip()
+        if not (t.startswith("{") and t.endswith("}")):
+            continue
+        try:
+            events.append(json.loads(t))
+            has_jsonl = True
+        except Exception:
+            pass
+    if has_jsonl and events:
+        return events
+
+    # 3) Objetos concatenados {...}{...}{...}
+    parts = _split_json_objects(job_log)
+    for p in parts:
+        try:
+            events.append(json.loads(p))
+        except Exception:
+            continue
+    if events:
+        return events
+
+    # 4) Por fim: parser heurístico de texto
+    return parse_legacy_log_to_events(job_log).get("events", [])
+
+
+def legacy_events(job: ImportJob) -> list[ImportEvent]:
+    """`job.log` como linhas de ImportEvent em memória (não gravadas), na ordem do log."""
+    events = [ev for ev in _parse_log_any(job.log or "") if isinstance(ev, dict)]
+    return [ImportEvent.from_event(job.pk, seq, ev) for seq, ev in enumerate(events, start=1)]
+
+
+def convert_legacy_log(job: ImportJob, clear_blob: bool = False, batch_size: int = 1000) -> int:
+    """
+    Converte `job.log` em linhas de ImportEvent (idempotente: não faz nada se
+    o job já tiver eventos). Devolve quantos eventos foram gravados.
+    """
+    events = legacy_events(job)
+    with transaction.atomic():
+        if ImportEvent.objects.filter(job_id=job.pk).exists():
+            return 0
+        ImportEvent.objects.bulk_create(events, batch_size=batch_size)
+        if clear_blob and events:
+            ImportJob.objects.filter(pk=job.pk).update(log="")
+    return len(events)
@@ -0,0 +1,96 @@
+# importacoes/management/commands/bench_engines.py
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from lxml import html
+
+from importacoes.engines import AsyncEngine, ThreadedEngine
+from importacoes.fetcher import HttpClient
+from importacoes.politeness import CrawlBudget
+
+
+class _ArticleHandler(BaseHTTPRequestHandler):
+    """Servidor local que imita um site de notícias (com latência artificial)."""
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    body = b""
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _fake_article(size_kb: int) -> bytes:
+    para = "<p>" + ("Lorem ipsum dolor sit amet. " * 36) + "</p>"
+    n = max(1, size_kb * 1024 // len(para))
+    return (
+        "<html><head><meta charset='utf-8'><title>Bench</title></head>"
+        f"<body><article><h1>Título</h1>{para * n}</article></body></html>"
+    ).encode("utf-8")
+
+
+class Command(BaseCommand):
+    help = "Compara os engines de artigos (threads x async) contra um servidor HTTP local: vazão e memória."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", type=int, default=1000, help="URLs por rodada")
+        parser.add_argument("--latency-ms", type=int, default=50, help="latência simulada por resposta")
+        parser.add_argument("--size-kb", type=int, default=40, help="tamanho de cada artigo")
+        parser.add_argument("--workers", type=int, default=8, help="threads do engine threads / extração")
+        parser.add_argument("--in-flight", type=int, default=256, help="teto global de requisições em voo (orçamento do bench)")
+        parser.add_argument("--per-host", type=int, default=64, help="requisições simultâneas por host")
+        parser.add_argument("--rate", type=float, default=0, help="requisições/s por host (0 = sem limite)")
+
+    def handle(self, *args, **opts):
+        _ArticleHandler.latency = opts["latency_ms"] / 1000
+        _ArticleHandler.body = _fake_article(opts["size_kb"])
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _ArticleHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base}/noticia/{i}" for i in range(opts["articles"])]
+
+        def handle(url, content, error):
+            # Mesmo custo de CPU mínimo para os dois engines: parse + 1 XPath
+            if error is not None:
+                return 0
+            return 1 if html.fromstring(content).xpath("//h1") else 0
+
+        # orçamento próprio do bench (não o do processo): mede o engine, não a política de coleta
+        budget = CrawlBudget(max_in_flight=opts["in_flight"], per_host=opts["per_host"],
+                             rate=opts["rate"] or None, burst=opts["per_host"])
+        engines = [
+            ThreadedEngine(),
+            AsyncEngine(per_job=opts["in_flight"], budget=budget),
+        ]
+        self.stdout.write(
+            f"{len(urls)} artigos • {opts['size_kb']} KB • latência {opts['latency_ms']} ms • workers {opts['workers']}"
+        )
+        try:
+            for engine in engines:
+                with HttpClient(max_workers=opts["workers"], budget=budget) as client:
+                    tracemalloc.start()
+                    t0 = time.perf_counter()
+                    ok = sum(engine.run(urls, handle, client=client, timeout=30, max_workers=opts["workers"]))
+                    elapsed = time.perf_counter() - t0
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                self.stdout.write(
+                    f"  {engine.name:8s} {elapsed:7.2f}s  {len(urls) / elapsed:8.1f} art/s  "
+                    f"pico {peak / 1024 / 1024:6.1f} MiB  ok={ok}/{len(urls)}"
+                )
+        finally:
+            for engine in engines:
+                if hasattr(engine, "close"):
+                    engine.close()
+            server.shutdown()
@@ -0,0 +1,61 @@
+# importacoes/management/commands/bench_xpath.py
+import time
+
+from django.core.management.base import BaseCommand
+from lxml import html
+
+from importacoes.extraction import compiled_xpaths, extract_article
+
+
+SAMPLE_XPATHS = {
+    "title": "//h1[contains(@class,'title')]",
+    "subtitle": "//h2[contains(@class,'subtitle')]",
+    "author": "//*[contains(@class,'author')]//a | //*[contains(@class,'author')]",
+    "content": "//div[@id='texto']//p",
+    "date": "//time/@datetime | //time",
+    "section": "//nav[@class='breadcrumb']//a[last()]",
+}
+
+
+def _sample_article() -> bytes:
+    paras = "".join(f"<p>Parágrafo {i} " + ("lorem ipsum " * 40) + "</p>" for i in range(30))
+    return (
+        "<html><head><meta charset='utf-8'><title>Título de teste</title>"
+        "<meta property='article:published_time' content='2025-08-20T10:00:00-03:00'></head><body>"
+        "<nav class='breadcrumb'><a href='/'>Home</a><a href='/politica'>Política</a></nav>"
+        "<article><h1 class='title'>Título de teste</h1><h2 class='subtitle'>Subtítulo</h2>"
+        "<span class='author'><a>Fulano</a></span><time datetime='2025-08-20T10:00:00-03:00'>20/08</time>"
+        f"<div id='texto'>{paras}</div></article></body></html>"
+    ).encode("utf-8")
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark: custo de extração por artigo com XPaths em string x compilados (cache)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+
+    def _time(self, fn, n):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return (time.perf_counter() - t0) / n * 1e6  # µs por artigo
+
+    def handle(self, *args, **opts):
+        n = opts["iterations"]
+        body = _sample_article()
+        doc = html.fromstring(body)
+        exprs = [v for v in SAMPLE_XPATHS.values() if v]
+        cx = compiled_xpaths(SAMPLE_XPATHS, cache_key=(0, "bench"))
+        compiled = [cx[k] for k, v in SAMPLE_XPATHS.items() if v]
+
+        rows = [
+            ("só XPaths, string (element.xpath)", lambda: [doc.xpath(e) for e in exprs]),
+            ("só XPaths, compilados (cache)", lambda: [xp(doc) for xp in compiled]),
+            ("extract_article, sem cache", lambda: extract_article(body, "http://bench", SAMPLE_XPATHS)),
+            ("extract_article, com cache", lambda: extract_article(body, "http://bench", SAMPLE_XPATHS, (0, "bench"))),
+        ]
+        self.stdout.write(f"{n} iterações • artigo de {len(body) // 1024} KB • {len(exprs)} XPaths configurados")
+        for label, fn in rows:
+            fn()  # aquece
+            self.stdout.write(f"  {label:36s} {self._time(fn, n):9.1f} µs/artigo")
@@ -0,0 +1,35 @@
+# importacoes/management/commands/import_legacy_logs.py
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from importacoes.legacy_log import convert_legacy_log
+from importacoes.models import ImportEvent, ImportJob, ImportStatus
+
+
+class Command(BaseCommand):
+    help = "Converte os logs antigos (ImportJob.log) em linhas de ImportEvent (uma vez; idempotente)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true", help="esvazia ImportJob.log depois de converter")
+        parser.add_argument("--dry-run", action="store_true", help="só conta os jobs que seriam convertidos")
+
+    def handle(self, *args, **opts):
+        pending = (
+            ImportJob.objects
+            .exclude(log="")
+            .exclude(status=ImportStatus.RUNNING)
+            .filter(~Exists(ImportEvent.objects.filter(job_id=OuterRef("pk"))))
+            .only("id", "log")
+            .order_by("id")
+        )
+        if opts["dry_run"]:
+            self.stdout.write(f"{pending.count()} job(s) com log antigo para converter.")
+            return
+
+        jobs = events = 0
+        for job in pending.iterator(chunk_size=50):
+            n = convert_legacy_log(job, clear_blob=opts["clear"])
+            jobs += 1
+            events += n
+            self.stdout.write(f"  job #{job.pk}: {n} evento(s)")
+        self.stdout.write(self.style.SUCCESS(f"{jobs} job(s) convertido(s), {events} evento(s) gravado(s)."))
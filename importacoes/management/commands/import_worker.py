@@ -0,0 +1,179 @@
+# importacoes/management/commands/import_worker.py
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from importacoes.budget import cancel_running
+from importacoes.jobqueue import claim_next, lease_seconds, queue_depth, reap_stale, renew_leases, worker_name
+from importacoes.scheduler import HeapScheduler, enqueue_due
+from importacoes.services import run_import
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de importações: executa os jobs da fila (ImportJob em 'queued') com "
+        "concorrência limitada e enfileira as importações vencidas. Rode quantos quiser."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int,
+                            default=getattr(settings, "IMPORTS_WORKER_CONCURRENCY", 2),
+                            help="importações simultâneas neste processo")
+        parser.add_argument("--poll", type=float,
+                            default=getattr(settings, "IMPORTS_WORKER_POLL_SECONDS", 5),
+                            help="segundos entre consultas à fila vazia")
+        parser.add_argument("--refresh", type=float,
+                            default=getattr(settings, "IMPORTS_SCHEDULER_REFRESH_SECONDS", 1.0),
+                            help="segundos entre leituras de configs criadas/editadas")
+        parser.add_argument("--reap-every", type=float,
+                            default=getattr(settings, "IMPORTS_REAP_SECONDS", 60),
+                            help="segundos entre varreduras de jobs travados")
+        parser.add_argument("--no-schedule", action="store_true",
+                            help="não agenda: só executa o que já estiver na fila")
+        parser.add_argument("--once", action="store_true",
+                            help="esvazia a fila e sai (útil em cron/CI)")
+
+    def _out(self, msg):
+        self.stdout.write(f"[{time.strftime('%H:%M:%S')}] {msg}")
+
+    def handle(self, *args, **opts):
+        self.stop = threading.Event()
+        self.wake = threading.Condition()  # acorda slots ociosos quando algo entra na fila
+        self.active: dict[int, int] = {}  # slot -> job em execução (para o heartbeat)
+        self.finished: set[int] = set()   # configs com job concluído (next_run_at pode ter mudado)
+        self.lock = threading.Lock()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.stop.set())
+
+        concurrency = max(1, opts["concurrency"])
+        schedule = not opts["no_schedule"]
+        once = opts["once"]
+
+        self.scheduler = HeapScheduler() if schedule and not once else None
+        if once and schedule:
+            self._guard("Agendador", lambda: self._queued(enqueue_due()))
+        if self.scheduler is not None:
+            self._guard("Agendador", lambda: self._out(f"Agendador: {self.scheduler.load()} importação(ões) no heap"))
+            self._guard("Reaper", reap_stale)
+            self._guard("Agendador", lambda: self._queued(self.scheduler.dispatch_due()))
+        self._out(f"Worker {worker_name()} • {concurrency} slot(s) • fila: {queue_depth()} job(s)")
+
+        slots = [
+            threading.Thread(target=self._slot, args=(i, opts["poll"], once), name=f"import-slot-{i}")
+            for i in range(concurrency)
+        ]
+        for t in slots:
+            t.start()
+
+        # thread principal: agendador (heap) + heartbeat dos leases + reaper.
+        # Dorme até o próximo compromisso: topo do heap, refresh, heartbeat ou reaper.
+        beat_every = max(1.0, lease_seconds() / 3)
+        now = time.monotonic()
+        next_refresh = now + opts["refresh"]
+        next_reap = now + opts["reap_every"]
+        next_beat = now + beat_every
+        stopping = False
+        while any(t.is_alive() for t in slots):
+            now = time.monotonic()
+            if self.stop.is_set() and not stopping:
+                stopping = True
+                self._out("Encerrando: aguardando as importações em andamento...")
+                self._notify()
+            if self.scheduler is not None and not stopping:
+                if now >= next_refresh:
+                    self._guard("Agendador", self.scheduler.refresh)
+                    next_refresh = now + opts["refresh"]
+                with self.lock:
+                    finished, self.finished = self.finished, set()
+                if finished:  # intervalo adaptativo: o job reagendou a própria config
+                    self._guard("Agendador", lambda: self.scheduler.reload(finished))
+                if now >= next_reap:
+                    self._guard("Reaper", reap_stale)
+                    next_reap = now + opts["reap_every"]
+                self._guard("Agendador", lambda: self._queued(self.scheduler.dispatch_due()))
+            if now >= next_beat:
+                self._heartbeat()
+                next_beat = now + beat_every
+
+            wait = next_beat - time.monotonic()
+            if self.scheduler is not None and not stopping:
+                wait = min(wait, next_refresh - time.monotonic(), next_reap - time.monotonic())
+                until = self.scheduler.seconds_until_next()
+                if until is not None:
+                    wait = min(wait, until)
+            wait = max(0.05, wait)
+            if stopping or once:
+                wait = min(wait, 0.5)  # slots podem sair a qualquer momento: confere logo
+            self.stop.wait(wait)
+
+        for t in slots:
+            t.join()
+        self._out("Worker encerrado.")
+
+    def _heartbeat(self):
+        with self.lock:
+            jobs = set(self.active.values())
+        if not jobs:
+            return
+        try:
+            lost = renew_leases(jobs)
+            for job_id in lost:
+                # lease vencido e job marcado FAILED por outro worker: para a execução local
+                # (a importação pode já estar rodando em outro worker) e o resultado não vale
+                cancel_running(job_id, "lease")
+                self.stderr.write(f"Lease perdido: job #{job_id} (heartbeat atrasado?); execução interrompida")
+        except Exception as e:
+            self.stderr.write(f"Heartbeat falhou: {type(e).__name__}: {e}")
+        finally:
+            connection.close()
+
+    def _guard(self, what: str, fn):
+        """Roda uma tarefa do agendador sem derrubar o worker se ela falhar."""
+        try:
+            close_old_connections()
+            return fn()
+        except Exception as e:
+            self.stderr.write(f"{what} falhou: {type(e).__name__}: {e}")
+        finally:
+            connection.close()
+
+    def _queued(self, ids):
+        if ids:
+            self._out(f"Agendador: {len(ids)} importação(ões) enfileirada(s)")
+            self._notify()
+
+    def _notify(self):
+        with self.wake:
+            self.wake.notify_all()
+
+    def _slot(self, slot: int, poll: float, once: bool):
+        name = worker_name(slot)
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = claim_next(name)
+                if job is None:
+                    if once:
+                        return
+                    with self.wake:
+                        if not self.stop.is_set():
+                            self.wake.wait(poll)
+                    continue
+                self._out(f"[{slot}] job #{job.pk} (importação {job.config_id}) iniciado")
+                with self.lock:
+                    self.active[slot] = job.pk
+                try:
+                    job = run_import(job.config_id, job=job)
+                    self._out(f"[{slot}] job #{job.pk}: {job.status} • novas: {job.new_count}")
+                except Exception as e:
+                    self.stderr.write(f"[{slot}] job #{job.pk} falhou: {type(e).__name__}: {e}")
+                finally:
+                    with self.lock:
+                        self.active.pop(slot, None)
+                        self.finished.add(job.config_id)
+        finally:
+            connection.close()  # conexão própria deste slot
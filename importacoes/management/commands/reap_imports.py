@@ -0,0 +1,18 @@
+# importacoes/management/commands/reap_imports.py
+from django.core.management.base import BaseCommand
+
+from importacoes.jobqueue import reap_stale
+
+
+class Command(BaseCommand):
+    help = (
+        "Recupera importações presas: jobs com lease vencido ou órfãos viram 'failed' e "
+        "configs em running/queued sem job ativo voltam a ser agendáveis. O import_worker já faz isso a cada ciclo."
+    )
+
+    def handle(self, *args, **opts):
+        r = reap_stale()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(r['expired'])} job(s) com lease vencido, {len(r['stale'])} órfão(s), "
+            f"{r['configs_reset']} config(s) liberada(s)."
+        ))
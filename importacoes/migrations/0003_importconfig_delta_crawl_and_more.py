@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importacoes', '0002_alter_importconfig_editorial_xpaths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importconfig',
+            name='delta_crawl',
+            field=models.BooleanField(default=True, help_text='Só baixa URLs que ainda não existem em News para o veículo.'),
+        ),
+        migrations.AddField(
+            model_name='importconfig',
+            name='last_refresh_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importconfig',
+            name='refresh_existing_hours',
+            field=models.PositiveIntegerField(default=0, help_text='A cada N horas, reprocessa também as URLs já existentes (0 = nunca).'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='skipped_count',
+            field=models.PositiveIntegerField(default=0, help_text='URLs já existentes que não foram baixadas (delta crawl).'),
+        ),
+    ]
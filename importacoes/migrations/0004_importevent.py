@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:55
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importacoes', '0003_importconfig_delta_crawl_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('level', models.CharField(default='info', max_length=10)),
+                ('stage', models.CharField(blank=True, max_length=40)),
+                ('msg', models.TextField(blank=True)),
+                ('url', models.CharField(blank=True, max_length=800)),
+                ('xpath', models.TextField(blank=True)),
+                ('article_url', models.CharField(blank=True, max_length=800)),
+                ('ts', models.CharField(blank=True, max_length=8)),
+                ('extra', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='importacoes.importjob')),
+            ],
+            options={
+                'ordering': ['job', 'seq'],
+                'constraints': [models.UniqueConstraint(fields=('job', 'seq'), name='uniq_importevent_job_seq')],
+            },
+        ),
+    ]
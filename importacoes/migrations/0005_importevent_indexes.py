@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importacoes', '0004_importevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='importevent',
+            index=models.Index(fields=['job', 'level'], name='importevent_job_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='importevent',
+            index=models.Index(fields=['job', 'stage'], name='importevent_job_stage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='importevent',
+            index=models.Index(fields=['job', 'article_url'], name='importevent_job_article_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importacoes', '0007_importjob_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='cancel_requested',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='stop_reason',
+            field=models.CharField(blank=True, help_text='Por que o job terminou antes do fim: budget, stage:<etapa>, canceled, lease, stale.', max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='importconfig',
+            name='status',
+            field=models.CharField(choices=[('idle', 'Idle'), ('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed'), ('done', 'Done'), ('canceled', 'Canceled')], default='idle', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='status',
+            field=models.CharField(choices=[('idle', 'Idle'), ('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed'), ('done', 'Done'), ('canceled', 'Canceled')], default='running', max_length=10),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:22
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_next_run_at(apps, schema_editor):
+    """Agenda as configs existentes (mesma conta de ImportConfig.compute_next_run_at)."""
+    ImportConfig = apps.get_model("importacoes", "ImportConfig")
+    now = timezone.now()
+    configs = list(ImportConfig.objects.filter(enabled=True).only("id", "last_run_at", "interval_minutes"))
+    for cfg in configs:
+        cfg.next_run_at = (
+            cfg.last_run_at + timedelta(minutes=cfg.interval_minutes or 20) if cfg.last_run_at else now
+        )
+    ImportConfig.objects.bulk_update(configs, ["next_run_at"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importacoes', '0008_importjob_deadline'),
+        ('veiculos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importconfig',
+            name='next_run_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='importconfig',
+            index=models.Index(fields=['enabled', 'next_run_at'], name='importconfig_next_run_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='importconfig',
+            index=models.Index(fields=['updated_at'], name='importconfig_updated_idx'),
+        ),
+        migrations.RunPython(fill_next_run_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importacoes', '0009_importconfig_next_run_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='first_news_seconds',
+            field=models.FloatField(blank=True, help_text='Segundos do início do job até a primeira notícia gravada.', null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importacoes', '0010_importjob_first_news_seconds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='bytes_avoided',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='not_modified_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ListingPageState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.CharField(max_length=800)),
+                ('etag', models.CharField(blank=True, max_length=300)),
+                ('last_modified', models.CharField(blank=True, max_length=100)),
+                ('content_length', models.PositiveIntegerField(default=0, help_text='Bytes da última resposta completa.')),
+                ('links', models.JSONField(blank=True, default=list, help_text='Homepage: URLs das editorias extraídas.')),
+                ('config_version', models.DateTimeField(blank=True, help_text='ImportConfig.updated_at da gravação (XPaths mudaram = validador inválido).', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_states', to='importacoes.importconfig')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('config', 'url'), name='uniq_listingpagestate_config_url')],
+            },
+        ),
+    ]
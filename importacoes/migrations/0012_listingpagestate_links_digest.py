@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importacoes', '0011_listing_page_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingpagestate',
+            name='links_digest',
+            field=models.CharField(blank=True, help_text='Hash do conjunto de links de notícia extraídos da página.', max_length=64),
+        ),
+    ]
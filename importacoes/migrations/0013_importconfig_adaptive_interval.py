@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('importacoes', '0012_listingpagestate_links_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importconfig',
+            name='adaptive_interval',
+            field=models.BooleanField(default=False, help_text='Ajusta o intervalo ao ritmo de notícias novas do veículo (entre o mínimo e o máximo).'),
+        ),
+        migrations.AddField(
+            model_name='importconfig',
+            name='effective_interval_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importconfig',
+            name='max_interval_minutes',
+            field=models.PositiveIntegerField(default=720),
+        ),
+        migrations.AddField(
+            model_name='importconfig',
+            name='min_interval_minutes',
+            field=models.PositiveIntegerField(default=5),
+        ),
+    ]
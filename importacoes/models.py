@@ -1,12 +1,17 @@
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 from veiculos.models import Vehicle
 
 class ImportStatus(models.TextChoices):
     IDLE = "idle", "Idle"
+    QUEUED = "queued", "Queued"
     RUNNING = "running", "Running"
     FAILED = "failed", "Failed"
     DONE = "done", "Done"
+    CANCELED = "canceled", "Canceled"
 
 class ImportConfig(models.Model):
     vehicle = models.ForeignKey(Vehicle, on_delete=models.PROTECT, related_name="import_configs")
@@ -29,7 +34,29 @@ class ImportConfig(models.Model):
     interval_minutes = models.PositiveIntegerField(default=20)
     enabled = models.BooleanField(default=True)
     last_run_at = models.DateTimeField(null=True, blank=True)
+    # próxima execução agendada (heap do import_worker); None = desabilitada
+    next_run_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=10, choices=ImportStatus.choices, default=ImportStatus.IDLE)
+    # intervalo adaptativo: encurta/alonga conforme o ritmo de publicação observado
+    adaptive_interval = models.BooleanField(
+        default=False,
+        help_text="Ajusta o intervalo ao ritmo de notícias novas do veículo (entre o mínimo e o máximo).",
+    )
+    min_interval_minutes = models.PositiveIntegerField(default=5)
+    max_interval_minutes = models.PositiveIntegerField(default=720)
+    # intervalo em vigor no modo adaptativo (None = ainda não ajustado: usa interval_minutes)
+    effective_interval_minutes = models.PositiveIntegerField(null=True, blank=True)
+
+    # delta crawl
+    delta_crawl = models.BooleanField(
+        default=True,
+        help_text="Só baixa URLs que ainda não existem em News para o veículo.",
+    )
+    refresh_existing_hours = models.PositiveIntegerField(
+        default=0,
+        help_text="A cada N horas, reprocessa também as URLs já existentes (0 = nunca).",
+    )
+    last_refresh_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -37,10 +64,56 @@ class ImportConfig(models.Model):
     class Meta:
         unique_together = (("vehicle", "name"),)
         ordering = ["vehicle__name", "name"]
+        indexes = [
+            # agendador: próximas vencidas / configs editadas desde o último ciclo
+            models.Index(fields=["enabled", "next_run_at"], name="importconfig_next_run_idx"),
+            models.Index(fields=["updated_at"], name="importconfig_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.vehicle.name} • {self.name}"
 
+    def save(self, *args, **kwargs):
+        # edição completa (form/admin): reagenda com o intervalo/habilitação atuais
+        if kwargs.get("update_fields") is None:
+            if not self.adaptive_interval:
+                self.effective_interval_minutes = None
+            elif self.effective_interval_minutes:
+                self.effective_interval_minutes = self.clamp_interval(self.effective_interval_minutes)
+            self.next_run_at = self.compute_next_run_at()
+        super().save(*args, **kwargs)
+
+    def compute_next_run_at(self, now=None):
+        """last_run_at + intervalo (ou agora, se nunca rodou); None se desabilitada."""
+        if not self.enabled:
+            return None
+        if self.last_run_at is None:
+            return now or timezone.now()
+        return self.last_run_at + timedelta(minutes=self.current_interval())
+
+    def clamp_interval(self, minutes: float) -> int:
+        """Intervalo (min) limitado a [min_interval_minutes, max_interval_minutes]."""
+        lo = max(1, self.min_interval_minutes or 1)
+        hi = max(lo, self.max_interval_minutes or lo)
+        return int(round(min(max(minutes, lo), hi)))
+
+    def current_interval(self) -> int:
+        """Intervalo em vigor (min): o ajustado no modo adaptativo, senão interval_minutes."""
+        if not self.adaptive_interval:
+            return self.interval_minutes or 20
+        return self.clamp_interval(self.effective_interval_minutes or self.interval_minutes or 20)
+
+    def refresh_due(self, now=None) -> bool:
+        """True se esta execução deve reprocessar também as URLs já existentes."""
+        if not self.delta_crawl:
+            return True
+        if not self.refresh_existing_hours:
+            return False
+        if self.last_refresh_at is None:
+            return True
+        now = now or timezone.now()
+        return (now - self.last_refresh_at).total_seconds() >= self.refresh_existing_hours * 3600
+
 class ImportJob(models.Model):
     config = models.ForeignKey(ImportConfig, on_delete=models.CASCADE, related_name="jobs")
     started_at = models.DateTimeField(auto_now_add=True)
@@ -48,10 +121,41 @@ class ImportJob(models.Model):
     status = models.CharField(max_length=10, choices=ImportStatus.choices, default=ImportStatus.RUNNING)
     found_count = models.PositiveIntegerField(default=0)
     new_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0, help_text="URLs já existentes que não foram baixadas (delta crawl).")
+    first_news_seconds = models.FloatField(
+        null=True, blank=True, help_text="Segundos do início do job até a primeira notícia gravada.",
+    )
+    # GET condicional das listagens (homepage/seções): respostas 304 e bytes não baixados
+    not_modified_count = models.PositiveIntegerField(default=0)
+    bytes_avoided = models.PositiveBigIntegerField(default=0)
     log = models.TextField(blank=True)
 
+    # fila (import_worker): o job nasce QUEUED e um worker o pega
+    queued_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True, help_text="Worker (host:pid/slot) que executou o job.")
+    # lease do worker: renovado por heartbeat; vencido = worker morto (job vira FAILED)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    # parada antecipada: pedido de cancelamento e motivo (prazo/cancelamento)
+    cancel_requested = models.BooleanField(default=False)
+    stop_reason = models.CharField(
+        max_length=30, blank=True,
+        help_text="Por que o job terminou antes do fim: budget, stage:<etapa>, canceled, lease, stale.",
+    )
+
     class Meta:
         ordering = ["-started_at"]
+        constraints = [
+            # no máximo um job na fila por importação (execuções pedidas em dobro viram uma)
+            models.UniqueConstraint(
+                fields=["config"], condition=models.Q(status="queued"),
+                name="uniq_importjob_queued_per_config",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "queued_at"], name="importjob_status_queue_idx"),
+            models.Index(fields=["status", "lease_expires_at"], name="importjob_status_lease_idx"),
+        ]
 
     def mark_done(self, found: int, new: int):
         self.found_count = found
@@ -59,3 +163,96 @@ class ImportJob(models.Model):
         self.status = ImportStatus.DONE
         self.finished_at = timezone.now()
         self.save(update_fields=["found_count", "new_count", "status", "finished_at"])
+
+
+class ListingPageState(models.Model):
+    """
+    Estado da última leitura completa de uma página de listagem (homepage ou
+    seção) de uma importação: validadores HTTP (ETag/Last-Modified) para o GET
+    condicional e o hash dos links extraídos, para pular seções sem novidade.
+    """
+    config = models.ForeignKey(ImportConfig, on_delete=models.CASCADE, related_name="page_states")
+    url = models.CharField(max_length=800)
+    etag = models.CharField(max_length=300, blank=True)
+    last_modified = models.CharField(max_length=100, blank=True)
+    content_length = models.PositiveIntegerField(default=0, help_text="Bytes da última resposta completa.")
+    links = models.JSONField(default=list, blank=True, help_text="Homepage: URLs das editorias extraídas.")
+    links_digest = models.CharField(
+        max_length=64, blank=True, help_text="Hash do conjunto de links de notícia extraídos da página.",
+    )
+    config_version = models.DateTimeField(
+        null=True, blank=True, help_text="ImportConfig.updated_at da gravação (XPaths mudaram = validador inválido).",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["config", "url"], name="uniq_listingpagestate_config_url"),
+        ]
+
+    def __str__(self):
+        return f"{self.config_id} {self.url}"
+
+
+# Etapas cujo `url` é o do artigo (agrupamento por artigo na tela do job)
+ARTICLE_STAGES = {
+    "article", "article-title", "article-content", "article-date",
+    "article-section-name", "article-subtitle", "article-author",
+}
+
+class ImportEvent(models.Model):
+    """Um evento do log do job, gravado em lotes durante a execução."""
+    CORE_FIELDS = ("level", "msg", "stage", "url", "xpath", "ts", "article_url")
+
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name="events")
+    seq = models.PositiveIntegerField()
+    level = models.CharField(max_length=10, default="info")
+    stage = models.CharField(max_length=40, blank=True)
+    msg = models.TextField(blank=True)
+    url = models.CharField(max_length=800, blank=True)
+    xpath = models.TextField(blank=True)
+    article_url = models.CharField(max_length=800, blank=True)
+    ts = models.CharField(max_length=8, blank=True)
+    extra = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ["job", "seq"]
+        constraints = [
+            models.UniqueConstraint(fields=["job", "seq"], name="uniq_importevent_job_seq"),
+        ]
+        indexes = [
+            # resumos da tela do job (contagem por nível/etapa, grupos por artigo)
+            models.Index(fields=["job", "level"], name="importevent_job_level_idx"),
+            models.Index(fields=["job", "stage"], name="importevent_job_stage_idx"),
+            models.Index(fields=["job", "article_url"], name="importevent_job_article_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.job_id}:{self.seq} [{self.level}] {self.msg[:60]}"
+
+    @classmethod
+    def from_event(cls, job_id: int, seq: int, ev: dict) -> "ImportEvent":
+        stage = str(ev.get("stage") or ev.get("where") or "")[:40]
+        url = str(ev.get("url") or "")
+        article_url = str(ev.get("article_url") or "")
+        if not article_url and url and stage in ARTICLE_STAGES:
+            article_url = url
+        return cls(
+            job_id=job_id, seq=seq,
+            level=str(ev.get("level") or "info")[:10],
+            stage=stage,
+            msg=str(ev.get("msg") or ""),
+            url=url[:800],
+            xpath=str(ev.get("xpath") or ""),
+            article_url=article_url[:800],
+            ts=str(ev.get("ts") or "")[:8],
+            extra={k: v for k, v in ev.items() if k not in cls.CORE_FIELDS and k != "seq"},
+        )
+
+    def as_event(self) -> dict:
+        """Volta ao formato de dict usado pelos templates/JSON do log."""
+        return {
+            **(self.extra or {}),
+            "seq": self.seq, "level": self.level, "stage": self.stage, "msg": self.msg,
+            "url": self.url, "xpath": self.xpath, "article_url": self.article_url, "ts": self.ts,
+        }
@@ -0,0 +1,396 @@
+# importacoes/persistence.py
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Max
+
+from veiculos.models import Section, Vehicle
+from noticias.models import News
+from noticias.rollup import apply_deltas, news_day
+from .joblog import JsonLogger
+from .models import ImportEvent
+
+
+# =============================================================================
+# Estágio único de gravação de notícias
+#   - As threads de artigo só extraem e enfileiram registros (submit).
+#   - Uma thread escritora grava em lotes: bulk_create(ignore_conflicts=True)
+#     em (vehicle, url) para as novas e bulk_update para as existentes, com a
+#     regra de sempre: só preenche section/subtitle/author/published_at vazios.
+#   - No SQLite isso troca N transações concorrentes (e "database is locked")
+#     por uma transação por lote, sempre da mesma thread.
+#   - Lote que falha é regravado registro a registro; o que falhar de novo vai
+#     para `failed_urls` (o job não grava o estado das listagens dessas URLs,
+#     e a próxima execução tenta de novo).
+#   - A thread escritora não morre por erro de banco: o lote que falhar de vez
+#     vai para `failed_urls`. Se ela morrer mesmo assim, `submit`/`close` não
+#     ficam presos na fila cheia: levantam erro e o job termina como falho.
+# =============================================================================
+
+MERGE_FIELDS = ["section", "subtitle", "author", "published_at"]
+
+
+# =============================================================================
+# Cache de seções por veículo
+#   - Pré-carregado no início do job (1 query); nomes normalizados (espaços
+#     colapsados, comparação sem caixa) para "Política" e " política " virarem
+#     a mesma seção.
+#   - Seções que faltam são criadas em lote (bulk_create + releitura).
+#   - Protegido por lock: pode ser usado pelas threads de artigo.
+# =============================================================================
+
+def normalize_section_name(name: str) -> str:
+    return " ".join((name or "").split())[:150]
+
+def _section_key(name: str) -> str:
+    return normalize_section_name(name).casefold()
+
+
+class SectionResolver:
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+        self._lock = threading.Lock()
+        self._by_key: dict[str, Section] = {}
+        for sec in Section.objects.filter(vehicle=vehicle).order_by("id"):
+            self._by_key.setdefault(_section_key(sec.name), sec)  # a mais antiga vence
+
+    def resolve_many(self, names) -> None:
+        """Garante no cache (criando em lote no banco) todas as seções de `names`."""
+        with self._lock:
+            missing: dict[str, str] = {}
+            for name in names:
+                clean = normalize_section_name(name)
+                if clean and _section_key(clean) not in self._by_key:
+                    missing.setdefault(_section_key(clean), clean)
+            if not missing:
+                return
+            Section.objects.bulk_create(
+                [Section(vehicle=self.vehicle, name=n) for n in missing.values()],
+                ignore_conflicts=True,
+            )
+            for sec in Section.objects.filter(vehicle=self.vehicle, name__in=list(missing.values())).order_by("id"):
+                self._by_key.setdefault(_section_key(sec.name), sec)
+
+    def get(self, name: str) -> Section | None:
+        """Seção do nome (normalizado), criando se ainda não existir."""
+        key = _section_key(name)
+        if not key:
+            return None
+        sec = self._by_key.get(key)
+        if sec is None:
+            self.resolve_many([name])
+            sec = self._by_key.get(key)
+        return sec
+
+
+_STOP = object()
+PUT_TIMEOUT = 1.0  # s entre checagens de que a thread escritora está viva
+
+
+class NewsWriter:
+    def __init__(self, vehicle, log: JsonLogger, sections: SectionResolver | None = None,
+                 batch_size: int = 200, flush_seconds: float = 2.0):
+        self.vehicle = vehicle
+        self.log = log
+        self.sections = sections
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: queue.Queue = queue.Queue(maxsize=batch_size * 4)
+        self._thread: threading.Thread | None = None
+
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.write_seconds = 0.0
+        self.first_created_at: float | None = None  # monotonic da 1ª notícia gravada
+        self.failed_urls: set[str] = set()  # registros que não foram gravados nem sozinhos
+
+    # --- API usada pelo job ----------------------------------------------------
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True, name=f"news-writer-{self.vehicle.pk}")
+        self._thread.start()
+        return self
+
+    def submit(self, rec: dict):
+        """Enfileira um registro de `extract_article` (bloqueia se a fila estiver cheia)."""
+        self._put(rec)
+
+    def close(self):
+        """Grava o que falta, encerra a thread e registra a vazão no log."""
+        if self._thread is None:
+            return
+        try:
+            self._put(_STOP)
+            self._thread.join()
+        finally:
+            self._thread = None
+            self._drain()
+        rows = self.created + self.updated
+        rate = rows / self.write_seconds if self.write_seconds > 0 else 0.0
+        self.log.info(
+            f"Gravação: {rows} linha(s) em {self.write_seconds:.2f}s ({rate:.0f} linhas/s)",
+            stage="persist", created=self.created, updated=self.updated,
+            unchanged=self.unchanged, failed=len(self.failed_urls), rows_per_sec=round(rate, 1),
+        )
+        if self.failed_urls:
+            self.log.warn(f"{len(self.failed_urls)} notícia(s) não gravada(s)", stage="persist",
+                          count=len(self.failed_urls))
+
+    def _put(self, item):
+        while True:
+            if self._thread is None or not self._thread.is_alive():
+                raise RuntimeError("Thread de gravação de notícias encerrada; registros não gravados")
+            try:
+                self._queue.put(item, timeout=PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+
+    def _drain(self):
+        """Registros que ficaram na fila de uma thread que morreu: contam como não gravados."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                self.failed_urls.add(item["url"])
+
+    # --- thread escritora ------------------------------------------------------
+    def _loop(self):
+        batch: list[dict] = []
+        deadline = time.monotonic() + self.flush_seconds
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.05, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if item is not None:
+                    batch.append(item)
+                # o 1º registro vai logo (tempo até a primeira notícia); depois, em lotes
+                first = not (self.created or self.updated or self.unchanged)
+                if len(batch) >= self.batch_size or (batch and (first or time.monotonic() >= deadline)):
+                    self._flush_safe(batch)
+                    batch = []
+                if time.monotonic() >= deadline:
+                    deadline = time.monotonic() + self.flush_seconds
+            if batch:
+                self._flush_safe(batch)
+        finally:
+            connection.close()  # conexão própria desta thread
+
+    def _section(self, name: str):
+        return self.sections.get(name) if name and self.sections is not None else None
+
+    def _flush_safe(self, batch: list[dict]):
+        """`_flush` sem derrubar a thread: erro inesperado = lote inteiro não gravado."""
+        try:
+            self._flush(batch)
+        except Exception as e:
+            self.failed_urls.update(rec["url"] for rec in batch)
+            try:
+                self.log.error(f"Falha ao gravar lote de {len(batch)} notícia(s)", stage="persist", exc=e)
+            except Exception:
+                pass  # nunca derruba a thread por erro de log
+
+    def _flush(self, batch: list[dict]):
+        t0 = time.perf_counter()
+        try:
+            close_old_connections()
+            result = self._write(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self.failed_urls.add(batch[0]["url"])
+                self.log.error("Falha ao gravar notícia", stage="persist", article_url=batch[0]["url"], exc=e)
+                return
+            # um registro ruim não derruba o lote: regrava um a um e só perde o que falhar de novo
+            self.log.warn(f"Falha ao gravar lote de {len(batch)} notícia(s); gravando uma a uma: {e}", stage="persist")
+            for rec in batch:
+                self._flush([rec])
+            return
+        finally:
+            self.write_seconds += time.perf_counter() - t0
+
+        inserted, changed_objs, unchanged_recs = result
+        created = len(inserted)
+        self.created += created
+        if created and self.first_created_at is None:
+            self.first_created_at = time.monotonic()
+        self.updated += len(changed_objs)
+        self.unchanged += len(unchanged_recs)
+        for o in inserted:
+            self.log.ok("Notícia registrada", stage="article", article_url=o.url, title=o.title)
+        for _, r in changed_objs:
+            self.log.ok("Notícia atualizada", stage="article", article_url=r["url"], title=r["title"])
+        for r in unchanged_recs:
+            self.log.skip("Notícia já existente (sem mudanças)", stage="article", article_url=r["url"])
+
+    def _write(self, batch: list[dict]):
+        """Grava um lote numa transação. Devolve (inseridas, [(alterada, registro)], registros sem mudança)."""
+        # fora da transação do lote: um rollback não deixa o cache com seções fantasmas
+        names = [r["section_name"] for r in batch if r["section_name"]]
+        if names:
+            if self.sections is None:
+                self.sections = SectionResolver(self.vehicle)
+            self.sections.resolve_many(names)
+        recs = list({r["url"]: r for r in batch}.values())  # uma linha por URL no lote
+        urls = [r["url"] for r in recs]
+        with transaction.atomic():
+            # escritores do mesmo veículo em série (no SQLite a transação IMMEDIATE já
+            # faz isso): as URLs que não estão em `existing` são inseridas por este lote
+            list(Vehicle.objects.select_for_update().filter(pk=self.vehicle.pk).values_list("pk", flat=True))
+            existing = {
+                n.url: n for n in
+                News.objects.filter(vehicle=self.vehicle, url__in=urls)
+                .only("id", "url", "section_id", "subtitle", "author", "published_at", "captured_at")
+            }
+            inserted = [
+                News(
+                    vehicle=self.vehicle, url=r["url"], section=self._section(r["section_name"]),
+                    title=r["title"], subtitle=r["subtitle"], author=r["author"],
+                    published_at=r["published_at"], content=r["content"],
+                )
+                for r in recs if r["url"] not in existing
+            ]
+            # ignore_conflicts só cobre gravações de fora do NewsWriter (sem o lock do veículo)
+            News.objects.bulk_create(inserted, ignore_conflicts=True)
+
+            # rollup do dashboard: +1 no dia de cada nova
+            media_type = self.vehicle.media_type
+            deltas = Counter((news_day(o.published_at, o.captured_at), self.vehicle.pk, media_type) for o in inserted)
+
+            changed_objs, unchanged_recs = [], []
+            for r in recs:
+                obj = existing.get(r["url"])
+                if obj is None:
+                    continue
+                changed = False
+                if not obj.section_id and r["section_name"]:
+                    obj.section = self._section(r["section_name"]); changed = True
+                if not obj.subtitle and r["subtitle"]:
+                    obj.subtitle = r["subtitle"]; changed = True
+                if not obj.author and r["author"]:
+                    obj.author = r["author"]; changed = True
+                if not obj.published_at and r["published_at"]:
+                    # a notícia muda de dia no rollup (de captured_at para published_at)
+                    deltas[(news_day(None, obj.captured_at), self.vehicle.pk, media_type)] -= 1
+                    deltas[(news_day(r["published_at"], None), self.vehicle.pk, media_type)] += 1
+                    obj.published_at = r["published_at"]; changed = True
+                if changed:
+                    changed_objs.append((obj, r))
+                else:
+                    unchanged_recs.append(r)
+            if changed_objs:
+                News.objects.bulk_update([o for o, _ in changed_objs], MERGE_FIELDS)
+            apply_deltas(deltas)
+        return inserted, changed_objs, unchanged_recs
+
+
+# =============================================================================
+# Log do job gravado em ImportEvent durante a execução
+#   - Mesma API do JsonLogger; os eventos ficam em memória só até o próximo
+#     lote (batch_size ou flush_seconds) -> memória limitada em jobs grandes.
+#   - Uma thread própria grava os lotes em ordem de `seq`, o que permite à
+#     tela do job acompanhar a importação em andamento (?after=<seq>).
+#   - Se o produtor for mais rápido que o banco, quem loga espera (backpressure).
+#   - Outros processos também acrescentam eventos ao job (reaper/lease, ver
+#     jobqueue._log_event). Lote com `seq` já usado: este lote e os seguintes
+#     são deslocados para depois do último `seq` gravado, em vez de perdidos.
+#   - Depois do `close()` (o job já pode estar marcando o status final) os
+#     eventos são gravados na hora, na thread de quem loga.
+# =============================================================================
+
+class ImportEventLogger(JsonLogger):
+    def __init__(self, job, batch_size: int = 200, flush_seconds: float = 1.0):
+        super().__init__()
+        self.job_id = job.pk
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.level_counts: Counter = Counter()
+        self.written = 0
+        self.dropped = 0
+        self._seq = 0
+        self._offset = 0  # deslocamento de seq após conflito (só quem grava usa: a thread, depois o close)
+        self._cond = threading.Condition()
+        self._closing = False
+        self._closed = False  # thread encerrada: eventos são gravados na hora, por quem loga
+        self._thread = threading.Thread(target=self._loop, daemon=True, name=f"job-log-{job.pk}")
+        self._thread.start()
+
+    def _safe_append(self, ev):
+        try:
+            with self._cond:
+                while len(self.events) >= self.batch_size * 10 and self._thread.is_alive():
+                    self._cond.wait(0.5)
+                self._seq += 1
+                self.events.append((self._seq, ev))
+                self.level_counts[ev.get("level") or "info"] += 1
+                if self._closed:
+                    # depois do close (ex.: "Falha fatal" ao marcar o job): grava já
+                    batch, self.events = self.events, []
+                    self._insert(batch)
+                elif len(self.events) >= self.batch_size:
+                    self._cond.notify_all()
+        except Exception:
+            self.dropped += 1  # nunca derruba a importação por erro de log
+
+    def close(self):
+        """
+        Grava os eventos pendentes e encerra a thread (chamar no fim do job).
+        Eventos logados depois disso são gravados na hora, um a um.
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        with self._cond:
+            self._closed = True
+            batch, self.events = self.events, []  # logados enquanto a thread saía
+            if batch:
+                self._insert(batch)
+
+    # --- thread gravadora ------------------------------------------------------
+    def _loop(self):
+        try:
+            while True:
+                with self._cond:
+                    if not self._closing and len(self.events) < self.batch_size:
+                        self._cond.wait(self.flush_seconds)
+                    batch, self.events = self.events, []
+                    closing = self._closing
+                    self._cond.notify_all()
+                if batch:
+                    self._write(batch)
+                if closing and not self.events:
+                    break
+        finally:
+            connection.close()  # conexão própria desta thread
+
+    def _write(self, batch):
+        close_old_connections()
+        self._insert(batch)
+
+    def _insert(self, batch):
+        for _ in range(3):
+            try:
+                with transaction.atomic():
+                    ImportEvent.objects.bulk_create(
+                        [ImportEvent.from_event(self.job_id, seq + self._offset, ev) for seq, ev in batch],
+                        batch_size=self.batch_size,
+                    )
+                self.written += len(batch)
+                return
+            except IntegrityError:
+                last = ImportEvent.objects.filter(job_id=self.job_id).aggregate(m=Max("seq"))["m"] or 0
+                self._offset = last + 1 - batch[0][0]
+            except Exception:
+                break
+        self.dropped += len(batch)
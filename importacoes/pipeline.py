@@ -0,0 +1,67 @@
+# importacoes/pipeline.py
+from __future__ import annotations
+
+import queue
+import threading
+import time
+
+
+# =============================================================================
+# Listagem -> artigos em fluxo (produtor/consumidor)
+#   - As seções (produtoras) colocam URLs novas numa fila limitada assim que
+#     são descobertas; o engine de artigos (consumidor) itera a fila e começa
+#     a baixar antes de a listagem terminar.
+#   - Fila cheia = quem produz espera (backpressure): URLs em memória ficam
+#     limitadas a `maxsize` mais o que o engine tem em voo.
+#   - close() marca o fim; abort() destrava o produtor se o consumidor morrer.
+# =============================================================================
+
+_END = object()
+
+
+class LinkStream:
+    """Fila limitada de URLs de artigo entre a listagem e o engine."""
+
+    def __init__(self, maxsize: int = 500):
+        self.maxsize = max(1, maxsize)
+        self._queue: queue.Queue = queue.Queue(maxsize=self.maxsize)
+        self._aborted = threading.Event()
+        self.put_count = 0
+        self.blocked_seconds = 0.0  # tempo do produtor esperando vaga (backpressure)
+
+    def put(self, url: str) -> bool:
+        """Enfileira (bloqueia com a fila cheia). False se o consumidor abortou."""
+        t0 = time.monotonic()
+        while not self._aborted.is_set():
+            try:
+                self._queue.put(url, timeout=0.5)
+            except queue.Full:
+                continue
+            self.put_count += 1
+            self.blocked_seconds += time.monotonic() - t0
+            return True
+        return False
+
+    def close(self):
+        """Fim da produção: o consumidor termina depois de esvaziar a fila."""
+        while not self._aborted.is_set():
+            try:
+                self._queue.put(_END, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def abort(self):
+        self._aborted.set()
+
+    def __iter__(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._aborted.is_set():
+                    return
+                continue
+            if item is _END:
+                return
+            yield item
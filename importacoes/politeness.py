@@ -0,0 +1,285 @@
+# importacoes/politeness.py
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from .budget import DeadlineExceeded
+
+
+# =============================================================================
+# Orçamento de coleta do processo (todas as importações juntas)
+#   - Teto global de requisições em voo (IMPORTS_MAX_IN_FLIGHT): N importações
+#     simultâneas com pools de 8 threads não viram 8*N requisições de uma vez;
+#     as threads excedentes esperam a vez.
+#   - Por host (netloc): teto de requisições simultâneas
+#     (IMPORTS_PER_HOST_CONNECTIONS) e token bucket (IMPORTS_HOST_RATE req/s,
+#     rajada de IMPORTS_HOST_BURST). Várias ImportConfig do mesmo veículo
+#     dividem o mesmo host e, portanto, os mesmos limites.
+#   - Ordem de aquisição: host -> taxa -> global. Quem espera por um host
+#     ocupado/limitado não segura vaga global que outro host poderia usar.
+#   - O token bucket é por reserva (devolve quanto esperar): serve às threads
+#     (time.sleep) e ao engine async (asyncio.sleep) com o mesmo estado.
+#   - O engine async usa os mesmos semáforos (`aslot`). `SharedSemaphore` tem
+#     uma fila FIFO única de quem espera (threads e corrotinas de qualquer
+#     event loop): o `release` entrega a vaga direto ao primeiro da fila e o
+#     acorda (Event / future), sem polling. Threads e corrotinas (seções,
+#     artigos, qualquer engine) somam no mesmo teto global e por host.
+#   - Reserva do token bucket sem requisição (prazo estourou ou corrotina
+#     cancelada na espera) é devolvida ao bucket.
+# =============================================================================
+
+WAIT_STEP = 0.5  # intervalo em que quem espera confere o prazo do job (stop)
+
+
+class TokenBucket:
+    """Token bucket por reserva (thread-safe): `reserve()` diz quanto esperar pela vez."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1  # negativo = fila de reservas à frente
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self) -> None:
+        """Devolve uma reserva que não virou requisição."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+class _Waiter:
+    """Quem espera vaga num SharedSemaphore: thread (Event) ou corrotina (future do seu loop)."""
+
+    __slots__ = ("granted", "event", "loop", "future")
+
+    def __init__(self, loop=None):
+        self.granted = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self) -> bool:
+        """Entrega a vaga (chamado com o lock do semáforo). False se não há mais quem acordar."""
+        if self.loop is None:
+            self.granted = True
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:  # event loop já fechado
+            return False
+        self.granted = True
+        return True
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class SharedSemaphore:
+    """
+    Semáforo limitado para threads e corrotinas, com fila FIFO de espera.
+    Quem espera confere `stop()` a cada WAIT_STEP sem perder o lugar na fila.
+    """
+
+    def __init__(self, value: int):
+        self._initial = self._value = value
+        self._lock = threading.Lock()
+        self._waiters: deque[_Waiter] = deque()
+
+    def _try_take(self, loop=None) -> _Waiter | None:
+        """Pega a vaga na hora (None) ou entra na fila (devolve o _Waiter)."""
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return None
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Desistiu da espera: sai da fila ou, se a vaga já veio, repassa-a."""
+        with self._lock:
+            if not waiter.granted:
+                if waiter in self._waiters:  # fora da fila = wake() falhou (loop fechado)
+                    self._waiters.remove(waiter)
+                return
+        self.release()
+
+    def acquire(self, url: str = "", stop=None) -> None:
+        waiter = self._try_take()
+        if waiter is None:
+            return
+        try:
+            while not waiter.event.wait(WAIT_STEP):
+                if stop is not None and stop():
+                    raise DeadlineExceeded(url)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def acquire_async(self, url: str = "", stop=None) -> None:
+        waiter = self._try_take(asyncio.get_running_loop())
+        if waiter is None:
+            return
+        try:
+            while not waiter.granted:
+                await asyncio.wait([waiter.future], timeout=WAIT_STEP)
+                if not waiter.granted and stop is not None and stop():
+                    raise DeadlineExceeded(url)
+        except BaseException:  # inclusive CancelledError
+            self._abandon(waiter)
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                if self._waiters.popleft().wake():
+                    return
+            if self._value >= self._initial:
+                raise ValueError("SharedSemaphore liberado mais vezes que adquirido")
+            self._value += 1
+
+
+def host_key(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class CrawlBudget:
+    def __init__(self, max_in_flight: int = 32, per_host: int = 4,
+                 rate: float | None = None, burst: int = 1):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.per_host = max(1, int(per_host))
+        self.rate = rate or None
+        self.burst = burst
+        self._global = SharedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._hosts: dict[str, tuple[SharedSemaphore, TokenBucket | None]] = {}
+        # observabilidade (e testes): em voo agora e pico, global e por host
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._host_in_flight: dict[str, int] = {}
+        self.host_peak: dict[str, int] = {}
+
+    def _host(self, key: str):
+        with self._lock:
+            entry = self._hosts.get(key)
+            if entry is None:
+                bucket = TokenBucket(self.rate, self.burst) if self.rate else None
+                entry = self._hosts[key] = (SharedSemaphore(self.per_host), bucket)
+            return entry
+
+    def _count(self, key: str, delta: int):
+        with self._lock:
+            self.in_flight += delta
+            n = self._host_in_flight[key] = self._host_in_flight.get(key, 0) + delta
+            if delta > 0:
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                self.host_peak[key] = max(self.host_peak.get(key, 0), n)
+
+    @staticmethod
+    def _sleep(seconds: float, url: str, stop=None):
+        end = time.monotonic() + seconds
+        while (left := end - time.monotonic()) > 0:
+            if stop is not None and stop():
+                raise DeadlineExceeded(url)
+            time.sleep(min(left, WAIT_STEP))
+
+    @staticmethod
+    async def _sleep_async(seconds: float, url: str, stop=None):
+        end = time.monotonic() + seconds
+        while (left := end - time.monotonic()) > 0:
+            if stop is not None and stop():
+                raise DeadlineExceeded(url)
+            await asyncio.sleep(min(left, WAIT_STEP))
+
+    @contextmanager
+    def slot(self, url: str, stop=None):
+        """
+        Vaga para uma requisição a `url` (bloqueia até os limites permitirem).
+        Devolve os segundos esperados. Com `stop()` verdadeiro durante a espera,
+        levanta DeadlineExceeded sem ter feito a requisição.
+        """
+        key = host_key(url)
+        host_sem, bucket = self._host(key)
+        t0 = time.monotonic()
+        host_sem.acquire(url, stop)
+        try:
+            try:
+                if bucket is not None:
+                    self._sleep(bucket.reserve(), url, stop)
+                self._global.acquire(url, stop)
+            except BaseException:
+                if bucket is not None:
+                    bucket.refund()  # a reserva não virou requisição
+                raise
+            try:
+                self._count(key, +1)
+                try:
+                    yield time.monotonic() - t0
+                finally:
+                    self._count(key, -1)
+            finally:
+                self._global.release()
+        finally:
+            host_sem.release()
+
+    @asynccontextmanager
+    async def aslot(self, url: str, stop=None):
+        """`slot` para corrotinas: mesmos limites, esperando sem bloquear o event loop."""
+        key = host_key(url)
+        host_sem, bucket = self._host(key)
+        t0 = time.monotonic()
+        await host_sem.acquire_async(url, stop)
+        try:
+            try:
+                if bucket is not None:
+                    await self._sleep_async(bucket.reserve(), url, stop)
+                await self._global.acquire_async(url, stop)
+            except BaseException:  # inclusive CancelledError
+                if bucket is not None:
+                    bucket.refund()
+                raise
+            try:
+                self._count(key, +1)
+                try:
+                    yield time.monotonic() - t0
+                finally:
+                    self._count(key, -1)
+            finally:
+                self._global.release()
+        finally:
+            host_sem.release()
+
+
+_BUDGET: CrawlBudget | None = None
+_BUDGET_LOCK = threading.Lock()
+
+
+def crawl_budget() -> CrawlBudget:
+    """Orçamento único do processo (limites em settings), compartilhado por todas as importações."""
+    global _BUDGET
+    with _BUDGET_LOCK:
+        if _BUDGET is None:
+            _BUDGET = CrawlBudget(
+                max_in_flight=getattr(settings, "IMPORTS_MAX_IN_FLIGHT", 32),
+                per_host=getattr(settings, "IMPORTS_PER_HOST_CONNECTIONS", None) or 4,
+                rate=getattr(settings, "IMPORTS_HOST_RATE", None),
+                burst=getattr(settings, "IMPORTS_HOST_BURST", 1),
+            )
+        return _BUDGET
@@ -1,44 +1,174 @@
 # importacoes/scheduler.py
-from threading import Thread, Event
-import time
+from __future__ import annotations
+
+import heapq
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
-from django.db import close_old_connections
-
-from .models import ImportConfig, ImportStatus
-from .services import run_import
-
-_started = False
-_stop_event = Event()
-
-def _due_configs():
-    now = timezone.now()
-    qs = ImportConfig.objects.filter(enabled=True)
-    due = []
-    for cfg in qs:
-        if cfg.status == ImportStatus.RUNNING:
-            continue
-        last = cfg.last_run_at
-        if last is None or (now - last).total_seconds() >= (cfg.interval_minutes or 20) * 60:
-            due.append(cfg.id)
-    return due
-
-def _loop():
-    while not _stop_event.is_set():
-        try:
-            close_old_connections()  # higiene p/ threads
-            ids = _due_configs()
-            for cid in ids:
-                Thread(target=run_import, args=(cid,), daemon=True, name=f"import-{cid}").start()
-        except Exception:
-            # não matar o loop se algo der errado
-            pass
-        # aguarda 60s (pode reduzir se quiser mais responsivo)
-        _stop_event.wait(60)
-
-def start_scheduler():
-    global _started
-    if _started:
-        return
-    t = Thread(target=_loop, daemon=True, name="imports-scheduler")
-    t.start()
-    _started = True
+
+from .jobqueue import enqueue_import
+from .models import ImportConfig, ImportJob, ImportStatus
+
+# =============================================================================
+# Agendamento: roda dentro do `import_worker` (não mais no processo web)
+#   - Cada ImportConfig guarda `next_run_at` (indexado com `enabled`):
+#     last_run_at + intervalo, recalculado ao editar e ao iniciar cada job.
+#   - O worker mantém um heap (next_run_at, id): dorme até o topo vencer e
+#     enfileira só o que venceu — O(log n) por execução, sem varrer a tabela.
+#   - Edições chegam por um cursor em `updated_at` (índice), consultado a cada
+#     `refresh` segundos: config nova/editada/desabilitada entra no heap na hora.
+#     A consulta relê uma janela antes do cursor (CURSOR_OVERLAP_SECONDS): um
+#     save cujo commit sai depois de um updated_at maior já visto não se perde.
+#     Linhas da janela já aplicadas (mesmo updated_at) são ignoradas.
+#   - Intervalo adaptativo: o job que termina regrava next_run_at sem mexer em
+#     updated_at; o worker que o executou chama `reload()` para a config.
+#   - Vários workers: cada um tem o seu heap; a vez de uma config é "tomada"
+#     com UPDATE condicional em next_run_at (só um vence) e a constraint de um
+#     job QUEUED por importação fecha a corrida restante.
+# =============================================================================
+
+RETRY_BUSY_SECONDS = 60  # config vencida com job ainda ativo: olha de novo depois
+CURSOR_OVERLAP_SECONDS = 60  # folga do cursor para transações que commitam atrasadas
+# o que ImportConfig.current_interval() lê (intervalo fixo ou adaptativo)
+SCHEDULE_FIELDS = (
+    "next_run_at", "interval_minutes", "adaptive_interval", "effective_interval_minutes",
+    "min_interval_minutes", "max_interval_minutes",
+)
+
+
+def _active_jobs():
+    return ImportJob.objects.filter(
+        config_id=OuterRef("pk"), status__in=[ImportStatus.QUEUED, ImportStatus.RUNNING],
+    )
+
+
+def take_turn(config_id: int, now=None) -> bool:
+    """
+    Se a config venceu e não tem job ativo, avança next_run_at (UPDATE condicional)
+    e enfileira. True se enfileirou agora.
+    """
+    now = now or timezone.now()
+    config = (
+        ImportConfig.objects.filter(pk=config_id, enabled=True, next_run_at__lte=now)
+        .filter(~Exists(_active_jobs()))
+        .only(*SCHEDULE_FIELDS)
+        .first()
+    )
+    if config is None:
+        return False
+    won = ImportConfig.objects.filter(pk=config_id, next_run_at=config.next_run_at).update(
+        next_run_at=now + timedelta(minutes=config.current_interval()),
+    )
+    if not won:
+        return False  # outro worker levou esta vez
+    _, created = enqueue_import(config_id)
+    return created
+
+
+def due_configs(now=None) -> list[int]:
+    """Configs vencidas (consulta no índice (enabled, next_run_at))."""
+    now = now or timezone.now()
+    return list(
+        ImportConfig.objects.filter(enabled=True, next_run_at__lte=now)
+        .order_by("next_run_at").values_list("id", flat=True)
+    )
+
+
+def enqueue_due(now=None) -> list[int]:
+    """Enfileira de uma vez todas as importações vencidas; devolve os ids enfileirados."""
+    now = now or timezone.now()
+    return [cid for cid in due_configs(now) if take_turn(cid, now)]
+
+
+class HeapScheduler:
+    """Heap de próximas execuções de um worker (entradas antigas são ignoradas no pop)."""
+
+    def __init__(self):
+        self._heap: list[tuple] = []
+        self._next: dict[int, object] = {}  # config_id -> next_run_at vigente
+        self._cursor = None                 # maior updated_at já visto
+        self._seen: dict[int, object] = {}  # config_id -> updated_at já aplicado
+
+    def __len__(self):
+        return len(self._next)
+
+    def _push(self, config_id: int, when):
+        if when is None:
+            self._next.pop(config_id, None)  # desabilitada: a entrada velha vira lixo
+            return
+        self._next[config_id] = when
+        heapq.heappush(self._heap, (when, config_id))
+
+    def load(self) -> int:
+        """Carga inicial (uma vez por worker)."""
+        self._heap, self._next = [], {}
+        rows = ImportConfig.objects.filter(enabled=True).values_list("id", "next_run_at", "updated_at")
+        for cid, when, updated in rows:
+            self._push(cid, when or timezone.now())
+            self._seen[cid] = updated
+            if self._cursor is None or updated > self._cursor:
+                self._cursor = updated
+        return len(self._next)
+
+    def refresh(self) -> int:
+        """Aplica as configs criadas/editadas desde o último cursor (índice em updated_at)."""
+        qs = ImportConfig.objects.all()
+        if self._cursor is not None:
+            qs = qs.filter(updated_at__gte=self._cursor - timedelta(seconds=CURSOR_OVERLAP_SECONDS))
+        changed = 0
+        for cid, enabled, when, updated in qs.values_list("id", "enabled", "next_run_at", "updated_at"):
+            if self._seen.get(cid) == updated:
+                continue  # já aplicada (janela de folga)
+            self._seen[cid] = updated
+            self._push(cid, (when or timezone.now()) if enabled else None)
+            if self._cursor is None or updated > self._cursor:
+                self._cursor = updated
+            changed += 1
+        return changed
+
+    def reload(self, config_ids) -> int:
+        """Relê next_run_at das configs indicadas (ex.: após um job reagendar a própria config)."""
+        ids = set(config_ids)
+        if not ids:
+            return 0
+        rows = dict(ImportConfig.objects.filter(pk__in=ids, enabled=True).values_list("id", "next_run_at"))
+        for cid in ids:
+            when = (rows[cid] or timezone.now()) if cid in rows else None
+            if when is None or self._next.get(cid) != when:
+                self._push(cid, when)
+        return len(ids)
+
+    def seconds_until_next(self, now=None) -> float | None:
+        """Quanto dormir até o topo vencer (None = heap vazio)."""
+        self._drop_stale()
+        if not self._heap:
+            return None
+        now = now or timezone.now()
+        return max(0.0, (self._heap[0][0] - now).total_seconds())
+
+    def _drop_stale(self):
+        while self._heap and self._next.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def dispatch_due(self, now=None) -> list[int]:
+        """Enfileira as configs vencidas do topo do heap e as reagenda. Devolve as enfileiradas."""
+        now = now or timezone.now()
+        queued = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, cid = heapq.heappop(self._heap)
+            self._next.pop(cid, None)
+            if take_turn(cid, now):
+                queued.append(cid)
+            # o banco é a verdade: reagenda pelo next_run_at atual
+            row = ImportConfig.objects.filter(pk=cid).values_list("enabled", "next_run_at").first()
+            if row is None or not row[0]:
+                continue  # removida/desabilitada
+            when = row[1]
+            if when is None or when <= now:
+                when = now + timedelta(seconds=RETRY_BUSY_SECONDS)  # job ainda ativo
+            self._push(cid, when)
+        return queued
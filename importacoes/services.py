@@ -1,285 +1,159 @@
 # importacoes/services.py
 from __future__ import annotations
 
-import re
-import json
 import concurrent.futures
-import traceback
-from datetime import datetime
+import threading
+import time
+from functools import partial
 from urllib.parse import urljoin
 
 import requests
 from lxml import html
-from dateutil import parser as dateparser
 
-from django.db import transaction
+from django.conf import settings
 from django.utils import timezone
 
-from veiculos.models import Section
+from dashboard.stats import invalidate_cache as invalidate_dashboard_cache
 from noticias.models import News
 from .models import ImportConfig, ImportJob, ImportStatus
+from .adaptive import next_interval
+from .budget import Deadline, DeadlineExceeded
+from .conditional import ListingCache
+from .fetcher import DEFAULT_HEADERS, HttpClient
+from .jobqueue import finish_job
+from .engines import get_engine
+from .joblog import JsonLogger
+from .persistence import ImportEventLogger, NewsWriter, SectionResolver
+from .pipeline import LinkStream
+from .extraction import (
+    _strings_from_nodes, GENERIC_LISTING_XPATHS, article_xpaths, xpath_cache_key, run_extraction,
+)
 
 
 # =============================================================================
 # HTTP utilitário
 # =============================================================================
 
-DEFAULT_HEADERS = {
-    "User-Agent": "NewsScraperEdu/1.0 (+https://example.local)",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-}
-
-def _fetch(url: str, timeout: int = 25) -> html.HtmlElement:
+def _fetch(url: str, timeout: int = 25, client: HttpClient | None = None, stop=None,
+           listing: ListingCache | None = None) -> html.HtmlElement | None:
     """
     Faz GET e devolve um HtmlElement (lxml). Levanta HTTPError p/ status != 200.
+    Com `client`, reaproveita as conexões keep-alive do pool da importação
+    (e espera a vez no orçamento de coleta; `stop` interrompe a espera).
+    Com `listing`, o GET é condicional: None = página sem mudanças (304).
     """
+    if client is not None and listing is not None:
+        return listing.fetch(client, url, timeout=timeout, stop=stop)
+    if client is not None:
+        return client.fetch(url, timeout=timeout, stop=stop)
     resp = requests.get(url, headers=DEFAULT_HEADERS, timeout=timeout)
     resp.raise_for_status()
     return html.fromstring(resp.content)
 
-
-# =============================================================================
-# Helpers de XPath e texto
-# =============================================================================
-
-def _text(nodes, default: str = "") -> str:
-    """
-    Concatena o texto de uma lista de nós/strings, já com trim e remoção de vazio.
-    """
-    if not nodes:
-        return default
-    parts: list[str] = []
-    for n in nodes:
-        if isinstance(n, str):
-            s = n.strip()
-            if s:
-                parts.append(s)
-        elif hasattr(n, "text_content"):
-            s = n.text_content().strip()
-            if s:
-                parts.append(s)
-    return " ".join(parts).strip()
-
-def _strings_from_nodes(nodes) -> list[str]:
-    """
-    Extrai hrefs/strings a partir de resultados de XPath (string ou elemento).
-    """
-    out: list[str] = []
-    for n in nodes:
-        if isinstance(n, str):
-            s = n.strip()
-            if s:
-                out.append(s)
-        else:
-            href = n.get("href")
-            if href:
-                out.append(href)
-            else:
-                inner = n.xpath(".//@href")
-                if inner:
-                    out.append(inner[0])
-    return out
+def _http_status(exc: Exception):
+    """Status HTTP de uma exceção de requests ou aiohttp (None se não for HTTP)."""
+    resp = getattr(exc, "response", None)
+    code = getattr(resp, "status_code", None)
+    if code is None:
+        code = getattr(exc, "status", None)
+    return code
 
 
 # =============================================================================
-# Logger estruturado (vai para job.log como JSON)
-#   - Seguro: nunca derruba a importação por erro de log.
-#   - Convenção de níveis: info | ok | warn | skip | error
-#   - 'stage' é SEMPRE keyword-only (obrigatório passar como stage="...")
+# Delta crawl: descobre, antes do GET, quais URLs já estão em News
 # =============================================================================
 
-class JsonLogger:
-    def __init__(self):
-        self.events = []
-
-    def _event(self, level, msg, *, stage=None, url=None, xpath=None, **extra):
-        return {
-            "level": level,                          # 'info' | 'ok' | 'warn' | 'skip' | 'error'
-            "msg": str(msg).strip(),
-            "stage": stage or "",
-            "url": url or "",
-            "xpath": xpath or "",
-            "ts": datetime.now().strftime("%H:%M:%S"),
-            **({k: v for k, v in extra.items() if v is not None}),
-        }
+DELTA_CHUNK_SIZE = 500  # mantém o IN (...) abaixo do limite de parâmetros do SQLite
 
-    def _safe_append(self, ev):
-        try:
-            self.events.append(ev)
-        except Exception as e:
-            # Não deixa o logger quebrar a execução
-            self.events.append({
-                "level": "error",
-                "msg": f"[logger-fail] {type(e).__name__}: {e}",
-                "stage": "logger",
-                "ts": datetime.now().strftime("%H:%M:%S"),
-            })
-
-    # A partir daqui, 'stage' é keyword-only graças ao "*"
-    def info(self, msg, *, stage=None, **extra): self._safe_append(self._event("info", msg, stage=stage, **extra))
-    def ok  (self, msg, *, stage=None, **extra): self._safe_append(self._event("ok"  , msg, stage=stage, **extra))
-    def warn(self, msg, *, stage=None, **extra): self._safe_append(self._event("warn", msg, stage=stage, **extra))
-    def skip(self, msg, *, stage=None, **extra): self._safe_append(self._event("skip", msg, stage=stage, **extra))
-
-    def error(self, msg, *, stage=None, exc: Exception | None = None, **extra):
-        # Inclui tipo e traceback curto se for exceção Python
-        if exc is not None and "trace" not in extra:
-            extra["trace"] = traceback.format_exc(limit=6)
-            extra["exc_type"] = type(exc).__name__
-        self._safe_append(self._event("error", msg, stage=stage, **extra))
-
-
-# =============================================================================
-# Parser de data PT-BR tolerante (robusto a ruídos comuns)
-# =============================================================================
-
-PT_WEEKDAYS = [
-    "segunda", "segunda-feira", "terca", "terça", "terça-feira",
-    "quarta", "quarta-feira", "quinta", "quinta-feira",
-    "sexta", "sexta-feira", "sabado", "sábado", "domingo",
-]
-
-PT_MONTHS = {
-    r"janeiro|jan": "January",
-    r"fevereiro|fev": "February",
-    r"mar[cç]o|mar": "March",
-    r"abril|abr": "April",
-    r"maio|mai": "May",
-    r"junho|jun": "June",
-    r"julho|jul": "July",
-    r"agosto|ago": "August",
-    r"setembro|set": "September",
-    r"outubro|out": "October",
-    r"novembro|nov": "November",
-    r"dezembro|dez": "December",
-}
-
-_CLEAN_TAIL = [
-    r"\batualizado[:\s]*.*$",  # remove tudo após "Atualizado:"
-    r"\bpublicado[:\s]*.*$",
-    r"\|\s*.*$",               # barra vertical e o resto
-    r"–\s*.*$", r"—\s*.*$",    # travessão e o resto
-]
-
-def parse_news_datetime(raw: str) -> datetime | None:
+def existing_news_urls(vehicle_id: int, urls) -> set[str]:
     """
-    Converte variações PT-BR para datetime "aware".
-    Ex.: 'Quarta-Feira, 20 de Agosto de 2025, 11h:30 | Atualizado: ...'
-         '20/08/2025 14:03', '2025-08-21T14:03-04:00', '21 ago 2025 10h'
+    Devolve o subconjunto de `urls` que já existe em News para o veículo.
+    Consulta em blocos, aproveitando o índice de `uniq_news_vehicle_url`.
     """
-    if not raw:
-        return None
-
-    txt = " ".join(str(raw).strip().split())
-    low = txt
-
-    # 1) corta cauda (Atualizado:, pipes, travessão)
-    for pat in _CLEAN_TAIL:
-        low = re.sub(pat, "", low, flags=re.IGNORECASE).strip()
-
-    # 2) remove dia da semana
-    for wd in PT_WEEKDAYS:
-        low = re.sub(rf"\b{wd}\b,?", "", low, flags=re.IGNORECASE)
-
-    # 3) normaliza conectores/horários
-    low = re.sub(r"\bàs\b|\bas\b", " ", low, flags=re.IGNORECASE)
-    low = re.sub(r"\bde\b", " ", low, flags=re.IGNORECASE)
-    low = re.sub(r"(\d{1,2})h[:]?(\d{2})", r"\1:\2", low)  # 11h30 / 11h:30 -> 11:30
-    low = re.sub(r"(\d{1,2})h(?!\d)", r"\1:00", low)       # 11h -> 11:00
-
-    # 4) meses PT -> EN (dateutil entende melhor)
-    for pt_regex, en in PT_MONTHS.items():
-        low = re.sub(rf"\b({pt_regex})\b", en, low, flags=re.IGNORECASE)
-
-    candidate = " ".join(low.split(",")).strip()
-
-    # 5) tenta com dateutil
-    dt = None
-    try:
-        dt = dateparser.parse(candidate, dayfirst=True, fuzzy=True)
-    except Exception:
-        dt = None
-
-    # 6) fallback dd/mm/aaaa (c/ hora opcional)
-    if dt is None:
-        m = re.search(
-            r"(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})(?:\s+(\d{1,2}):(\d{2})(?::(\d{2}))?)?",
-            candidate,
+    urls = list(urls)
+    found: set[str] = set()
+    for i in range(0, len(urls), DELTA_CHUNK_SIZE):
+        chunk = urls[i:i + DELTA_CHUNK_SIZE]
+        found.update(
+            News.objects.filter(vehicle_id=vehicle_id, url__in=chunk).values_list("url", flat=True)
         )
-        if m:
-            d, mth, y, hh, mm, ss = m.groups()
-            y = int("20" + y) if len(y) == 2 else int(y)
-            hh = int(hh) if hh else 0
-            mm = int(mm) if mm else 0
-            ss = int(ss) if ss else 0
-            try:
-                dt = datetime(y, int(mth), int(d), hh, mm, ss)
-            except Exception:
-                dt = None
-
-    if dt:
-        if timezone.is_naive(dt):
-            dt = timezone.make_aware(dt, timezone.get_current_timezone())
-        return dt
-    return None
+    return found
 
 
 # =============================================================================
-# XPaths genéricos de fallback
+# Execução da importação
 # =============================================================================
 
-GENERIC_LISTING_XPATHS = [
-    "//article//a/@href",
-    "//h2//a/@href",
-    "//h3//a/@href",
-    "//a[contains(@href,'/noticia') or contains(@href,'/news') or contains(@href,'/materia')]/@href",
-]
-
-GENERIC_CONTENT_XPATHS = [
-    "//article//p",
-    "//main//p",
-    "//*[contains(@class,'content') or contains(@class,'article')]//p",
-]
-
-META_DATE_FALLBACKS = [
-    "//meta[@property='article:published_time']/@content",
-    "//meta[@itemprop='datePublished']/@content",
-    "//meta[@name='pubdate']/@content",
-    "//time/@datetime",
-    "//*[contains(@class,'date')][1]",
-]
-
+def _log_http_stats(log: JsonLogger, client: HttpClient):
+    """Registra no job o reaproveitamento de conexões do pool HTTP."""
+    try:
+        st = client.stats()
+        log.info(
+            f"HTTP: {st['requests']} requisições em {st['connections']} conexões ({st['reused']} reaproveitadas)",
+            stage="http-pool", **st,
+        )
+    except Exception as e:
+        log.warn(f"Sem estatísticas do pool HTTP: {e}", stage="http-pool")
 
-# =============================================================================
-# Execução da importação
-# =============================================================================
 
-def run_import(config_id: int, max_workers: int = 8, timeout: int = 25) -> ImportJob:
+def run_import(config_id: int, max_workers: int = 8, timeout: int = 25, engine: str | None = None,
+               job: ImportJob | None = None) -> ImportJob:
     """
     Executa uma importação completa e retorna o Job criado.
-    Salva o log estruturado (JSON) em ImportJob.log.
+    O log estruturado é gravado em lotes em ImportEvent durante a execução
+    (ImportJob.log fica só para jobs antigos).
+    `engine` escolhe como os artigos são baixados ("threads" | "async");
+    o padrão vem de settings.IMPORTS_ENGINE.
+    `job`: job já tirado da fila pelo import_worker (status RUNNING); sem ele,
+    um job novo é criado (execução direta, ex.: bench/shell).
     """
+    engine = get_engine(engine)
     config = ImportConfig.objects.select_related("vehicle").get(pk=config_id)
 
-    job = ImportJob.objects.create(config=config, status=ImportStatus.RUNNING)
-    log = JsonLogger()
+    if job is None:
+        job = ImportJob.objects.create(config=config, status=ImportStatus.RUNNING)
+    log = ImportEventLogger(job)
     log.info(f"Início da importação: '{config.name}'", stage="start", url=config.vehicle.url)
 
+    # Orçamento de tempo (job e etapas) + cancelamento pedido pela tela do job
+    deadline = Deadline(
+        getattr(settings, "IMPORTS_JOB_MAX_SECONDS", None),
+        getattr(settings, "IMPORTS_STAGE_MAX_SECONDS", None),
+    ).watch(job.pk)
+
     # Atualiza status da config
     config.status = ImportStatus.RUNNING
     config.last_run_at = timezone.now()
-    config.save(update_fields=["status", "last_run_at"])
+    config.next_run_at = config.compute_next_run_at()  # reancora o agendamento no início real
+    config.save(update_fields=["status", "last_run_at", "next_run_at"])
 
     found_links: set[str] = set()
     new_count = 0
+    skipped_count = 0
+    writer: NewsWriter | None = None
+    refresh_run = config.refresh_due(config.last_run_at)
+    first_news_seconds = None
+    # GET condicional das listagens (não no refresh, que relê tudo)
+    listing = ListingCache(config, enabled=getattr(settings, "IMPORTS_CONDITIONAL_GET", True) and not refresh_run)
+
+    # Pool keep-alive compartilhado pelas threads de artigo
+    client = HttpClient(
+        max_workers=max_workers,
+        per_host=getattr(settings, "IMPORTS_PER_HOST_CONNECTIONS", None),
+        timeout=timeout,
+    )
 
     try:
         # ---------------------------------------------------------------------
         # 0) Homepage
         # ---------------------------------------------------------------------
+        deadline.stage("homepage")
         try:
-            root = _fetch(config.vehicle.url, timeout=timeout)
-            log.ok("GET 200 (homepage)", stage="http-get", url=config.vehicle.url)
+            root = _fetch(config.vehicle.url, timeout=deadline.timeout(timeout), client=client, listing=listing)
+            if root is None:
+                log.skip("GET 304 (homepage sem mudanças)", stage="http-get", url=config.vehicle.url)
+            else:
+                log.ok("GET 200 (homepage)", stage="http-get", url=config.vehicle.url)
         except requests.exceptions.HTTPError as e:
             code = getattr(e.response, "status_code", "?")
             log.error(f"HTTP {code} ao acessar homepage", stage="http-get", url=config.vehicle.url, exc=e)
@@ -292,9 +166,13 @@ def run_import(config_id: int, max_workers: int = 8, timeout: int = 25) -> Impor
         # 1) Editorias (opcional)
         # ---------------------------------------------------------------------
         editorial_urls: set[str] = set()
+        editorial_failed = False
         lines = [l.strip() for l in (config.editorial_xpaths or "").splitlines() if l.strip()]
 
-        if lines:
+        if lines and root is None:
+            editorial_urls.update(listing.stored_links(config.vehicle.url))
+            log.info(f"Homepage sem mudanças: {len(editorial_urls)} editoria(s) da última leitura", stage="editorial")
+        elif lines:
             for xp in lines:
                 try:
                     nodes = root.xpath(xp)
@@ -303,25 +181,88 @@ def run_import(config_id: int, max_workers: int = 8, timeout: int = 25) -> Impor
                         editorial_urls.add(urljoin(config.vehicle.url, h))
                     log.ok(f"Editorias encontradas: {len(hrefs)}", stage="editorial", xpath=xp)
                 except Exception as e:
+                    editorial_failed = True
                     log.error("Falha ao executar XPath de editoria", stage="editorial", xpath=xp, exc=e)
+            if not editorial_failed:  # lista incompleta não pode valer para o próximo 304
+                listing.remember_links(config.vehicle.url, editorial_urls)
         else:
             log.info("Sem XPaths de editoria; usando homepage como seção única", stage="editorial")
 
         section_urls = editorial_urls or {config.vehicle.url}
 
         # ---------------------------------------------------------------------
-        # 2) Links de notícia por seção
+        # 2) Listagem e artigos em fluxo:
+        #    seções (em paralelo) -> URLs novas (dedupe + delta) -> fila
+        #    limitada -> engine de artigos, que começa a baixar enquanto a
+        #    listagem ainda roda. Tudo nos limites do orçamento de coleta.
         # ---------------------------------------------------------------------
-        for sec_url in section_urls:
+        xpaths = article_xpaths(config)
+        xpaths_key = xpath_cache_key(config)
+
+        not_fetched: list[str] = []  # pulados por prazo/cancelamento
+        failed_articles: list[str] = []  # download/extração falhou (a gravação é do writer)
+        link_sections: dict[str, set[str]] = {}  # URL de artigo -> páginas de listagem onde apareceu
+
+        def process_article(aurl: str, content_bytes: bytes | None, fetch_error: Exception | None) -> int:
+            """Recebe o download feito pelo engine; extrai (pool opcional) e enfileira p/ gravação."""
+            stage = "article"
             try:
-                sec_root = root if sec_url == config.vehicle.url else _fetch(sec_url, timeout=timeout)
-                if sec_root is not root:
-                    log.ok("GET 200 (seção)", stage="http-get", url=sec_url)
+                if isinstance(fetch_error, DeadlineExceeded):
+                    not_fetched.append(aurl)
+                    return 0
+                if fetch_error is not None:
+                    failed_articles.append(aurl)
+                    code = _http_status(fetch_error)
+                    if code is not None:
+                        log.error(f"HTTP {code} no artigo", stage=stage, url=aurl, exc=fetch_error)
+                    else:
+                        log.error("Falha ao carregar artigo", stage=stage, url=aurl, exc=fetch_error)
+                    return 0
+
+                rec = run_extraction(content_bytes, aurl, xpaths, xpaths_key)
+                log.extend(rec["events"])
+                if not rec["ok"]:
+                    failed_articles.append(aurl)
+                    return 0
+                rec.pop("events", None)
+                writer.submit(rec)  # gravação em lote pela thread escritora
+                return 1
+
             except Exception as e:
-                log.error("Falha ao carregar seção", stage="listing", url=sec_url, exc=e)
-                continue
+                # Qualquer falha inesperada no artigo
+                failed_articles.append(aurl)
+                log.error("Falha ao processar artigo", stage=stage, url=aurl, exc=e)
+                return 0
 
-            found_here = 0
+        def visit_section(sec_url: str) -> set[str] | None:
+            """Baixa e lê uma seção (roda no pool). None = não visitada (prazo/cancelamento)."""
+            if deadline.expired("listing"):
+                return None
+            t0 = time.perf_counter()
+            fetch_ms = 0
+            if sec_url == config.vehicle.url:
+                sec_root = root
+            else:
+                try:
+                    sec_root = _fetch(sec_url, timeout=deadline.timeout(timeout), client=client,
+                                     stop=partial(deadline.expired, "listing"), listing=listing)
+                except DeadlineExceeded:
+                    return None
+                except Exception as e:
+                    log.error("Falha ao carregar seção", stage="listing", url=sec_url, exc=e,
+                              elapsed_ms=round((time.perf_counter() - t0) * 1000))
+                    return set()
+                fetch_ms = round((time.perf_counter() - t0) * 1000)
+                if sec_root is not None:
+                    log.ok("GET 200 (seção)", stage="http-get", url=sec_url, elapsed_ms=fetch_ms)
+            if sec_root is None:
+                # 304: os links desta página já passaram por uma execução completa
+                unchanged_sections.append(sec_url)
+                log.skip("GET 304 (seção sem mudanças)", stage="http-get", url=sec_url,
+                         elapsed_ms=round((time.perf_counter() - t0) * 1000))
+                return set()
+
+            links: set[str] = set()
 
             # Tenta o XPath configurado
             if (config.listing_link_xpath or "").strip():
@@ -329,8 +270,7 @@ def run_import(config_id: int, max_workers: int = 8, timeout: int = 25) -> Impor
                     listing_nodes = sec_root.xpath(config.listing_link_xpath)
                     hrefs = _strings_from_nodes(listing_nodes)
                     for h in hrefs:
-                        found_links.add(urljoin(sec_url, h))
-                    found_here += len(hrefs)
+                        links.add(urljoin(sec_url, h))
                     if hrefs:
                         log.ok(f"Links coletados: {len(hrefs)}", stage="listing", url=sec_url, xpath=config.listing_link_xpath)
                     else:
@@ -339,215 +279,198 @@ def run_import(config_id: int, max_workers: int = 8, timeout: int = 25) -> Impor
                     log.error("Erro no XPath de listagem; tentando fallbacks", stage="listing", url=sec_url, xpath=config.listing_link_xpath, exc=e)
 
             # Fallbacks genéricos, se necessário
-            if found_here == 0:
+            if not links:
                 for xp in GENERIC_LISTING_XPATHS:
                     try:
                         nodes = sec_root.xpath(xp)
                         hrefs2 = _strings_from_nodes(nodes)
                         for h in hrefs2:
-                            found_links.add(urljoin(sec_url, h))
+                            links.add(urljoin(sec_url, h))
                         if hrefs2:
-                            found_here += len(hrefs2)
                             log.ok(f"Fallback de listagem ok: {len(hrefs2)}", stage="listing", url=sec_url, xpath=xp)
                             break
                     except Exception:
                         continue
 
-        log.info(f"Total de links únicos: {len(found_links)}", stage="listing")
-
-        # ---------------------------------------------------------------------
-        # 3) Processamento de artigos (em paralelo)
-        # ---------------------------------------------------------------------
-        def _first_text(xps: list[str], doc: html.HtmlElement) -> str:
-            for xp in xps:
-                try:
-                    val = _text(doc.xpath(xp))
-                    if val:
-                        log.ok("XPath de fallback executado", stage="xpath", where="fallback", xpath=xp)
-                        return val
-                except Exception:
-                    continue
-            return ""
-
-        def process_article(aurl: str) -> int:
-            stage = "article"
+            total_ms = round((time.perf_counter() - t0) * 1000)
+            log.info(f"Seção lida em {total_ms} ms ({len(links)} links)", stage="section-timing", url=sec_url,
+                     elapsed_ms=total_ms, fetch_ms=fetch_ms, parse_ms=total_ms - fetch_ms, count=len(links))
+            if listing.same_links(sec_url, links):
+                # mesmos links da última execução completa: sem delta nem artigos
+                # (os links ainda contam em found/skipped do job)
+                unchanged_sections.append(sec_url)
+                log.skip(f"Seção sem novidade: mesmos {len(links)} links da última execução",
+                         stage="fingerprint", url=sec_url, count=len(links))
+            return links
+
+        if refresh_run and config.delta_crawl:
+            log.info("Refresh periódico: reprocessando também as URLs já existentes", stage="delta")
+
+        deadline.stage("listing")
+        stream = LinkStream(getattr(settings, "IMPORTS_LINK_QUEUE_SIZE", 500))
+        sections = SectionResolver(config.vehicle) if xpaths["section"] else None
+        writer = NewsWriter(config.vehicle, log, sections=sections).start()
+        engine_errors: list[BaseException] = []
+
+        def consume():
             try:
-                try:
-                    art = _fetch(aurl, timeout=timeout)
-                    log.ok("GET 200 (artigo)", stage="http-get", url=aurl)
-                except requests.exceptions.HTTPError as e:
-                    code = getattr(e.response, "status_code", "?")
-                    log.error(f"HTTP {code} no artigo", stage=stage, url=aurl, exc=e)
-                    return 0
-                except Exception as e:
-                    log.error("Falha ao carregar artigo", stage=stage, url=aurl, exc=e)
-                    return 0
-
-                # --- Título
-                title = ""
-                if (config.article_title_xpath or "").strip():
-                    try:
-                        nodes = art.xpath(config.article_title_xpath)
-                        title = _text(nodes)
-                        log.ok("XPath executado (título)", stage="xpath", xpath=config.article_title_xpath, nodes=len(nodes))
-                    except Exception as e:
-                        log.error("Erro de XPath (título)", stage="xpath", xpath=config.article_title_xpath, url=aurl, exc=e)
-                if not title:
-                    title = _first_text([
-                        "//meta[@property='og:title']/@content",
-                        "//title",
-                        "//*[self::h1 or self::h2][1]"
-                    ], art)
-                if not title:
-                    log.error("Título vazio", stage="article-title", url=aurl)
-                    return 0
-
-                # --- Subtítulo
-                subtitle = ""
-                if (config.article_subtitle_xpath or "").strip():
-                    try:
-                        subtitle = _text(art.xpath(config.article_subtitle_xpath))
-                        log.ok("XPath executado (subtítulo)", stage="xpath", xpath=config.article_subtitle_xpath)
-                    except Exception as e:
-                        log.error("Erro de XPath (subtítulo)", stage="xpath", xpath=config.article_subtitle_xpath, url=aurl, exc=e)
-
-                # --- Autor
-                author = ""
-                if (config.article_author_xpath or "").strip():
-                    try:
-                        author = _text(art.xpath(config.article_author_xpath))
-                        log.ok("XPath executado (autor)", stage="xpath", xpath=config.article_author_xpath)
-                    except Exception as e:
-                        log.error("Erro de XPath (autor)", stage="xpath", xpath=config.article_author_xpath, url=aurl, exc=e)
-
-                # --- Conteúdo
-                content = ""
-                if (config.article_content_xpath or "").strip():
-                    try:
-                        nodes = art.xpath(config.article_content_xpath)
-                        content = _text(nodes)
-                        log.ok("XPath executado (conteúdo)", stage="xpath", xpath=config.article_content_xpath, nodes=len(nodes), chars=len(content))
-                    except Exception as e:
-                        log.error("Erro de XPath (conteúdo)", stage="xpath", xpath=config.article_content_xpath, url=aurl, exc=e)
-                if not content:
-                    for xp in GENERIC_CONTENT_XPATHS:
+                # prazo da listagem não para os artigos; o do job e o cancelamento sim
+                engine.run(stream, process_article, client=client, timeout=deadline.timeout(timeout),
+                           max_workers=max_workers, stop=partial(deadline.expired, "articles"))
+            except BaseException as e:
+                engine_errors.append(e)
+                stream.abort()  # destrava a listagem
+
+        log.info(f"Engine de artigos: {engine.name} (em fluxo com a listagem)", stage="engine")
+        consumer = threading.Thread(target=consume, daemon=True, name=f"import-articles-{job.pk}")
+        consumer.start()
+
+        unchanged_sections: list[str] = []
+        t_listing = time.perf_counter()
+        section_workers = max(1, min(max_workers, len(section_urls)))
+        not_visited = 0
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=section_workers) as ex:
+                futures = {ex.submit(visit_section, u): u for u in section_urls}
+                for fut in concurrent.futures.as_completed(futures):
+                    links_here = fut.result()
+                    if links_here is None:
+                        not_visited += 1
+                        continue
+                    if futures[fut] in unchanged_sections:
+                        # hash igual: todos os links já foram gravados numa execução completa
+                        seen = [u for u in links_here if u not in found_links]
+                        found_links.update(seen)
+                        skipped_count += len(seen)
+                        continue
+                    for u in links_here:
+                        link_sections.setdefault(u, set()).add(futures[fut])
+                    fresh = [u for u in links_here if u not in found_links]
+                    found_links.update(fresh)
+                    # descarta não-http e aplica o delta crawl ao lote desta seção
+                    fresh = [u for u in fresh if isinstance(u, str) and u.startswith("http")]
+                    if fresh and not refresh_run:
                         try:
-                            nodes = art.xpath(xp)
-                            content = _text(nodes)
-                        except Exception:
-                            continue
-                        if content:
-                            log.ok("Fallback de conteúdo", stage="article-content", xpath=xp, nodes=len(nodes), chars=len(content))
+                            existing = existing_news_urls(config.vehicle_id, fresh)
+                        except Exception as e:
+                            existing = set()
+                            log.error("Falha na consulta de URLs existentes; baixando todas", stage="delta", exc=e)
+                        skipped_count += len(existing)
+                        fresh = [u for u in fresh if u not in existing]
+                    for u in fresh:
+                        if not stream.put(u):  # bloqueia com a fila cheia (backpressure)
                             break
-                if not content:
-                    log.error("Conteúdo vazio", stage="article-content", url=aurl)
-                    return 0
-
-                # --- Data de publicação
-                published_at = None
-                if (config.article_date_xpath or "").strip():
-                    try:
-                        ds = _text(art.xpath(config.article_date_xpath))
-                        if ds:
-                            published_at = parse_news_datetime(ds)
-                            if published_at:
-                                log.ok("Data parseada", stage="article-date", value=str(published_at), url=aurl)
-                            else:
-                                log.warn("Data não parseável (usaremos captured_at)", stage="article-date", raw_date=ds, url=aurl)
-                    except Exception as e:
-                        log.error("Erro de XPath (data)", stage="xpath", xpath=config.article_date_xpath, url=aurl, exc=e)
-                if not published_at:
-                    for xp in META_DATE_FALLBACKS:
-                        try:
-                            val = _text(art.xpath(xp))
-                        except Exception:
-                            val = ""
-                        if val:
-                            dt = parse_news_datetime(val)
-                            if dt:
-                                published_at = dt
-                                log.ok("Data parseada (fallback)", stage="article-date-fallback", value=str(dt), xpath=xp, url=aurl)
-                                break
-                if not published_at:
-                    published_at = timezone.now()
-                    log.warn("Usando data/hora da captura", stage="article-date-fallback", value=str(published_at), url=aurl)
-
-                # --- Seção (nome dentro do artigo)
-                section_obj = None
-                if (config.article_section_name_xpath or "").strip():
-                    try:
-                        sname = _text(art.xpath(config.article_section_name_xpath))
-                        if sname:
-                            section_obj, _ = Section.objects.get_or_create(
-                                vehicle=config.vehicle, name=sname[:150]
-                            )
-                            log.ok("Seção identificada", stage="article-section-name", section=sname, url=aurl)
-                    except Exception as e:
-                        log.error("Erro de XPath (seção no artigo)", stage="xpath", xpath=config.article_section_name_xpath, url=aurl, exc=e)
-
-                # --- Persistência
-                with transaction.atomic():
-                    obj, created = News.objects.get_or_create(
-                        vehicle=config.vehicle,
-                        url=aurl,
-                        defaults=dict(
-                            section=section_obj,
-                            title=title,
-                            subtitle=subtitle,
-                            author=author,
-                            published_at=published_at,
-                            content=content,
-                        ),
-                    )
-                    if created:
-                        log.ok("Notícia registrada", stage=stage, article_url=aurl, title=title)
-                        return 1
-                    else:
-                        changed = False
-                        if not obj.section and section_obj:
-                            obj.section = section_obj; changed = True
-                        if not obj.subtitle and subtitle:
-                            obj.subtitle = subtitle; changed = True
-                        if not obj.author and author:
-                            obj.author = author; changed = True
-                        if not obj.published_at and published_at:
-                            obj.published_at = published_at; changed = True
-                        if changed:
-                            obj.save()
-                            log.ok("Notícia atualizada", stage=stage, article_url=aurl, title=title)
-                        else:
-                            log.skip("Notícia já existente (sem mudanças)", stage=stage, article_url=aurl)
-                        return 0
-
-            except Exception as e:
-                # Qualquer falha inesperada no artigo
-                log.error("Falha ao processar artigo", stage=stage, url=aurl, exc=e)
-                return 0
 
-        if found_links:
-            # Limpa e processa (descarta não-http)
-            links = [u for u in found_links if isinstance(u, str) and u.startswith("http")]
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
-                for added in ex.map(process_article, links):
-                    try:
-                        new_count += int(added)
-                    except Exception:
-                        pass
+            if not_visited:
+                log.warn(f"Prazo esgotado: {not_visited} seção(ões) não visitada(s)",
+                         stage="deadline", reason=deadline.stop_reason)
+            log.info(
+                f"Seções: {len(section_urls) - not_visited} lida(s) em {time.perf_counter() - t_listing:.2f}s "
+                f"({section_workers} em paralelo)",
+                stage="section-timing", count=len(section_urls) - not_visited, workers=section_workers,
+                elapsed_ms=round((time.perf_counter() - t_listing) * 1000),
+            )
+            log.info(f"Total de links únicos: {len(found_links)}", stage="listing")
+            if len(unchanged_sections) == len(section_urls):
+                log.info("Nenhuma página de listagem mudou (304 ou mesmos links): nada a baixar", stage="conditional")
+            if not refresh_run:
+                log.info(f"Delta: {skipped_count} já existente(s), {stream.put_count} nova(s) para baixar",
+                         stage="delta", count=skipped_count)
+        finally:
+            stream.close()
+            deadline.stage("articles")  # o resto do job: só os artigos que ainda estão na fila
+            consumer.join()
+            writer.close()  # grava o que já foi extraído, mesmo com o prazo estourado
+        if engine_errors:
+            raise engine_errors[0]
+
+        new_count = writer.created
+        if writer.first_created_at is not None:
+            first_news_seconds = round(writer.first_created_at - deadline.started, 2)
+        log.info(
+            f"Pipeline: {stream.put_count} artigo(s) enviados ao engine; "
+            f"primeira notícia gravada em {first_news_seconds if first_news_seconds is not None else '—'}s",
+            stage="pipeline", count=stream.put_count, first_news_s=first_news_seconds,
+            queue_size=stream.maxsize, producer_blocked_s=round(stream.blocked_seconds, 2),
+        )
+        if not_fetched:
+            log.warn(f"Prazo esgotado: {len(not_fetched)} artigo(s) não baixado(s)",
+                     stage="deadline", count=len(not_fetched), reason=deadline.stop_reason)
+
+        # páginas de listagem com artigo que falhou: mantêm o estado anterior
+        # (sem 304/hash novo), para o artigo voltar na próxima execução
+        dirty_pages = {
+            page for u in set(failed_articles) | writer.failed_urls for page in link_sections.get(u, ())
+        }
+        if editorial_failed:
+            dirty_pages.add(config.vehicle.url)
+        if dirty_pages:
+            listing.discard(dirty_pages)
+            log.info(f"{len(dirty_pages)} página(s) de listagem com falhas: estado anterior mantido",
+                     stage="conditional", count=len(dirty_pages))
 
         # ---------------------------------------------------------------------
         # Finalização OK
         # ---------------------------------------------------------------------
-        log.info("Importação concluída", stage="end", found=len(found_links), new=new_count)
+        _log_http_stats(log, client)
+        stop_reason = deadline.stop_reason
+        if listing.not_modified or listing.same_digest:
+            log.info(
+                f"Listagens sem mudanças: {listing.not_modified} por 304 ({listing.bytes_avoided / 1024:.0f} KB "
+                f"não baixados), {listing.same_digest} pelos mesmos links",
+                stage="conditional", count=listing.not_modified, bytes_avoided=listing.bytes_avoided,
+                same_digest=listing.same_digest,
+            )
+        if not stop_reason:
+            try:
+                listing.save()  # só job completo: validadores/hashes de um job parcial esconderiam links
+            except Exception as e:
+                log.warn(f"Falha ao gravar validadores das listagens: {e}", stage="conditional")
+        if stop_reason:
+            log.warn(
+                f"Importação encerrada antes do fim ({stop_reason}) após {deadline.elapsed():.0f}s; resultados parciais gravados",
+                stage="deadline", reason=stop_reason,
+            )
+        adapted = None
+        if config.adaptive_interval and not stop_reason:  # job parcial subestima o ritmo
+            try:
+                before = config.current_interval()
+                adapted = next_interval(config, job.started_at, new_count, len(found_links))
+                log.info(
+                    f"Intervalo adaptativo: {before} -> {adapted} min",
+                    stage="adaptive", count=adapted, previous=before,
+                )
+            except Exception as e:
+                log.warn(f"Falha ao ajustar o intervalo: {e}", stage="adaptive")
+        log.info("Importação concluída", stage="end", found=len(found_links), new=new_count, skipped=skipped_count)
+        log.close()  # grava os últimos eventos antes de marcar o job como concluído
 
-        job.status = ImportStatus.DONE
+        job.status = ImportStatus.CANCELED if stop_reason == "canceled" else ImportStatus.DONE
+        job.stop_reason = stop_reason
         job.finished_at = timezone.now()
         job.found_count = len(found_links)
         job.new_count = new_count
-        job.log = json.dumps({"events": log.events}, ensure_ascii=False)
-        job.save(update_fields=["status", "finished_at", "found_count", "new_count", "log"])
-
-        config.status = ImportStatus.DONE
-        config.save(update_fields=["status"])
+        job.skipped_count = skipped_count
+        job.first_news_seconds = first_news_seconds
+        job.not_modified_count = listing.not_modified
+        job.bytes_avoided = listing.bytes_avoided
+        if not finish_job(job, ["status", "stop_reason", "finished_at", "found_count", "new_count", "skipped_count",
+                                "first_news_seconds", "not_modified_count", "bytes_avoided"]):
+            # lease perdido: o job já é FAILED e a importação pode estar rodando em outro worker
+            job.refresh_from_db()
+            return job
+
+        config.status = job.status
+        update_fields = ["status"]
+        if refresh_run and config.delta_crawl and not stop_reason:  # refresh parcial não conta
+            config.last_refresh_at = config.last_run_at
+            update_fields.append("last_refresh_at")
+        if adapted is not None:
+            # update_fields não toca updated_at: validadores das listagens continuam valendo
+            config.effective_interval_minutes = adapted
+            config.next_run_at = config.compute_next_run_at()
+            update_fields += ["effective_interval_minutes", "next_run_at"]
+        config.save(update_fields=update_fields)
 
         return job
 
@@ -556,13 +479,24 @@ def run_import(config_id: int, max_workers: int = 8, timeout: int = 25) -> Impor
         # Falha geral
         # ---------------------------------------------------------------------
         log.error(f"Falha fatal: {type(e).__name__}: {e}", stage="fatal", exc=e)
+        _log_http_stats(log, client)
+        log.close()
 
         job.status = ImportStatus.FAILED
         job.finished_at = timezone.now()
-        job.log = json.dumps({"events": log.events}, ensure_ascii=False)
-        job.save(update_fields=["status", "finished_at", "log"])
+        if not finish_job(job, ["status", "finished_at"]):
+            job.refresh_from_db()
+            return job
 
         config.status = ImportStatus.FAILED
         config.save(update_fields=["status"])
 
         return job
+
+    finally:
+        deadline.close()
+        log.close()
+        client.close()
+        # também no caminho de falha: o que o writer já gravou muda os gráficos
+        if writer is not None and writer.created > 0:
+            invalidate_dashboard_cache()
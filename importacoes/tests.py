@@ -1,3 +1,1230 @@
-from django.test import TestCase
+import asyncio
+import io
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.forms.models import model_to_dict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from lxml import html
+
+from noticias.models import DailyNewsCount, News
+from veiculos.models import Section, Vehicle
+from .adaptive import next_interval
+from .budget import Deadline, DeadlineExceeded, cancel_running
+from .conditional import ListingCache
+from . import extraction
+from .engines import AsyncEngine, ThreadedEngine
+from .fetcher import HttpClient
+from .forms import ImportConfigForm
+from .joblog import JsonLogger
+from .jobqueue import _log_event, claim_next, enqueue_import, expire_leases, finish_job, reap_stale, renew_leases
+from .models import ImportConfig, ImportEvent, ImportJob, ImportStatus, ListingPageState
+from .persistence import ImportEventLogger, NewsWriter, SectionResolver, normalize_section_name
+from .pipeline import LinkStream
+from .politeness import CrawlBudget, SharedSemaphore, TokenBucket, host_key
+from .scheduler import HeapScheduler, enqueue_due, take_turn
+from .services import run_import
+from .views import JOBS_PER_PAGE
+
+BIG_LOG = "x" * 200_000  # ImportJob.log de jobs antigos
+
+
+class _LocalSite(BaseHTTPRequestHandler):
+    """Servidor HTTP local dos testes de engine (conta as respostas servidas)."""
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    served = 0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+        type(self).served += 1
+
+    def log_message(self, *args):
+        pass
+
+
+def _local_site(latency: float = 0.0) -> ThreadingHTTPServer:
+    handler = type("Site", (_LocalSite,), {"latency": latency, "served": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class ImportViewsQueryTests(TestCase):
+    """Número de queries constante e ImportJob.log fora das páginas de listagem."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        cls.config = cls._config(cls.vehicle, "padrão")
+
+    @staticmethod
+    def _config(vehicle, name):
+        return ImportConfig.objects.create(
+            vehicle=vehicle, name=name, listing_link_xpath="//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p",
+        )
+
+    def _jobs(self, n, log=BIG_LOG):
+        ImportJob.objects.bulk_create([
+            ImportJob(config=self.config, status=ImportStatus.DONE, found_count=i, new_count=i, log=log)
+            for i in range(n)
+        ])
+
+    def _events(self, job, articles, per_article=3):
+        seq = 0
+        rows = []
+        for a in range(articles):
+            for k in range(per_article):
+                seq += 1
+                rows.append(ImportEvent.from_event(job.pk, seq, {
+                    "level": "error" if k == 0 else "info", "stage": "article",
+                    "msg": "evento", "url": f"https://v.example/{a}", "title": f"Artigo {a}",
+                }))
+        ImportEvent.objects.bulk_create(rows)
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp, ctx.captured_queries
+
+    def assertNoLog(self, queries):
+        for q in queries:
+            self.assertNotIn('"importacoes_importjob"."log"', q["sql"])
+
+    def test_config_list_constant_queries(self):
+        _, small = self._get(reverse("imports:import-list"))
+        for i in range(15):
+            v = Vehicle.objects.create(name=f"V{i}", media_type="site", url=f"https://{i}.example/")
+            self._config(v, "padrão")
+        _, large = self._get(reverse("imports:import-list"))
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), 2)
+
+    def test_config_detail_paginates_jobs_without_log(self):
+        self._jobs(3)
+        _, small = self._get(reverse("imports:import-detail", args=[self.config.pk]))
+        self._jobs(JOBS_PER_PAGE * 3)
+        resp, large = self._get(reverse("imports:import-detail", args=[self.config.pk]))
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), 4)
+        self.assertNoLog(large)
+        self.assertEqual(len(resp.context["jobs"]), JOBS_PER_PAGE)
+        self.assertLess(len(resp.content), len(BIG_LOG))
+
+        resp, queries = self._get(reverse("imports:import-detail", args=[self.config.pk]) + "?page=2")
+        self.assertNoLog(queries)
+        self.assertEqual(resp.context["page_obj"].number, 2)
+        self.assertIsNotNone(resp.context["latest_job"])
+
+    def test_job_detail_constant_queries(self):
+        job = ImportJob.objects.create(config=self.config, status=ImportStatus.DONE)
+        self._events(job, articles=2)
+        _, small = self._get(reverse("imports:job-detail", args=[job.pk]))
+
+        job = ImportJob.objects.create(config=self.config, status=ImportStatus.DONE)
+        self._events(job, articles=200)
+        resp, large = self._get(reverse("imports:job-detail", args=[job.pk]) + "?level=all")
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), 10)
+        self.assertNoLog(large)
+        self.assertEqual(resp.context["paginator"].count, 200)
+
+    def test_job_tail_and_article_events(self):
+        job = ImportJob.objects.create(config=self.config, status=ImportStatus.RUNNING)
+        self._events(job, articles=100)
+        resp, queries = self._get(reverse("imports:job-events", args=[job.pk]) + "?after=10")
+        self.assertLessEqual(len(queries), 2)
+        self.assertNoLog(queries)
+        self.assertEqual(resp.json()["events"][0]["seq"], 11)
+
+        resp, queries = self._get(
+            reverse("imports:job-article-events", args=[job.pk]) + "?url=https://v.example/7&level=all"
+        )
+        self.assertLessEqual(len(queries), 2)
+        self.assertNoLog(queries)
+
+    def test_legacy_job_detail_is_read_only(self):
+        log = ('{"level": "error", "msg": "falhou", "stage": "article", "url": "https://v.example/1", "title": "T1"}\n'
+               '{"level": "info", "msg": "Início", "stage": "start"}')
+        job = ImportJob.objects.create(config=self.config, status=ImportStatus.DONE, log=log)
+        resp, queries = self._get(reverse("imports:job-detail", args=[job.pk]) + "?level=all")
+        for q in queries:
+            self.assertFalse(q["sql"].startswith(("INSERT", "UPDATE", "DELETE")), q["sql"])
+        self.assertEqual(job.events.count(), 0)  # conversão só pelo import_legacy_logs
+        self.assertEqual(resp.context["paginator"].count, 1)
+        self.assertEqual(resp.context["artigos"][0]["title"], "T1")
+        self.assertEqual([e["msg"] for e in resp.context["events_geral"]], ["Início"])
+        self.assertEqual(resp.context["level_counts_all"]["error"], 1)
+
+        resp, _ = self._get(reverse("imports:job-article-events", args=[job.pk]) + "?url=https://v.example/1")
+        self.assertEqual([e["msg"] for e in resp.context["events"]], ["falhou"])
+
+        call_command("import_legacy_logs", stdout=io.StringIO())
+        self.assertEqual(job.events.count(), 2)
+        resp, _ = self._get(reverse("imports:job-detail", args=[job.pk]))
+        self.assertEqual(resp.context["paginator"].count, 1)
+
+
+class ImportQueueTests(TestCase):
+    """Fila de importações: views só enfileiram, um job por importação, claim único."""
+
+    def setUp(self):
+        vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        self.configs = [
+            ImportConfig.objects.create(
+                vehicle=vehicle, name=f"c{i}", listing_link_xpath="//a/@href",
+                article_title_xpath="//h1", article_content_xpath="//p",
+            )
+            for i in range(2)
+        ]
+
+    def test_run_now_enqueues_once(self):
+        cfg = self.configs[0]
+        self.client.get(reverse("imports:import-run", args=[cfg.pk]))
+        self.client.get(reverse("imports:import-run", args=[cfg.pk]))
+        jobs = ImportJob.objects.filter(config=cfg)
+        self.assertEqual(list(jobs.values_list("status", flat=True)), [ImportStatus.QUEUED])
+        cfg.refresh_from_db()
+        self.assertEqual(cfg.status, ImportStatus.QUEUED)
+
+    def test_claim_order_and_busy_config(self):
+        first, _ = enqueue_import(self.configs[0].pk)
+        second, _ = enqueue_import(self.configs[1].pk)
+        job = claim_next("w/0")
+        self.assertEqual((job.pk, job.status, job.worker), (first.pk, ImportStatus.RUNNING, "w/0"))
+
+        # com o job da config 0 rodando, um novo pedido fica na fila atrás dele
+        again, created = enqueue_import(self.configs[0].pk)
+        self.assertTrue(created)
+        self.assertEqual(claim_next("w/1").pk, second.pk)
+        self.assertIsNone(claim_next("w/2"))
+        self.assertEqual(ImportJob.objects.get(pk=again.pk).status, ImportStatus.QUEUED)
+
+    def test_scheduler_only_enqueues_due(self):
+        self.assertEqual(sorted(enqueue_due()), sorted(c.pk for c in self.configs))
+        self.assertEqual(enqueue_due(), [])
+        self.assertFalse(ImportJob.objects.filter(status=ImportStatus.RUNNING).exists())
+
+    def test_lease_expiry_frees_the_config(self):
+        cfg = self.configs[0]
+        enqueue_import(cfg.pk)
+        job = claim_next("w/0")
+        self.assertGreater(job.lease_expires_at, timezone.now())
+        self.assertEqual(renew_leases([job.pk]), set())
+        self.assertNotIn(cfg.pk, enqueue_due())  # lease válido: não agenda de novo
+
+        # worker morreu: sem heartbeat o lease vence
+        ImportJob.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(expire_leases(), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportStatus.FAILED)
+        self.assertEqual(job.events.get().stage, "lease")
+        self.assertEqual(renew_leases([job.pk]), {job.pk})
+        self.assertIn(cfg.pk, enqueue_due())
+
+        # o worker "morto" termina depois: não sobrescreve o FAILED
+        job.status, job.new_count = ImportStatus.DONE, 5
+        self.assertFalse(finish_job(job, ["status", "new_count"]))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.new_count), (ImportStatus.FAILED, 0))
+
+    def test_reaper_frees_stuck_config(self):
+        cfg = self.configs[0]
+        # processo morreu entre marcar a config e gravar o job
+        ImportConfig.objects.filter(pk=cfg.pk).update(status=ImportStatus.RUNNING)
+        self.assertEqual(reap_stale()["configs_reset"], 1)
+        cfg.refresh_from_db()
+        self.assertEqual(cfg.status, ImportStatus.FAILED)
+
+        # job rodado fora do worker (sem lease) e muito além do orçamento
+        job = ImportJob.objects.create(config=cfg, status=ImportStatus.RUNNING)
+        ImportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(reap_stale()["stale"], [job.pk])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.stop_reason), (ImportStatus.FAILED, "stale"))
+
+    def test_cancel(self):
+        queued, _ = enqueue_import(self.configs[0].pk)
+        self.client.post(reverse("imports:job-cancel", args=[queued.pk]))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, ImportStatus.CANCELED)
+        self.assertIsNone(claim_next("w/0"))
+
+        enqueue_import(self.configs[1].pk)
+        running = claim_next("w/0")
+        self.assertEqual(self.client.get(reverse("imports:job-cancel", args=[running.pk])).status_code, 405)
+        self.client.post(reverse("imports:job-cancel", args=[running.pk]))
+        running.refresh_from_db()
+        self.assertEqual(running.status, ImportStatus.RUNNING)
+        self.assertTrue(running.cancel_requested)
+
+
+class HeapSchedulerTests(TestCase):
+    """Agendador por heap: next_run_at gravado, edições pelo cursor e uma vez só por vencimento."""
+
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        self.now = timezone.now()
+
+    def _config(self, name, minutes_ago=None, **kw):
+        cfg = ImportConfig.objects.create(
+            vehicle=self.vehicle, name=name, listing_link_xpath="//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p", **kw,
+        )
+        if minutes_ago is not None:
+            ImportConfig.objects.filter(pk=cfg.pk).update(next_run_at=self.now - timedelta(minutes=minutes_ago))
+        return cfg
+
+    def test_next_run_at(self):
+        cfg = self._config("a", interval_minutes=30)
+        self.assertIsNotNone(cfg.next_run_at)  # nunca rodou: vence já
+        cfg.last_run_at = self.now
+        cfg.save()
+        self.assertEqual(cfg.next_run_at, self.now + timedelta(minutes=30))
+        cfg.enabled = False
+        cfg.save()
+        self.assertIsNone(cfg.next_run_at)
+
+    def test_dispatch_in_order_and_only_due(self):
+        late, later = self._config("late", minutes_ago=5), self._config("later", minutes_ago=10)
+        future = self._config("future")
+        ImportConfig.objects.filter(pk=future.pk).update(next_run_at=self.now + timedelta(hours=1))
+        sched = HeapScheduler()
+        self.assertEqual(sched.load(), 3)
+        self.assertEqual(sched.dispatch_due(self.now), [later.pk, late.pk])
+        self.assertEqual(sched.dispatch_due(self.now), [])
+        # as despachadas voltam ao heap em now + intervalo (20 min), antes da "future"
+        self.assertEqual(sched.seconds_until_next(self.now), 20 * 60)
+        self.assertEqual(ImportJob.objects.filter(status=ImportStatus.QUEUED).count(), 2)
+
+    def test_refresh_picks_up_edits(self):
+        cfg = self._config("a")
+        ImportConfig.objects.filter(pk=cfg.pk).update(next_run_at=self.now + timedelta(hours=1))
+        sched = HeapScheduler()
+        sched.load()
+        self.assertEqual(sched.dispatch_due(self.now), [])
+
+        # editada (via save: updated_at avança) para vencer já; a entrada antiga vira lixo
+        cfg.refresh_from_db()
+        cfg.last_run_at = self.now - timedelta(hours=1)
+        cfg.save()
+        self.assertEqual(sched.refresh(), 1)
+        self.assertEqual(sched.dispatch_due(timezone.now()), [cfg.pk])
+
+        cfg.refresh_from_db()
+        cfg.enabled = False
+        cfg.save()
+        sched.refresh()
+        self.assertEqual(len(sched), 0)
+        self.assertIsNone(sched.seconds_until_next())
+
+    def test_refresh_sees_late_commit(self):
+        early, late = self._config("early"), self._config("late")
+        for cfg in (early, late):
+            ImportConfig.objects.filter(pk=cfg.pk).update(next_run_at=self.now + timedelta(hours=1))
+        sched = HeapScheduler()
+        sched.load()
+        self.assertEqual(sched.refresh(), 0)  # nada novo; a janela não reaplica o que já viu
+
+        # "late" é salva depois (cursor avança); o save de "early" pegou updated_at
+        # antes, mas só commitou agora
+        late.refresh_from_db()
+        late.save()
+        self.assertEqual(sched.refresh(), 1)
+        ImportConfig.objects.filter(pk=early.pk).update(
+            updated_at=late.updated_at - timedelta(seconds=1), next_run_at=self.now - timedelta(minutes=1),
+        )
+        self.assertEqual(sched.refresh(), 1)
+        self.assertEqual(sched.dispatch_due(self.now), [early.pk])
+        self.assertEqual(sched.refresh(), 0)
+
+    def test_take_turn_single_winner(self):
+        cfg = self._config("a", minutes_ago=1)
+        self.assertTrue(take_turn(cfg.pk, self.now))
+        self.assertFalse(take_turn(cfg.pk, self.now))  # next_run_at já avançou
+        ImportConfig.objects.filter(pk=cfg.pk).update(next_run_at=self.now)
+        self.assertFalse(take_turn(cfg.pk, self.now))  # job ainda na fila
+
+
+class DeadlineTests(TestCase):
+    def test_stage_budget_is_local(self):
+        d = Deadline(total_seconds=60, stage_seconds={"listing": 0.001})
+        d.stage("listing")
+        time.sleep(0.01)
+        self.assertFalse(d.expired("articles"))  # artigos em fluxo durante a listagem seguem
+        self.assertTrue(d.expired())
+        d.stage("articles")
+        self.assertFalse(d.expired())
+        self.assertEqual(d.stop_reason, "stage:listing")
+        self.assertLessEqual(d.timeout(25), 60)
+
+    def test_job_budget_and_cancel(self):
+        d = Deadline(total_seconds=0.001)
+        time.sleep(0.01)
+        d.stage("articles")
+        self.assertTrue(d.expired())
+        self.assertEqual(d.stop_reason, "budget")
+        self.assertEqual(d.timeout(25), 1.0)
+        d.cancel()
+        self.assertTrue(d.expired())
+        self.assertEqual(d.stop_reason, "canceled")
+
+    def test_lost_lease_stops_local_job(self):
+        d = Deadline().watch(987_654, poll_seconds=60)
+        try:
+            self.assertTrue(cancel_running(987_654, "lease"))  # heartbeat do worker
+            self.assertTrue(d.expired())
+            self.assertEqual(d.stop_reason, "lease")
+        finally:
+            d.close()
+        self.assertFalse(cancel_running(987_654, "lease"))
+
+
+class DeadlineWatchTests(TransactionTestCase):
+    def test_watcher_stops_job_taken_from_worker(self):
+        vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        cfg = ImportConfig.objects.create(vehicle=vehicle, name="c", listing_link_xpath="//a/@href",
+                                          article_title_xpath="//h1", article_content_xpath="//p")
+        job = ImportJob.objects.create(config=cfg, status=ImportStatus.RUNNING)
+        d = Deadline().watch(job.pk, poll_seconds=0.05)
+        try:
+            self.assertFalse(d.expired())
+            ImportJob.objects.filter(pk=job.pk).update(status=ImportStatus.FAILED, stop_reason="lease")
+            limit = time.monotonic() + 5
+            while not d.expired() and time.monotonic() < limit:
+                time.sleep(0.02)
+            self.assertEqual(d.stop_reason, "lease")
+        finally:
+            d.close()
+
+
+class CrawlBudgetTests(TestCase):
+    """Orçamento de coleta: tetos global e por host, taxa por host e espera interrompível."""
+
+    def test_token_bucket_paces_after_burst(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1, delta=0.02)
+        self.assertAlmostEqual(waits[3], 0.2, delta=0.02)
+
+    def test_global_and_per_host_caps(self):
+        budget = CrawlBudget(max_in_flight=3, per_host=2)
+
+        def hit(url):
+            with budget.slot(url):
+                time.sleep(0.02)
+
+        urls = [f"https://{host}.example/n/{i}" for i in range(6) for host in ("a", "b", "c")]
+        threads = [threading.Thread(target=hit, args=(u,)) for u in urls]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(budget.in_flight, 0)
+        self.assertLessEqual(budget.peak_in_flight, 3)
+        self.assertTrue(all(n <= 2 for n in budget.host_peak.values()))
+
+    def test_async_engine_shares_caps_with_threads(self):
+        server = _local_site(latency=0.02)
+        port = server.server_address[1]
+        budget = CrawlBudget(max_in_flight=3, per_host=2)
+        engine = AsyncEngine(per_job=50, budget=budget)
+        urls = [f"http://{host}:{port}/n/{i}" for i in range(10) for host in ("127.0.0.1", "localhost")]
+        try:
+            with HttpClient(max_workers=4, budget=budget) as client:
+                # "seções" em threads ao mesmo tempo que os artigos no engine async
+                sections = [threading.Thread(target=client.get, args=(f"http://localhost:{port}/s/{i}",))
+                            for i in range(4)]
+                for t in sections:
+                    t.start()
+                results = engine.run(urls, lambda url, content, error: error is None,
+                                     client=client, timeout=10, max_workers=2)
+                for t in sections:
+                    t.join()
+        finally:
+            engine.close()
+            server.shutdown()
+        self.assertEqual(sum(results), len(urls))
+        self.assertEqual(budget.in_flight, 0)
+        self.assertLessEqual(budget.peak_in_flight, 3)
+        self.assertTrue(all(n <= 2 for n in budget.host_peak.values()))
+
+    def test_wait_honours_stop(self):
+        budget = CrawlBudget(per_host=1)
+        with budget.slot("https://a.example/1"):
+            with self.assertRaises(DeadlineExceeded):
+                with budget.slot("https://a.example/2", stop=lambda: True):
+                    pass
+            with budget.slot("https://b.example/1", stop=lambda: True):
+                pass  # outro host: sem espera, o stop nem é consultado
+
+
+    def test_async_waiters_woken_in_order(self):
+        sem = SharedSemaphore(1)
+        order = []
+
+        async def waiter(i):
+            await sem.acquire_async()
+            order.append(i)
+            sem.release()
+
+        async def main():
+            await sem.acquire_async()
+            tasks = [asyncio.create_task(waiter(i)) for i in range(20)]
+            await asyncio.sleep(0.01)
+            t0 = time.monotonic()
+            sem.release()
+            await asyncio.gather(*tasks)
+            return time.monotonic() - t0
+
+        elapsed = asyncio.run(main())
+        self.assertEqual(order, list(range(20)))  # FIFO
+        self.assertLess(elapsed, 0.2)  # acordados no release, sem polling
+
+    def test_threads_and_coroutines_share_one_queue(self):
+        sem = SharedSemaphore(1)
+        order = []
+        sem.acquire()
+        t = threading.Thread(target=lambda: (sem.acquire(), order.append("thread"), sem.release()))
+        t.start()
+        time.sleep(0.05)  # a thread entra na fila primeiro
+
+        async def main():
+            task = asyncio.create_task(sem.acquire_async())
+            await asyncio.sleep(0.01)
+            sem.release()
+            await task
+            order.append("async")
+            sem.release()
+
+        asyncio.run(main())
+        t.join()
+        self.assertEqual(order, ["thread", "async"])
+
+    def test_canceled_async_wait_returns_slot_and_token(self):
+        budget = CrawlBudget(max_in_flight=5, per_host=2, rate=1, burst=1)
+        url = "https://a.example/1"
+
+        async def enter():
+            async with budget.aslot(url):
+                await asyncio.sleep(10)
+
+        async def main():
+            first = asyncio.create_task(enter())  # usa o token da rajada
+            await asyncio.sleep(0.01)
+            second = asyncio.create_task(enter())  # vaga do host ok, esperando o token (~1s)
+            third = asyncio.create_task(enter())  # esperando vaga do host
+            await asyncio.sleep(0.05)
+            for task in (first, second, third):
+                task.cancel()
+            await asyncio.gather(first, second, third, return_exceptions=True)
+
+        asyncio.run(main())
+        self.assertEqual(budget.in_flight, 0)
+        host_sem, bucket = budget._host(host_key(url))
+        self.assertLess(bucket.reserve(), 1.5)  # reserva do cancelado devolvida (senão ~2s)
+        host_sem.acquire(stop=lambda: True)
+        host_sem.acquire(stop=lambda: True)  # as duas vagas do host estão livres (senão DeadlineExceeded)
+
+
+class SectionListingTests(TransactionTestCase):
+    """Seções baixadas em paralelo, com o tempo de cada uma no log do job."""
+
+    def test_sections_fetched_concurrently(self):
+        vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        cfg = ImportConfig.objects.create(
+            vehicle=vehicle, name="c", editorial_xpaths="//nav//a/@href", listing_link_xpath="//article//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p",
+        )
+        home = html.fromstring("<nav>" + "".join(f'<a href="/s/{i}">s</a>' for i in range(6)) + "</nav>")
+
+        def fake_fetch(url, timeout=25, client=None, stop=None, listing=None):
+            if url == vehicle.url:
+                return home
+            time.sleep(0.3)
+            return html.fromstring("<div><p>sem artigos</p></div>")
+
+        t0 = time.perf_counter()
+        with mock.patch("importacoes.services._fetch", side_effect=fake_fetch):
+            job = run_import(cfg.pk, max_workers=6)
+        self.assertLess(time.perf_counter() - t0, 6 * 0.3)  # em série seriam 1,8s
+        self.assertEqual(job.status, ImportStatus.DONE)
+        timings = job.events.filter(stage="section-timing")
+        self.assertEqual(timings.count(), 7)  # 6 seções + resumo
+        self.assertTrue(all(e.extra["elapsed_ms"] >= 300 for e in timings.exclude(url="")))
+
+
+ARTICLE_HTML = """<html><head><meta charset="utf-8"><title>Título da página</title></head><body>
+<span class="secao">Política</span><h1> Câmara aprova projeto </h1><h2>Votação terminou à noite</h2>
+<span class="autor">Ana Souza</span><time>Quarta-Feira, 20 de Agosto de 2025, 11h:30 | Atualizado: 21/08</time>
+<article><p>Primeiro parágrafo.</p><p>Segundo parágrafo.</p></article></body></html>""".encode()
+
+ARTICLE_XPATHS = {
+    "title": "//h1", "subtitle": "//h2", "author": "//span[@class='autor']",
+    "content": "//article//p", "date": "//time", "section": "//span[@class='secao']",
+}
+
+
+class ExtractionTests(TestCase):
+    """Estágio de extração: mesmo registro na thread, no pool de processos e no fallback."""
+
+    URL = "https://v.example/a/1"
+
+    def tearDown(self):
+        with extraction._pool_lock:
+            pool, extraction._pool = extraction._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _fields(self, rec):
+        return {k: v for k, v in rec.items() if k != "events"}
+
+    def _expected(self):
+        return {
+            "url": self.URL, "ok": True, "title": "Câmara aprova projeto", "subtitle": "Votação terminou à noite",
+            "author": "Ana Souza", "content": "Primeiro parágrafo. Segundo parágrafo.", "section_name": "Política",
+            "published_at": timezone.make_aware(datetime(2025, 8, 20, 11, 30)),
+        }
+
+    def test_extract_article(self):
+        rec = extraction.extract_article(ARTICLE_HTML, self.URL, ARTICLE_XPATHS)
+        self.assertEqual(self._fields(rec), self._expected())
+        self.assertFalse([ev for ev in rec["events"] if ev["level"] == "error"])
+
+    def test_missing_content_not_ok(self):
+        rec = extraction.extract_article(b"<html><body><h1>Titulo</h1></body></html>", self.URL, ARTICLE_XPATHS)
+        self.assertFalse(rec["ok"])
+        self.assertEqual(rec["events"][-1]["msg"], "Conteúdo vazio")
+
+    def test_invalid_xpath_logged_with_fallback(self):
+        xpaths = dict(ARTICLE_XPATHS, title="//h1[", content="//div[@id='x'")
+        rec = extraction.extract_article(ARTICLE_HTML, self.URL, xpaths)
+        # título pelos fallbacks (<title>), conteúdo pelo genérico //article//p
+        self.assertEqual(self._fields(rec), dict(self._expected(), title="Título da página"))
+        errors = [(ev["msg"], ev["xpath"]) for ev in rec["events"] if ev["level"] == "error"]
+        self.assertEqual(errors, [("Erro de XPath (título)", "//h1["), ("Erro de XPath (conteúdo)", "//div[@id='x'")])
+
+    @override_settings(IMPORTS_EXTRACTION_PROCESSES=1)
+    def test_process_pool(self):
+        rec = extraction.run_extraction(ARTICLE_HTML, self.URL, ARTICLE_XPATHS, (1, "v1"))
+        self.assertIsNotNone(extraction._pool)
+        self.assertTrue(extraction._pool._processes)  # rodou num processo filho
+        self.assertEqual(self._fields(rec), self._expected())
+        self.assertTrue(rec["events"])  # eventos voltam do processo filho
+
+    @override_settings(IMPORTS_EXTRACTION_PROCESSES=1)
+    def test_broken_pool_falls_back_to_local(self):
+        broken = mock.Mock()
+        broken.submit.return_value.result.side_effect = BrokenProcessPool("filho morreu")
+        extraction._pool = broken
+        rec = extraction.run_extraction(ARTICLE_HTML, self.URL, ARTICLE_XPATHS)
+        self.assertEqual(self._fields(rec), self._expected())
+        self.assertIsNot(extraction._pool, broken)  # pool quebrado descartado; o próximo uso cria outro
+
+
+class CompiledXPathTests(TestCase):
+    """XPaths compilados uma vez por versão da config; inválidos barrados no form."""
+
+    def setUp(self):
+        vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        self.config = ImportConfig.objects.create(
+            vehicle=vehicle, name="c", listing_link_xpath="//article//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p",
+        )
+
+    def test_cache_per_config_version(self):
+        key = extraction.xpath_cache_key(self.config)
+        first = extraction.compiled_xpaths(extraction.article_xpaths(self.config), key)
+        self.assertIs(extraction.compiled_xpaths(extraction.article_xpaths(self.config), key), first)
+
+        self.config.article_title_xpath = "//h2"
+        self.config.save()
+        new_key = extraction.xpath_cache_key(self.config)
+        self.assertNotEqual(new_key, key)
+        second = extraction.compiled_xpaths(extraction.article_xpaths(self.config), new_key)
+        self.assertIsNot(second, first)
+        self.assertEqual(second["title"].path, "//h2")
+
+    def test_form_rejects_invalid_xpath_and_interval(self):
+        data = model_to_dict(self.config)
+        data.update(article_title_xpath="//h1[", adaptive_interval=True, min_interval_minutes=60, max_interval_minutes=10)
+        form = ImportConfigForm(data=data, instance=self.config)
+        self.assertFalse(form.is_valid())
+        self.assertIn("XPath inválido", form.errors["article_title_xpath"][0])
+        self.assertIn("max_interval_minutes", form.errors)
+
+        data.update(article_title_xpath="//h1", max_interval_minutes=120)
+        self.assertTrue(ImportConfigForm(data=data, instance=self.config).is_valid())
+
+
+class SectionResolverTests(TestCase):
+    """Nomes de seção normalizados: espaços e caixa não criam seções duplicadas."""
+
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+
+    def test_normalize_section_name(self):
+        self.assertEqual(normalize_section_name("  Política \n  Nacional "), "Política Nacional")
+        self.assertEqual(normalize_section_name(None), "")
+        self.assertEqual(len(normalize_section_name("x" * 300)), 150)
+
+    def test_same_section_for_variants(self):
+        resolver = SectionResolver(self.vehicle)
+        first = resolver.get(" Política ")
+        self.assertEqual(first.name, "Política")
+        with self.assertNumQueries(0):  # já no cache
+            for name in ("Política", "POLÍTICA", "política\t"):
+                self.assertEqual(resolver.get(name), first)
+        self.assertIsNone(resolver.get("   "))
+        self.assertEqual(Section.objects.filter(vehicle=self.vehicle).count(), 1)
+
+    def test_existing_sections_preloaded(self):
+        old = Section.objects.create(vehicle=self.vehicle, name="Esportes")
+        Section.objects.create(vehicle=self.vehicle, name="ESPORTES")  # duplicata antiga: a mais antiga vence
+        other = Vehicle.objects.create(name="Outro", media_type="site", url="https://o.example/")
+        Section.objects.create(vehicle=other, name="Economia")
+
+        resolver = SectionResolver(self.vehicle)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.get("esportes"), old)
+        resolver.resolve_many(["Economia", " economia ", "Cultura", ""])  # criadas em lote
+        names = set(Section.objects.filter(vehicle=self.vehicle).values_list("name", flat=True))
+        self.assertEqual(names, {"Esportes", "ESPORTES", "Economia", "Cultura"})
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.get("ECONOMIA").vehicle_id, self.vehicle.pk)
+
+
+class NewsWriterTests(TransactionTestCase):
+    """Gravação em lote: novas x existentes, regra de merge, rollup e lote com falha."""
+
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        self.day = timezone.now().replace(year=2024, month=5, day=10, hour=12)
+
+    @staticmethod
+    def _rec(url, **kw):
+        rec = {"url": url, "section_name": "", "title": "Título", "subtitle": "", "author": "",
+               "published_at": None, "content": "texto"}
+        rec.update(kw)
+        return rec
+
+    def _write(self, *recs):
+        writer = NewsWriter(self.vehicle, JsonLogger(), batch_size=50, flush_seconds=0.1).start()
+        for rec in recs:
+            writer.submit(rec)
+        writer.close()
+        return writer
+
+    def _rollup(self):
+        return dict(DailyNewsCount.objects.filter(total__gt=0).values_list("day", "total"))
+
+    def test_new_rows_and_rollup(self):
+        writer = self._write(self._rec("https://v.example/1", published_at=self.day),
+                             self._rec("https://v.example/2", published_at=self.day))
+        self.assertEqual((writer.created, writer.updated), (2, 0))
+        self.assertEqual(News.objects.filter(vehicle=self.vehicle).count(), 2)
+        self.assertEqual(self._rollup(), {timezone.localdate(self.day): 2})
+
+    def test_duplicate_url_merges_empty_fields_only(self):
+        self._write(self._rec("https://v.example/1", author="Ana"))
+        writer = self._write(self._rec("https://v.example/1", author="Outro", subtitle="Sub",
+                                       title="Outro título", published_at=self.day))
+        self.assertEqual((writer.created, writer.updated), (0, 1))
+        news = News.objects.get(url="https://v.example/1")
+        self.assertEqual((news.title, news.author, news.subtitle), ("Título", "Ana", "Sub"))
+        self.assertEqual(news.published_at, self.day)
+        # a notícia mudou do dia da captura para o da publicação; continua contando uma vez
+        self.assertEqual(self._rollup(), {timezone.localdate(self.day): 1})
+
+        writer = self._write(self._rec("https://v.example/1"))
+        self.assertEqual((writer.created, writer.updated, writer.unchanged), (0, 0, 1))
+
+    def test_failed_record_does_not_drop_batch(self):
+        real_write = NewsWriter._write
+
+        def flaky_write(writer, batch):
+            if any(r["url"].endswith("/ruim") for r in batch):
+                raise ValueError("registro inválido")
+            return real_write(writer, batch)
+
+        with mock.patch.object(NewsWriter, "_write", flaky_write):
+            writer = self._write(self._rec("https://v.example/1"), self._rec("https://v.example/ruim"),
+                                 self._rec("https://v.example/3"))
+        self.assertEqual(writer.created, 2)
+        self.assertEqual(writer.failed_urls, {"https://v.example/ruim"})
+        self.assertFalse(News.objects.filter(url="https://v.example/ruim").exists())
+
+
+    def test_db_error_outside_write_keeps_thread_alive(self):
+        with mock.patch("importacoes.persistence.close_old_connections", side_effect=DatabaseError("conexão")):
+            writer = self._write(self._rec("https://v.example/1"), self._rec("https://v.example/2"))
+        self.assertEqual(writer.failed_urls, {"https://v.example/1", "https://v.example/2"})
+        writer = self._write(self._rec("https://v.example/1"))  # a próxima execução grava
+        self.assertEqual(writer.created, 1)
+
+    def test_dead_writer_thread_raises_instead_of_blocking(self):
+        writer = NewsWriter(self.vehicle, JsonLogger(), batch_size=1).start()
+        with mock.patch.object(NewsWriter, "_flush_safe", side_effect=SystemExit):
+            writer.submit(self._rec("https://v.example/1"))
+            writer._thread.join(5)
+        self.assertFalse(writer._thread.is_alive())
+        with self.assertRaises(RuntimeError):  # antes: preso no put quando a fila enchia
+            writer.submit(self._rec("https://v.example/2"))
+        with self.assertRaises(RuntimeError):
+            writer.close()
+
+
+class ImportEventLoggerTests(TransactionTestCase):
+    """Eventos gravados de fora (reaper) não fazem o logger do job perder lotes."""
+
+    def test_seq_taken_by_other_writer(self):
+        vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        config = ImportConfig.objects.create(
+            vehicle=vehicle, name="c", listing_link_xpath="//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p",
+        )
+        job, _ = enqueue_import(config.pk)
+        log = ImportEventLogger(job, batch_size=1, flush_seconds=0.05)
+        log.info("primeiro", stage="listing")
+        for _ in range(100):
+            if log.written:
+                break
+            time.sleep(0.01)
+        _log_event(job.pk, "error", "Lease expirou", "lease")  # usa o seq 2, que o logger ainda vai usar
+        log.info("segundo", stage="article")
+        log.info("terceiro", stage="article")
+        log.close()
+
+        self.assertEqual((log.written, log.dropped), (3, 0))
+        events = list(ImportEvent.objects.filter(job=job).values_list("seq", "msg"))
+        self.assertEqual(events, [(1, "primeiro"), (2, "Lease expirou"), (3, "segundo"), (4, "terceiro")])
+
+    def test_events_after_close_are_written(self):
+        vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        config = ImportConfig.objects.create(
+            vehicle=vehicle, name="c", listing_link_xpath="//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p",
+        )
+        job, _ = enqueue_import(config.pk)
+        log = ImportEventLogger(job)
+        log.info("Importação concluída", stage="end")
+        log.close()
+        log.error("Falha fatal: DatabaseError: locked", stage="fatal")  # ex.: finish_job falhou
+        log.close()  # o finally do job fecha de novo
+        events = list(ImportEvent.objects.filter(job=job).values_list("seq", "level", "stage"))
+        self.assertEqual(events, [(1, "info", "end"), (2, "error", "fatal")])
+        self.assertEqual((log.written, log.dropped), (2, 0))
+
+
+class LinkStreamTests(TestCase):
+    """Listagem -> artigos em fluxo: fila limitada, consumo imediato e abort."""
+
+    class _Client:
+        def get(self, url, timeout=None, stop=None):
+            return mock.Mock(content=url.encode())
+
+    def test_engine_consumes_while_producing(self):
+        stream = LinkStream(maxsize=2)
+        handled = []
+        engine = threading.Thread(target=lambda: ThreadedEngine().run(
+            stream, lambda url, content, error: handled.append(url), client=self._Client(),
+            timeout=5, max_workers=2,
+        ))
+        engine.start()
+        self.assertTrue(stream.put("https://a.example/1"))
+        deadline = time.monotonic() + 2
+        while not handled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(handled, ["https://a.example/1"])  # antes do fim da listagem
+        for i in range(2, 11):
+            stream.put(f"https://a.example/{i}")  # mais que maxsize: o consumidor abre espaço
+        stream.close()
+        engine.join(timeout=5)
+        self.assertEqual(len(handled), 10)
+
+    def test_async_engine_bounds_bodies_waiting_for_handle(self):
+        server = _local_site()
+        site = server.RequestHandlerClass
+        urls = [f"http://127.0.0.1:{server.server_address[1]}/n/{i}" for i in range(30)]
+        engine = AsyncEngine(per_job=4, budget=CrawlBudget(max_in_flight=32, per_host=32))
+        backlog = []
+
+        def slow_handle(url, content, error):
+            backlog.append(site.served - len(backlog))  # baixados e ainda não tratados
+            time.sleep(0.02)  # extração/gravação mais lenta que o download
+
+        try:
+            with HttpClient(budget=engine.budget) as client:
+                engine.run(urls, slow_handle, client=client, timeout=10, max_workers=1)
+        finally:
+            engine.close()
+            server.shutdown()
+        self.assertEqual(len(backlog), 30)
+        self.assertLessEqual(max(backlog), 4)
+
+    def test_full_queue_blocks_until_abort(self):
+        stream = LinkStream(maxsize=1)
+        self.assertTrue(stream.put("https://a.example/1"))
+        results = []
+        producer = threading.Thread(target=lambda: results.append(stream.put("https://a.example/2")))
+        producer.start()
+        producer.join(timeout=0.3)
+        self.assertTrue(producer.is_alive())  # fila cheia: backpressure
+        stream.abort()
+        producer.join(timeout=2)
+        self.assertEqual(results, [False])
+
+
+class ListingCacheTests(TestCase):
+    """GET condicional das listagens: validadores gravados, 304 contado, versão da config."""
+
+    class _Client:
+        """Servidor de mentira: 304 se o If-None-Match bater com o ETag atual."""
+        def __init__(self):
+            self.etag, self.body, self.sent = '"v1"', b"<nav><a href='/s/1'>s</a></nav>", []
+
+        def get(self, url, timeout=None, stop=None, headers=None):
+            self.sent.append(headers or {})
+            if (headers or {}).get("If-None-Match") == self.etag:
+                return mock.Mock(status_code=304, headers={"ETag": self.etag}, content=b"")
+            return mock.Mock(status_code=200, headers={"ETag": self.etag}, content=self.body)
+
+    def setUp(self):
+        vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        self.config = ImportConfig.objects.create(
+            vehicle=vehicle, name="c", listing_link_xpath="//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p",
+        )
+        self.client_http = self._Client()
+        self.url = "https://v.example/"
+
+    def test_not_modified_after_complete_run(self):
+        first = ListingCache(self.config)
+        self.assertIsNotNone(first.fetch(self.client_http, self.url))
+        first.remember_links(self.url, ["https://v.example/s/1"])
+        self.assertEqual(first.save(), 1)
+
+        second = ListingCache(self.config)
+        self.assertIsNone(second.fetch(self.client_http, self.url))
+        self.assertEqual(self.client_http.sent[-1], {"If-None-Match": '"v1"'})
+        self.assertEqual((second.not_modified, second.bytes_avoided), (1, len(self.client_http.body)))
+        self.assertEqual(second.stored_links(self.url), ["https://v.example/s/1"])
+
+        self.client_http.etag = '"v2"'  # página mudou
+        self.assertIsNotNone(ListingCache(self.config).fetch(self.client_http, self.url))
+
+    def test_config_edit_or_refresh_skips_validators(self):
+        cache = ListingCache(self.config)
+        cache.fetch(self.client_http, self.url)
+        cache.save()
+        self.assertEqual(ListingPageState.objects.count(), 1)
+        self.assertEqual(ListingCache(self.config, enabled=False).headers(self.url), {})
+
+        self.config.listing_link_xpath = "//article//a/@href"
+        self.config.save()  # updated_at avança: XPaths novos, validadores velhos não valem
+        self.assertEqual(ListingCache(self.config).headers(self.url), {})
+
+    def test_same_links_fingerprint(self):
+        self.client_http.etag = ""  # site sem validadores
+        links = ["https://v.example/n/1", "https://v.example/n/2"]
+        first = ListingCache(self.config)
+        first.fetch(self.client_http, self.url)
+        self.assertFalse(first.same_links(self.url, links))  # primeira leitura
+        first.save()
+
+        second = ListingCache(self.config)
+        self.assertEqual(second.headers(self.url), {})
+        second.fetch(self.client_http, self.url)
+        self.assertTrue(second.same_links(self.url, list(reversed(links))))  # ordem não importa
+        self.assertFalse(second.same_links(self.url, links + ["https://v.example/n/3"]))
+        self.assertFalse(ListingCache(self.config).same_links(self.url, []))
+
+
+class ListingFailureRetryTests(TransactionTestCase):
+    """Artigo que falhou não fica escondido atrás do 304/hash da página de listagem."""
+
+    HOME = b"<article><a href='/a/1'>1</a><a href='/a/2'>2</a></article>"
+    ARTICLE = b"<html><body><h1>Titulo</h1><p>Texto do artigo</p></body></html>"
+
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        self.config = ImportConfig.objects.create(
+            vehicle=self.vehicle, name="c", listing_link_xpath="//article//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p",
+        )
+        self.etag = '"v1"'
+        self.broken = {"https://v.example/a/2"}
+        self.requests = []
+
+    def _get(self, client, url, timeout=None, stop=None, headers=None):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        if url == self.vehicle.url:
+            if self.etag and headers.get("If-None-Match") == self.etag:
+                return mock.Mock(status_code=304, headers={}, content=b"")
+            return mock.Mock(status_code=200, headers={"ETag": self.etag} if self.etag else {}, content=self.HOME)
+        if url in self.broken:
+            raise requests.HTTPError("500", response=mock.Mock(status_code=500))
+        return mock.Mock(status_code=200, headers={}, content=self.ARTICLE)
+
+    def _run(self):
+        self.requests = []
+        with mock.patch.object(HttpClient, "get", autospec=True, side_effect=self._get):
+            job = run_import(self.config.pk, max_workers=2)
+        self.assertEqual(job.status, ImportStatus.DONE)
+        return job
+
+    def test_not_modified_after_failed_article(self):
+        first = self._run()
+        self.assertEqual(first.new_count, 1)  # /a/2 deu HTTP 500
+
+        # a página não pode virar 304: os validadores do job com falha não foram gravados
+        self.broken.clear()
+        second = self._run()
+        self.assertEqual(self.requests[0], (self.vehicle.url, {}))
+        self.assertEqual(second.new_count, 1)
+        self.assertTrue(News.objects.filter(url="https://v.example/a/2").exists())
+
+        # tudo gravado: agora sim, 304 e nada a baixar
+        third = self._run()
+        self.assertEqual(third.not_modified_count, 1)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_same_links_after_failed_article(self):
+        self.etag = ""  # site sem validadores: vale o hash dos links
+        self.assertEqual(self._run().new_count, 1)
+
+        self.broken.clear()
+        second = self._run()  # mesmos links, mas o hash do job com falha não foi gravado
+        self.assertEqual(second.new_count, 1)
+
+        third = self._run()  # agora sim, seção sem novidade; os links ainda aparecem no job
+        self.assertEqual((third.found_count, third.skipped_count, third.new_count), (2, 2, 0))
+        self.assertEqual(len(self.requests), 1)
+
+
+@override_settings(IMPORTS_CONDITIONAL_GET=False)  # listagem sempre relida: só o delta evita os artigos
+class DeltaCrawlTests(TransactionTestCase):
+    """Delta crawl: URLs já gravadas não são baixadas, exceto no refresh periódico."""
+
+    HOME = b"<article><a href='/a/1'>1</a><a href='/a/2'>2</a></article>"
+    ARTICLE = b"<html><body><h1>Titulo</h1><p>Texto do artigo</p></body></html>"
+
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        self.config = ImportConfig.objects.create(
+            vehicle=self.vehicle, name="c", listing_link_xpath="//article//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p", refresh_existing_hours=24,
+        )
+        self.requests = []
+
+    def _get(self, client, url, timeout=None, stop=None, headers=None):
+        self.requests.append(url)
+        return mock.Mock(status_code=200, headers={}, content=self.HOME if url == self.vehicle.url else self.ARTICLE)
+
+    def _run(self):
+        self.requests = []
+        with mock.patch.object(HttpClient, "get", autospec=True, side_effect=self._get):
+            job = run_import(self.config.pk, max_workers=2)
+        self.assertEqual(job.status, ImportStatus.DONE)
+        self.config.refresh_from_db()
+        return job
+
+    def test_existing_urls_skipped_until_refresh(self):
+        first = self._run()  # primeira execução conta como refresh
+        self.assertEqual((first.found_count, first.new_count, first.skipped_count), (2, 2, 0))
+        refreshed_at = self.config.last_refresh_at
+        self.assertIsNotNone(refreshed_at)
+
+        second = self._run()
+        self.assertEqual((second.found_count, second.new_count, second.skipped_count), (2, 0, 2))
+        self.assertEqual(self.requests, [self.vehicle.url])  # nenhum artigo baixado
+        self.assertEqual(self.config.last_refresh_at, refreshed_at)
+
+        # refresh vencido: relê também as existentes (e atualiza last_refresh_at)
+        ImportConfig.objects.filter(pk=self.config.pk).update(last_refresh_at=refreshed_at - timedelta(hours=25))
+        third = self._run()
+        self.assertEqual((third.new_count, third.skipped_count), (0, 0))
+        self.assertEqual(len(self.requests), 3)
+        self.assertGreater(self.config.last_refresh_at, refreshed_at)
+        self.assertEqual(News.objects.filter(vehicle=self.vehicle).count(), 2)
+
+    def test_delta_disabled_downloads_everything(self):
+        self.config.delta_crawl = False
+        self.config.save()
+        self._run()
+        job = self._run()
+        self.assertEqual((job.new_count, job.skipped_count), (0, 0))
+        self.assertEqual(len(self.requests), 3)
+
+    def test_refresh_due(self):
+        now = timezone.now()
+        cfg = ImportConfig(delta_crawl=True, refresh_existing_hours=6, last_refresh_at=None)
+        self.assertTrue(cfg.refresh_due(now))  # nunca fez refresh
+        cfg.last_refresh_at = now - timedelta(hours=5)
+        self.assertFalse(cfg.refresh_due(now))
+        cfg.last_refresh_at = now - timedelta(hours=6)
+        self.assertTrue(cfg.refresh_due(now))
+        cfg.refresh_existing_hours = 0  # 0 = nunca reprocessa
+        self.assertFalse(cfg.refresh_due(now))
+        cfg.delta_crawl = False  # sem delta: toda execução relê tudo
+        self.assertTrue(cfg.refresh_due(now))
+
+
+class _NewsSite(BaseHTTPRequestHandler):
+    """Site local com homepage (ETag) e artigos, para comparar os engines em `run_import`."""
+    protocol_version = "HTTP/1.1"
+    articles = 30
+
+    def do_GET(self):
+        if self.path == "/":  # homepage com ETag: editorias
+            if self.headers.get("If-None-Match") == '"home-v1"':
+                return self._send(304, b"")
+            return self._send(200, b"<nav><a href='/s/0'>A</a><a href='/s/1'>B</a></nav>", etag='"home-v1"')
+        if self.path.startswith("/s/"):  # seções sem validadores (hash dos links)
+            half = int(self.path[-1])
+            links = "".join(f"<a href='/a/{i}'>{i}</a>" for i in range(half, self.articles, 2))
+            return self._send(200, f"<article>{links}</article>".encode())
+        n = int(self.path.rsplit("/", 1)[-1])
+        body = (f"<html><head><meta charset='utf-8'></head><body><span class='secao'>Seção {n % 3}</span>"
+                f"<h1>Notícia {n}</h1><time>{n % 28 + 1:02d}/08/2025 10:{n % 60:02d}</time>"
+                f"<p>Texto da notícia {n}.</p></body></html>").encode()
+        self._send(200, body)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class EngineParityTests(TransactionTestCase):
+    """Engines async e threads: mesmo ImportJob e mesmas News para o mesmo site."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _NewsSite)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.shutdown)
+        # sem a taxa por host de settings (4 req/s): o teste compara resultados, não ritmo
+        budget = mock.patch("importacoes.politeness._BUDGET", CrawlBudget(max_in_flight=16, per_host=4))
+        budget.start()
+        self.addCleanup(budget.stop)
+
+    def _import_twice(self, engine, host):
+        vehicle = Vehicle.objects.create(name=engine, media_type="site", url=f"http://{host}:{self.server.server_address[1]}/")
+        config = ImportConfig.objects.create(
+            vehicle=vehicle, name=engine, editorial_xpaths="//nav//a/@href", listing_link_xpath="//article//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p", article_date_xpath="//time",
+            article_section_name_xpath="//span[@class='secao']",
+        )
+        counts = []
+        for _ in range(2):  # a 2ª: 304 na homepage e seções com os mesmos links
+            job = run_import(config.pk, max_workers=4, engine=engine)
+            self.assertEqual(job.status, ImportStatus.DONE)
+            counts.append((job.found_count, job.new_count, job.skipped_count, job.not_modified_count))
+        news = sorted(
+            (n.url.split("/", 3)[-1], n.title, n.content, n.published_at, n.section.name)
+            for n in News.objects.filter(vehicle=vehicle).select_related("section")
+        )
+        return counts, news
+
+    def test_same_results(self):
+        threads = self._import_twice("threads", "127.0.0.1")
+        async_ = self._import_twice("async", "localhost")
+        n = _NewsSite.articles
+        self.assertEqual(threads[0], [(n, n, 0, 0), (n, 0, n, 1)])
+        self.assertEqual(async_[0], threads[0])
+        self.assertEqual(len(threads[1]), n)
+        self.assertEqual(async_[1], threads[1])
+
+
+class AdaptiveIntervalTests(TestCase):
+    """Intervalo adaptativo: segue o ritmo observado, com passo suavizado e limites da config."""
+
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        self.now = timezone.now()
+        self.config = ImportConfig.objects.create(
+            vehicle=self.vehicle, name="a", listing_link_xpath="//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p",
+            interval_minutes=60, adaptive_interval=True, min_interval_minutes=10, max_interval_minutes=240,
+        )
+
+    def _jobs(self, *runs):
+        """runs: (minutos atrás, new_count) de jobs completos anteriores."""
+        for minutes_ago, new in runs:
+            job = ImportJob.objects.create(config=self.config, status=ImportStatus.DONE, new_count=new, found_count=50)
+            ImportJob.objects.filter(pk=job.pk).update(started_at=self.now - timedelta(minutes=minutes_ago))
+
+    def test_quiet_site_grows_up_to_max(self):
+        self._jobs((60, 0), (120, 0))
+        with self.settings(IMPORTS_ADAPTIVE_TARGET_NEW=3):
+            self.assertEqual(next_interval(self.config, self.now, 0, 50, self.now), 120)  # no máximo o dobro
+            self.config.effective_interval_minutes = 200
+            self.assertEqual(next_interval(self.config, self.now, 0, 50, self.now), 240)  # limite máximo
+
+    def test_busy_site_shrinks_down_to_min(self):
+        self._jobs((60, 30), (120, 30))  # ~0,5 notícia/min -> ideal 6 min
+        with self.settings(IMPORTS_ADAPTIVE_TARGET_NEW=3):
+            self.assertEqual(next_interval(self.config, self.now, 30, 50, self.now), 30)  # no máximo a metade
+            self.config.effective_interval_minutes = 15
+            self.assertEqual(next_interval(self.config, self.now, 30, 50, self.now), 10)  # limite mínimo
+
+    def test_publication_rate_and_saturation(self):
+        for i in range(48):  # 48 publicações em 24h: 1 a cada 30 min -> ideal 90 min
+            News.objects.create(vehicle=self.vehicle, url=f"https://v.example/n/{i}", title="t", content="c",
+                                published_at=self.now - timedelta(minutes=30 * i + 1))
+        with self.settings(IMPORTS_ADAPTIVE_TARGET_NEW=3, IMPORTS_ADAPTIVE_WINDOW_HOURS=24):
+            self.assertEqual(next_interval(self.config, self.now, 0, 50, self.now), 90)
+            self.assertEqual(next_interval(self.config, self.now, 50, 50, self.now), 90)  # 1ª execução: tudo é novo
+            self._jobs((60, 0))
+            # tudo o que a listagem mostrou era novo: pode ter perdido notícias
+            self.assertEqual(next_interval(self.config, self.now, 50, 50, self.now), 30)
+
+    def test_schedule_uses_effective_interval(self):
+        ImportConfig.objects.filter(pk=self.config.pk).update(
+            effective_interval_minutes=15, next_run_at=self.now - timedelta(minutes=1),
+        )
+        self.assertTrue(take_turn(self.config.pk, self.now))
+        self.config.refresh_from_db()
+        self.assertEqual(self.config.next_run_at, self.now + timedelta(minutes=15))
+
+        # modo desligado numa edição: volta ao intervalo fixo
+        self.config.adaptive_interval = False
+        self.config.last_run_at = self.now
+        self.config.save()
+        self.assertIsNone(self.config.effective_interval_minutes)
+        self.assertEqual(self.config.next_run_at, self.now + timedelta(minutes=60))
+
+    def test_reload_reschedules_finished_config(self):
+        sched = HeapScheduler()
+        sched.load()
+        # o job terminou e encurtou o intervalo (sem mexer em updated_at): refresh não vê
+        ImportConfig.objects.filter(pk=self.config.pk).update(next_run_at=self.now - timedelta(seconds=1))
+        sched.refresh()
+        sched.reload([self.config.pk])
+        self.assertEqual(sched.dispatch_due(self.now), [self.config.pk])
@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     ImportConfigListView, ImportConfigCreateView, ImportConfigUpdateView,
-    ImportConfigDetailView, ImportJobDetailView, run_now, run_all
+    ImportConfigDetailView, ImportJobDetailView, run_now, run_all,
+    job_events, job_article_events, job_log_json, job_cancel,
 )
 
 app_name = "imports"   # <-- ESSENCIAL
@@ -13,5 +14,9 @@ urlpatterns = [
     path("<int:pk>/edit/", ImportConfigUpdateView.as_view(), name="import-update"),
     path("<int:pk>/run/", run_now, name="import-run"),
     path("job/<int:pk>/", ImportJobDetailView.as_view(), name="job-detail"),
+    path("job/<int:pk>/events/", job_events, name="job-events"),
+    path("job/<int:pk>/article-events/", job_article_events, name="job-article-events"),
+    path("job/<int:pk>/log.json", job_log_json, name="job-log-json"),
+    path("job/<int:pk>/cancel/", job_cancel, name="job-cancel"),
     path("run-all/", run_all, name="import-run-all"),
 ]
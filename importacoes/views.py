@@ -1,14 +1,27 @@
-import threading
 import json
-import re
+from collections import Counter
 from django.contrib import messages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DetailView
-from django.shortcuts import redirect, get_object_or_404
-from collections import Counter, defaultdict
+from django.shortcuts import redirect, get_object_or_404, render
+from django.views.decorators.http import require_POST
+from django.core.paginator import Paginator
+from django.db.models import Count, Min, Q
 from .models import ImportConfig, ImportJob, ImportStatus
+from .legacy_log import _parse_log_any, legacy_events
 from .forms import ImportConfigForm
-from .services import run_import
+from .jobqueue import enqueue_import, request_cancel
+
+JOBS_PER_PAGE = 20  # histórico de execuções na página da importação
+
+# colunas da tabela de execuções (nunca o ImportJob.log)
+JOB_LIST_FIELDS = (
+    "id", "config_id", "started_at", "finished_at", "status",
+    "found_count", "new_count", "skipped_count",
+)
 
 class ImportConfigListView(ListView):
     model = ImportConfig
@@ -16,11 +29,39 @@ class ImportConfigListView(ListView):
     context_object_name = "items"
     paginate_by = 20
 
+    def get_queryset(self):
+        # a lista não mostra os XPaths: só o que o template usa (+ veículo no mesmo SELECT)
+        return super().get_queryset().select_related("vehicle").only(
+            "id", "name", "interval_minutes", "enabled", "last_run_at", "status",
+            "adaptive_interval", "effective_interval_minutes", "min_interval_minutes", "max_interval_minutes",
+            "vehicle__id", "vehicle__name",
+        )
+
 class ImportConfigDetailView(DetailView):
     model = ImportConfig
     template_name = "imports/import_detail.html"
     context_object_name = "item"
 
+    def get_queryset(self):
+        return super().get_queryset().select_related("vehicle")
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        # Histórico paginado e sem o log de cada execução (ver job_detail para o log)
+        jobs = self.object.jobs.only(*JOB_LIST_FIELDS).order_by("-started_at", "-id")
+        paginator = Paginator(jobs, JOBS_PER_PAGE)
+        page_obj = paginator.get_page(self.request.GET.get("page"))
+        jobs_page = list(page_obj.object_list)
+        latest = jobs_page[0] if page_obj.number == 1 and jobs_page else jobs.first()
+        ctx.update({
+            "jobs": jobs_page,
+            "latest_job": latest,
+            "page_obj": page_obj,
+            "paginator": paginator,
+            "is_paginated": page_obj.has_other_pages(),
+        })
+        return ctx
+
 class ImportConfigCreateView(CreateView):
     model = ImportConfig
     form_class = ImportConfigForm
@@ -37,10 +78,13 @@ class ImportConfigUpdateView(UpdateView):
     success_url = reverse_lazy("imports:import-list")
 
 def run_now(request, pk: int):
-    cfg = get_object_or_404(ImportConfig, pk=pk)
-    t = threading.Thread(target=run_import, args=(cfg.id,), daemon=True)
-    t.start()
-    messages.success(request, f"Import '{cfg.name}' started.")
+    # só enfileira: quem executa é o `import_worker`
+    cfg = get_object_or_404(ImportConfig.objects.only("id", "name"), pk=pk)
+    _, created = enqueue_import(cfg.id)
+    if created:
+        messages.success(request, f"Import '{cfg.name}' queued.")
+    else:
+        messages.info(request, f"Import '{cfg.name}' is already queued.")
     return redirect("imports:import-list")
 
 
@@ -50,198 +94,231 @@ class ImportJobDetailView(DetailView):
     context_object_name = "job"
 
 
+@require_POST
+def job_cancel(request, pk: int):
+    """Cancela o job: na fila, sai dela; rodando, para no próximo ponto de checagem."""
+    job = get_object_or_404(ImportJob.objects.only("id"), pk=pk)
+    result = request_cancel(job.pk)
+    if result == "canceled":
+        messages.success(request, f"Job #{job.pk} canceled.")
+    elif result == "requested":
+        messages.info(request, f"Cancel requested for job #{job.pk}; it stops after the downloads in flight.")
+    else:
+        messages.warning(request, f"Job #{job.pk} had already finished.")
+    return redirect("imports:job-detail", pk=job.pk)
+
+
 def run_all(request):
     cfg_ids = list(ImportConfig.objects.filter(enabled=True).values_list("id", flat=True))
-    for cid in cfg_ids:
-        threading.Thread(target=run_import, args=(cid,), daemon=True).start()
-    messages.success(request, f"Started {len(cfg_ids)} import(s).")
+    queued = sum(enqueue_import(cid)[1] for cid in cfg_ids)
+    messages.success(request, f"Queued {queued} import(s).")
     return redirect("imports:import-list")
 
 
-# -------------------- FALLBACK p/ logs texto (já tínhamos) --------------------
-def parse_legacy_log_to_events(text: str) -> dict:
-    if not text:
-        return {"events": []}
-    events = []
-    ts_re = re.compile(r"^\[(?P<ts>\d{2}:\d{2}:\d{2})\]\s*")
-    url_re = re.compile(r"(https?://\S+)")
-    stage_re = re.compile(r"\[(?P<stage>[a-zA-Z0-9_\-]+)\]")
-    xp_tail = re.compile(r"\|\s*(?P<xp>//.+)$")
-
-    current_article = None
-    for raw in text.splitlines():
-        line = raw.strip()
-        if not line:
-            continue
-        m_ts = ts_re.match(line)
-        ts = m_ts.group("ts") if m_ts else None
-        body = line[m_ts.end():].strip() if m_ts else line
-        low = body.lower()
-
-        level = "info"
-        if "falha" in low or "error" in low or "exception" in low or "traceback" in low:
-            level = "error"
-        elif "warn" in low or "aviso" in low:
-            level = "warn"
-        elif "skip" in low or "ignorado" in low:
-            level = "skip"
-        elif "xpath ok" in low or "get 200" in low or "ok" in low:
-            level = "ok"
-
-        m_st = stage_re.search(body)
-        stage = (m_st.group("stage") if m_st else None) or (
-            "xpath" if "xpath" in low else "http-get" if "get 200" in low else "log"
-        )
+# -------------------- LOG AO VIVO / DOWNLOAD ----------------------------------
+TAIL_LIMIT = 200  # eventos por chamada do tail
 
-        m_url = url_re.search(body)
-        url = m_url.group(1) if m_url else None
-        if url:
-            current_article = url
-
-        m_xp = xp_tail.search(body)
-        xp = m_xp.group("xp").strip() if m_xp else None
-
-        events.append({
-            "level": level,
-            "stage": stage,
-            "ts": ts,
-            "msg": body,
-            "url": url or current_article,
-            "xpath": xp,
-            "article_url": current_article,
-        })
-    return {"events": events}
-
-# -------------------- NOVOS PARSERS TOLERANTES --------------------------------
-def _split_json_objects(s: str):
-    """Se o log veio como {...}{...}{...}, separa objetos balanceando chaves."""
-    objs = []
-    depth = 0
-    start = None
-    in_str = False
-    esc = False
-    for i, ch in enumerate(s):
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == '\\':
-                esc = True
-            elif ch == '"':
-                in_str = False
-            continue
-        if ch == '"':
-            in_str = True
-            continue
-        if ch == '{':
-            if depth == 0:
-                start = i
-            depth += 1
-        elif ch == '}':
-            depth -= 1
-            if depth == 0 and start is not None:
-                objs.append(s[start:i+1])
-                start = None
-    return objs
-
-def _parse_log_any(job_log: str):
-    """Aceita dict{'events':...}, list, JSONL e objetos concatenados."""
-    if not job_log:
-        return []
-
-    # 1) dict ou list
+def job_events(request, pk: int):
+    """
+    Tail do log: eventos com seq > ?after=, já renderizados com o partial.
+    A tela do job chama em loop enquanto o status for 'running'.
+    """
+    job = get_object_or_404(ImportJob.objects.only("id", "status"), pk=pk)
     try:
-        data = json.loads(job_log)
-        if isinstance(data, dict) and isinstance(data.get("events"), list):
-            return data["events"]
-        if isinstance(data, list):
-            return data
-    except Exception:
-        pass
-
-    # 2) JSON lines (um objeto por linha)
-    events = []
-    has_jsonl = False
-    for line in job_log.splitlines():
-        t = line.strip()
-        if not (t.startswith("{") and t.endswith("}")):
-            continue
-        try:
-            events.append(json.loads(t))
-            has_jsonl = True
-        except Exception:
-            pass
-    if has_jsonl and events:
-        return events
-
-    # 3) Objetos concatenados {...}{...}{...}
-    parts = _split_json_objects(job_log)
-    for p in parts:
-        try:
-            events.append(json.loads(p))
-        except Exception:
-            continue
-    if events:
-        return events
-
-    # 4) Por fim: parser heurístico de texto
-    return parse_legacy_log_to_events(job_log).get("events", [])
+        after = max(0, int(request.GET.get("after") or 0))
+    except ValueError:
+        after = 0
+    rows = list(job.events.filter(seq__gt=after).order_by("seq")[:TAIL_LIMIT])
+    return JsonResponse({
+        "status": job.status,
+        "last_seq": rows[-1].seq if rows else after,
+        "more": len(rows) == TAIL_LIMIT,
+        "events": [
+            {
+                "seq": r.seq,
+                "level": r.level,
+                "html": render_to_string("imports/partials/_event_line.html", {"e": r.as_event()}),
+            }
+            for r in rows
+        ],
+    })
+
+def job_article_events(request, pk: int):
+    """Eventos de um artigo (?url=), em HTML, para o acordeão da tela do job."""
+    job = get_object_or_404(ImportJob.objects.only("id"), pk=pk)
+    aurl = request.GET.get("url") or ""
+    only_errors = (request.GET.get("level") or "error").lower() != "all"
+    q = (request.GET.get("q") or "").strip()
+    qs = _filter_events(job.events.filter(article_url=aurl), only_errors, q)
+    rows = list(qs.order_by("seq")[:ARTICLE_EVENTS_LIMIT + 1])
+    if not rows and not job.events.exists():
+        # job antigo ainda não convertido: lê do job.log, sem gravar
+        rows = [r for r in _filter_rows(legacy_events(job), only_errors, q) if r.article_url == aurl]
+        rows = rows[:ARTICLE_EVENTS_LIMIT + 1]
+    return render(request, "imports/partials/_article_events.html", {
+        "events": [r.as_event() for r in rows[:ARTICLE_EVENTS_LIMIT]],
+        "truncated": len(rows) > ARTICLE_EVENTS_LIMIT,
+        "limit": ARTICLE_EVENTS_LIMIT,
+    })
+
+def job_log_json(request, pk: int):
+    """Download do log completo em JSON ({"events": [...]}), em streaming."""
+    job = get_object_or_404(ImportJob.objects.only("id", "log"), pk=pk)
+
+    def stream():
+        if not job.events.exists() and job.log:
+            yield json.dumps({"events": _parse_log_any(job.log)}, ensure_ascii=False, cls=DjangoJSONEncoder)
+            return
+        yield '{"events": ['
+        for i, ev in enumerate(job.events.order_by("seq").iterator(chunk_size=2000)):
+            yield ("," if i else "") + json.dumps(ev.as_event(), ensure_ascii=False, cls=DjangoJSONEncoder)
+        yield "]}"
+
+    resp = StreamingHttpResponse(stream(), content_type="application/json; charset=utf-8")
+    resp["Content-Disposition"] = f'attachment; filename="job-{job.pk}.json"'
+    return resp
 
 # -------------------- VIEW -----------------------------------------------------
+ARTICLES_PER_PAGE = 25   # grupos de artigo por página
+GERAL_LIMIT = 200        # eventos gerais (sem artigo) exibidos
+ARTICLE_EVENTS_LIMIT = 500  # eventos por artigo no carregamento sob demanda
+
+def _filter_events(qs, only_errors: bool, q: str = ""):
+    """Aplica no queryset o filtro de nível e a busca textual da tela do job."""
+    if only_errors:
+        qs = qs.filter(level="error")
+    if q:
+        qs = qs.filter(Q(msg__icontains=q) | Q(url__icontains=q) | Q(article_url__icontains=q) | Q(xpath__icontains=q))
+    return qs
+
+def _filter_rows(rows, only_errors: bool, q: str = ""):
+    """`_filter_events` para linhas em memória (log de job antigo)."""
+    q = q.casefold()
+    return [
+        r for r in rows
+        if (not only_errors or r.level == "error")
+        and (not q or any(q in v.casefold() for v in (r.msg, r.url, r.article_url, r.xpath)))
+    ]
+
+def _legacy_summary(rows, only_errors: bool, q: str) -> dict:
+    """Contagens, eventos gerais e grupos por artigo de um log antigo, em memória."""
+    visible = _filter_rows(rows, only_errors, q)
+    groups: dict = {}
+    titles: dict = {}
+    for r in visible:
+        if not r.article_url:
+            continue
+        g = groups.setdefault(r.article_url, {"article_url": r.article_url, "total": 0, "errors": 0, "first_seq": r.seq})
+        g["total"] += 1
+        g["errors"] += r.level == "error"
+    for r in rows:
+        title = (r.extra or {}).get("title") or (r.extra or {}).get("article_title")
+        if r.stage == "article" and r.article_url and title:
+            titles.setdefault(r.article_url, title)
+    geral = [r.as_event() for r in visible if not r.article_url]
+    return {
+        "level_counts_all": Counter(r.level for r in rows),
+        "level_counts": Counter(r.level for r in visible),
+        "stage_counts": dict(sorted(Counter(r.stage for r in visible if r.stage).items())),
+        "events_geral": geral[:GERAL_LIMIT],
+        "geral_total": len(geral),
+        "groups": sorted(groups.values(), key=lambda g: (-g["errors"], g["first_seq"])),
+        "titles": titles,
+    }
+
+def _article_titles(job: ImportJob, urls) -> dict:
+    """Título por artigo, tirado dos eventos 'article' que trazem `title` no extra."""
+    titles = {}
+    urls = list(urls)
+    if not urls:
+        return titles
+    rows = (
+        job.events.filter(stage="article", article_url__in=urls)
+        .order_by("seq").values_list("article_url", "extra")
+    )
+    for aurl, extra in rows:
+        if aurl not in titles and isinstance(extra, dict):
+            title = extra.get("title") or extra.get("article_title")
+            if title:
+                titles[aurl] = title
+    return titles
+
 class ImportJobDetailView(DetailView):
     model = ImportJob
     template_name = "imports/job_detail.html"
     context_object_name = "job"
 
+    def get_queryset(self):
+        # ImportJob.log só é lido (sob demanda) para jobs antigos ainda não convertidos
+        return super().get_queryset().select_related("config__vehicle").defer("log")
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         job = self.object
 
-        events = _parse_log_any(job.log or "")
-
-        # Se mesmo assim não deu, cai para plain_log (último recurso)
-        if not events:
-            ctx["plain_log"] = job.log
-            return ctx
-
-        # Filtro: por padrão só ERROS; ?level=all mostra tudo
-        filter_level = (self.request.GET.get("level") or "error").lower()
-        only_errors = filter_level != "all"
-        def visible(e): return (e.get("level") == "error") if only_errors else True
-
-        # Normalização leve (caso alguns produtores usem 'where'/'article'):
-        for e in events:
-            if not e.get("stage") and e.get("where"):
-                e["stage"] = e.get("where")
-            if not e.get("article_url") and e.get("url") and e.get("stage") in {"article", "article-title", "article-content", "article-date", "article-section-name", "article-subtitle", "article-author"}:
-                e["article_url"] = e["url"]
-
-        # Contagens e agrupamentos
-        level_counts_all = Counter(ev.get("level", "info") for ev in events)
-        level_counts = Counter(ev.get("level", "info") for ev in events if visible(ev))
-        stage_counts = Counter(ev.get("stage") for ev in events if ev.get("stage") and visible(ev))
-
-        events_geral = [ev for ev in events if not ev.get("article_url") and visible(ev)]
-
-        by_article = defaultdict(list)
-        for ev in events:
-            aurl = ev.get("article_url")
-            if aurl and visible(ev):
-                by_article[aurl].append(ev)
-
-        artigos = []
-        for aurl, evs in by_article.items():
-            title = next((x.get("article_title") for x in evs if x.get("article_title")), None)
-            artigos.append({"url": aurl, "title": title, "events": evs})
-
-        artigos.sort(key=lambda a: (-sum(1 for ev in a["events"] if ev.get("level") == "error"), (a["title"] or "")))
+        # Job antigo (só job.log): lido em memória, sem gravar num GET
+        # (a conversão para ImportEvent é do comando import_legacy_logs)
+        active = job.status in (ImportStatus.RUNNING, ImportStatus.QUEUED)
+        legacy = None
+        if not active and not job.events.exists():
+            legacy = legacy_events(job)
+            if not legacy:  # nada parseável: plain_log (último recurso)
+                ctx["plain_log"] = job.log
+                return ctx
+
+        # Filtros: por padrão só ERROS (?level=all mostra tudo); ?q= busca texto
+        only_errors = (self.request.GET.get("level") or "error").lower() != "all"
+        q = (self.request.GET.get("q") or "").strip()
+
+        if legacy is not None:
+            summary = _legacy_summary(legacy, only_errors, q)
+            level_counts_all, level_counts = summary["level_counts_all"], summary["level_counts"]
+            stage_counts, groups = summary["stage_counts"], summary["groups"]
+            events_geral, geral_total = summary["events_geral"], summary["geral_total"]
+        else:
+            events = job.events.all()
+            visible = _filter_events(events, only_errors, q)
+
+            # Contagens e agrupamentos no banco (índices (job, level|stage|article_url))
+            level_counts_all = dict(events.order_by().values_list("level").annotate(n=Count("id")))
+            level_counts = dict(visible.order_by().values_list("level").annotate(n=Count("id")))
+            stage_counts = dict(
+                visible.exclude(stage="").order_by("stage").values_list("stage").annotate(n=Count("id"))
+            )
+
+            geral = visible.filter(article_url="").order_by("seq")
+            events_geral = [ev.as_event() for ev in geral[:GERAL_LIMIT]]
+            geral_total = len(events_geral) if len(events_geral) < GERAL_LIMIT else geral.count()
+
+            # Grupos por artigo paginados; os eventos de cada um vêm sob demanda (job_article_events)
+            groups = (
+                visible.exclude(article_url="").order_by().values("article_url")
+                .annotate(total=Count("id"), errors=Count("id", filter=Q(level="error")), first_seq=Min("seq"))
+                .order_by("-errors", "first_seq")
+            )
+        paginator = Paginator(groups, ARTICLES_PER_PAGE)
+        page_obj = paginator.get_page(self.request.GET.get("page"))
+        if legacy is not None:
+            titles = summary["titles"]
+        else:
+            titles = _article_titles(job, [g["article_url"] for g in page_obj])
+        artigos = [
+            {"url": g["article_url"], "title": titles.get(g["article_url"]), "total": g["total"], "errors": g["errors"]}
+            for g in page_obj
+        ]
 
         ctx.update({
             "only_errors": only_errors,
+            "q": q,
             "events_geral": events_geral,
+            "geral_total": geral_total,
             "artigos": artigos,
-            "stage_counts": dict(stage_counts),
-            "level_counts": dict(level_counts),
-            "level_counts_all": dict(level_counts_all),
+            "page_obj": page_obj,
+            "paginator": paginator,
+            "is_paginated": page_obj.has_other_pages(),
+            "stage_counts": stage_counts,
+            "level_counts": level_counts,
+            "level_counts_all": level_counts_all,
             "plain_log": None,  # força o template bonito
         })
         return ctx
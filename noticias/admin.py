@@ -1,8 +1,19 @@
 from django.contrib import admin
+from django.db.models import Q
 from .models import News
+from .search import search_news
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
     list_display = ("title", "vehicle", "section", "published_at", "captured_at")
     list_filter = ("vehicle", "section", "published_at", "captured_at")
     search_fields = ("title", "subtitle", "author", "url", "content")
+
+    def get_search_results(self, request, queryset, search_term):
+        # título/subtítulo/conteúdo pelo índice de busca; url/autor continuam no LIKE
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        by_index = search_news(News.objects.all(), search_term, ranked=False).values("pk")
+        return queryset.filter(
+            Q(pk__in=by_index) | Q(url__icontains=search_term) | Q(author__icontains=search_term)
+        ), False
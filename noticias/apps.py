@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _ensure_search_index(sender, using, **kwargs):
+    # No SQLite, migrações que refazem noticias_news apagam os triggers do FTS5
+    from django.db import connections
+    from .search import ensure_triggers
+
+    ensure_triggers(connections[using])
 
 
 class NoticiasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'noticias'
+
+    def ready(self):
+        post_migrate.connect(_ensure_search_index, sender=self)
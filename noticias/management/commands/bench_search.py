@@ -0,0 +1,91 @@
+# noticias/management/commands/bench_search.py
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from noticias.models import News
+from noticias.search import backend, search_news
+from veiculos.models import Vehicle
+
+WORDS = (
+    "governo eleições prefeitura câmara senado ministério economia inflação juros "
+    "saúde educação segurança polícia trânsito chuva enchente futebol campeonato "
+    "jogador técnico estádio cultura cinema música festival tecnologia empresa mercado "
+    "bolsa dólar exportação agricultura safra soja café energia petróleo Petrobras "
+    "Brasília Nordeste Amazônia desmatamento clima vacina hospital escola universidade"
+).split()
+
+SYLLABLES = ["ba", "ca", "da", "fe", "ga", "la", "ma", "na", "pa", "ra", "sa", "ta", "vi", "ção", "ões", "lho", "nha", "tro"]
+
+# termos de WORDS entram no vocabulário em posições de frequência diferentes
+QUERIES = ["governo", "eleicoes", "futebol campeonato", "petróleo", "desmatamento", "vacina"]
+
+
+def _vocabulary(size: int, rnd: random.Random) -> list[str]:
+    """Vocabulário sintético (palavras de sílabas) com WORDS espalhadas por faixas de frequência."""
+    vocab = {"".join(rnd.choices(SYLLABLES, k=rnd.randint(2, 4))) for _ in range(size * 2)}
+    vocab = list(vocab)[:size]
+    for i, w in enumerate(WORDS):
+        vocab.insert(int(size ** (i / len(WORDS))), w)  # posições log-uniformes: de muito comum a raro
+    return vocab
+
+
+class Command(BaseCommand):
+    help = "Latência da busca de notícias: LIKE (icontains) x índice de busca, numa tabela sintética desfeita no fim."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000)
+        parser.add_argument("--words", type=int, default=300, help="palavras de conteúdo por notícia")
+        parser.add_argument("--vocabulary", type=int, default=20_000, help="tamanho do vocabulário (distribuição de Zipf)")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _populate(self, rows, n_words, vocab_size):
+        vehicle = Vehicle.objects.create(name="bench-search", media_type="site", url="https://bench-search.local/")
+        rnd = random.Random(7)
+        vocab = _vocabulary(vocab_size, rnd)
+        cum, acc = [], 0.0
+        for r in range(len(vocab)):
+            acc += 1 / (r + 1)
+            cum.append(acc)
+        words = lambda k: " ".join(rnd.choices(vocab, cum_weights=cum, k=k))
+        chunk = 5_000
+        for start in range(0, rows, chunk):
+            News.objects.bulk_create([
+                News(
+                    vehicle=vehicle, url=f"https://bench-search.local/n/{i}",
+                    title=words(8), subtitle=words(16), content=words(n_words),
+                )
+                for i in range(start, min(rows, start + chunk))
+            ])
+
+    def _timed(self, fn, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - t0)
+        return best * 1000, result
+
+    def handle(self, *args, **opts):
+        kind = backend()
+        with transaction.atomic():
+            t0 = time.perf_counter()
+            self._populate(opts["rows"], opts["words"], opts["vocabulary"])
+            self.stdout.write(
+                f"{opts['rows']} notícias sintéticas (índice '{kind}' mantido na inserção) em {time.perf_counter() - t0:.1f}s"
+            )
+            self.stdout.write(f"  {'busca':24s} {'LIKE (ms)':>10s} {'índice (ms)':>12s} {'resultados':>11s}")
+            for q in QUERIES:
+                like = lambda: [n.pk for n in News.objects.filter(
+                    Q(title__icontains=q) | Q(subtitle__icontains=q) | Q(content__icontains=q)
+                ).order_by("-published_at", "-captured_at")[:20]]
+                indexed = lambda: [n.pk for n in search_news(News.objects.all(), q)[:20]]
+                count = search_news(News.objects.all(), q, ranked=False).count()
+                t_like, _ = self._timed(like, opts["repeat"])
+                t_idx, _ = self._timed(indexed, opts["repeat"])
+                self.stdout.write(f"  {q:24s} {t_like:10.1f} {t_idx:12.1f} {count:11d}")
+            transaction.set_rollback(True)  # desfaz também as linhas do índice (mesma transação)
+        self.stdout.write("Dados sintéticos descartados (rollback).")
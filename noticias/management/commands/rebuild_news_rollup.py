@@ -0,0 +1,15 @@
+# noticias/management/commands/rebuild_news_rollup.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from noticias.rollup import rebuild
+
+
+class Command(BaseCommand):
+    help = "Refaz o rollup diário do dashboard (DailyNewsCount) a partir de News."
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        n = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{n} linha(s) no rollup em {time.perf_counter() - t0:.2f}s."))
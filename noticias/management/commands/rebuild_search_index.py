@@ -0,0 +1,20 @@
+# noticias/management/commands/rebuild_search_index.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from noticias import search
+
+
+class Command(BaseCommand):
+    help = "Recria o índice de busca de notícias (FTS5 no SQLite, tsvector/GIN no PostgreSQL)."
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        search.rebuild(connection)
+        kind = search.backend()
+        if kind == "like":
+            self.stdout.write(self.style.WARNING("Banco sem suporte a índice de busca; usando icontains."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Índice '{kind}' reconstruído em {time.perf_counter() - t0:.2f}s."))
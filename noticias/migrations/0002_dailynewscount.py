@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+def fill_rollup(apps, schema_editor):
+    """Popula o rollup com as notícias já existentes (mesma conta de noticias.rollup.rebuild)."""
+    News = apps.get_model("noticias", "News")
+    DailyNewsCount = apps.get_model("noticias", "DailyNewsCount")
+    rows = (
+        News.objects
+        .annotate(day=TruncDate(Coalesce("published_at", "captured_at"), tzinfo=timezone.get_current_timezone()))
+        .values("day", "vehicle_id", "vehicle__media_type")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    DailyNewsCount.objects.bulk_create(
+        [
+            DailyNewsCount(day=r["day"], vehicle_id=r["vehicle_id"], media_type=r["vehicle__media_type"], total=r["total"])
+            for r in rows.iterator(chunk_size=5000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noticias', '0001_initial'),
+        ('veiculos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNewsCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('media_type', models.CharField(max_length=20)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['captured_at'], name='noticias_ne_capture_fb4f15_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailynewscount',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_news_counts', to='veiculos.vehicle'),
+        ),
+        migrations.AddIndex(
+            model_name='dailynewscount',
+            index=models.Index(fields=['day'], name='noticias_da_day_59321b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailynewscount',
+            constraint=models.UniqueConstraint(fields=('day', 'vehicle', 'media_type'), name='uniq_dailynewscount_day_vehicle_type'),
+        ),
+        migrations.RunPython(fill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Índice de busca textual (FTS5 no SQLite, tsvector + GIN no PostgreSQL)
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from noticias import search
+
+    if search.install(schema_editor.connection) and schema_editor.connection.vendor == "sqlite":
+        search.rebuild(schema_editor.connection)  # indexa as notícias já existentes
+
+
+def drop_search_index(apps, schema_editor):
+    from noticias import search
+
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noticias', '0002_dailynewscount'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
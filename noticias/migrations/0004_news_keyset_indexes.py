@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noticias', '0003_news_search_index'),
+        ('veiculos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='news',
+            name='noticias_ne_publish_9ef6f8_idx',
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['published_at', 'captured_at', 'id'], name='news_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['vehicle', 'published_at', 'captured_at', 'id'], name='news_vehicle_keyset_idx'),
+        ),
+    ]
@@ -17,10 +17,37 @@ class News(models.Model):
             models.UniqueConstraint(fields=["vehicle", "url"], name="uniq_news_vehicle_url"),
         ]
         indexes = [
-            models.Index(fields=["published_at"]),
+            # paginação por cursor (noticias.pagination); cobre também filtros por published_at
+            models.Index(fields=["published_at", "captured_at", "id"], name="news_keyset_idx"),
+            models.Index(fields=["vehicle", "published_at", "captured_at", "id"], name="news_vehicle_keyset_idx"),
             models.Index(fields=["title"]),
+            models.Index(fields=["captured_at"]),
         ]
         ordering = ["-published_at", "-captured_at"]
 
     def __str__(self):
         return self.title[:60]
+
+
+class DailyNewsCount(models.Model):
+    """
+    Rollup do dashboard: notícias por dia x veículo x tipo de mídia.
+    O dia é a data local de published_at (ou captured_at, se não houver).
+    Mantido pela importação (noticias.rollup) e refeito por `rebuild_news_rollup`.
+    """
+    day = models.DateField()
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="daily_news_counts")
+    media_type = models.CharField(max_length=20)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "vehicle", "media_type"], name="uniq_dailynewscount_day_vehicle_type"),
+        ]
+        indexes = [
+            models.Index(fields=["day"]),
+        ]
+        ordering = ["-day"]
+
+    def __str__(self):
+        return f"{self.day} {self.vehicle_id} {self.media_type}: {self.total}"
@@ -0,0 +1,112 @@
+# noticias/pagination.py
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+
+from django.db import connections
+
+
+# =============================================================================
+# Paginação por cursor (keyset) da lista de notícias
+#   - Ordem: published_at DESC, captured_at DESC, id DESC, com as notícias sem
+#     published_at no fim (igual no SQLite e no PostgreSQL).
+#   - Cada página é um range no índice (published_at, captured_at, id) a partir
+#     do cursor da última linha vista: custo constante em qualquer profundidade,
+#     sem OFFSET e sem COUNT(*).
+#   - Dois segmentos: com published_at (comparação de tupla nas 3 colunas) e
+#     sem published_at (tupla captured_at, id). Uma página pode juntar os dois.
+#   - Contagem opcional limitada (`capped_count`): "mais de N".
+# =============================================================================
+
+COUNT_CAP = 1000
+
+
+def encode_cursor(obj) -> str:
+    raw = json.dumps([
+        obj.published_at.isoformat() if obj.published_at else None,
+        obj.captured_at.isoformat(),
+        obj.pk,
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(value: str | None):
+    """(published_at|None, captured_at, id) ou None se o cursor for inválido."""
+    if not value:
+        return None
+    try:
+        p, c, i = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        return (datetime.fromisoformat(p) if p else None, datetime.fromisoformat(c), int(i))
+    except (ValueError, TypeError):
+        return None
+
+
+def _segment(qs, dated: bool, cursor, forward: bool):
+    """Linhas de um segmento, na direção pedida, depois do cursor (se houver)."""
+    table = qs.model._meta.db_table
+    conn = connections[qs.db]
+    adapt = conn.ops.adapt_datetimefield_value
+    op = "<" if forward else ">"
+
+    qs = qs.filter(published_at__isnull=not dated)
+    if cursor is not None:
+        p, c, i = cursor
+        if dated:
+            qs = qs.extra(
+                where=[f"({table}.published_at, {table}.captured_at, {table}.id) {op} (%s, %s, %s)"],
+                params=[adapt(p), adapt(c), i],
+            )
+        else:
+            qs = qs.extra(
+                where=[f"({table}.captured_at, {table}.id) {op} (%s, %s)"],
+                params=[adapt(c), i],
+            )
+    order = ["published_at", "captured_at", "id"] if dated else ["captured_at", "id"]
+    return qs.order_by(*(f"-{f}" if forward else f for f in order))
+
+
+def keyset_page(qs, *, after: str | None = None, before: str | None = None, size: int = 20) -> dict:
+    """
+    Página de `qs` (News) depois de `after` ou antes de `before` (cursores).
+    Devolve items, has_next/has_previous e os cursores next/previous.
+    """
+    cursor = decode_cursor(before) if before else None
+    forward = cursor is None
+    if forward:
+        cursor = decode_cursor(after)
+
+    # segmentos na ordem de leitura: com data -> sem data (invertido ao voltar)
+    segments = [True, False] if forward else [False, True]
+    if cursor is not None:
+        start = segments.index(cursor[0] is not None)
+        segments = segments[start:]
+
+    rows: list = []
+    for n, dated in enumerate(segments):
+        seg_cursor = cursor if n == 0 else None
+        rows.extend(_segment(qs, dated, seg_cursor, forward)[: size + 1 - len(rows)])
+        if len(rows) > size:
+            break
+
+    more = len(rows) > size
+    rows = rows[:size]
+    if not forward:
+        rows.reverse()
+
+    has_next = more if forward else True
+    has_previous = (cursor is not None) if forward else more
+    return {
+        "items": rows,
+        "has_next": has_next and bool(rows),
+        "has_previous": has_previous and bool(rows),
+        "next_cursor": encode_cursor(rows[-1]) if rows else None,
+        "previous_cursor": encode_cursor(rows[0]) if rows else None,
+    }
+
+
+def capped_count(qs, cap: int = COUNT_CAP) -> tuple[int, bool]:
+    """Conta até `cap` linhas: (total, passou_do_limite)."""
+    n = qs.order_by()[: cap + 1].count()
+    return min(n, cap), n > cap
@@ -0,0 +1,61 @@
+# noticias/rollup.py
+from __future__ import annotations
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyNewsCount, News
+
+
+# =============================================================================
+# Rollup diário de notícias (DailyNewsCount)
+#   - Chave: (dia, veículo, tipo de mídia); dia = data local de
+#     coalesce(published_at, captured_at), o mesmo campo do gráfico.
+#   - Incremental: quem grava News acumula deltas num Counter e chama
+#     `apply_deltas` na mesma transação (UPDATE total = total + n).
+#   - `rebuild` refaz tudo a partir de News (deleções, troca de tipo do veículo).
+# =============================================================================
+
+def news_day(published_at, captured_at):
+    """Dia (data local) em que a notícia conta no dashboard."""
+    dt = published_at or captured_at
+    return timezone.localdate(dt) if dt is not None else None
+
+
+def apply_deltas(deltas: Counter) -> None:
+    """Soma `deltas[(day, vehicle_id, media_type)]` no rollup (cria as linhas que faltam)."""
+    deltas = {k: n for k, n in deltas.items() if n and k[0] is not None}
+    if not deltas:
+        return
+    with transaction.atomic():
+        DailyNewsCount.objects.bulk_create(
+            [DailyNewsCount(day=d, vehicle_id=v, media_type=m, total=0) for d, v, m in deltas],
+            ignore_conflicts=True,
+        )
+        for (d, v, m), n in deltas.items():
+            DailyNewsCount.objects.filter(day=d, vehicle_id=v, media_type=m).update(total=F("total") + n)
+
+
+def rebuild() -> int:
+    """Recalcula o rollup inteiro a partir de News. Devolve o nº de linhas."""
+    rows = (
+        News.objects
+        .annotate(day=TruncDate(Coalesce("published_at", "captured_at"), tzinfo=timezone.get_current_timezone()))
+        .values("day", "vehicle_id", "vehicle__media_type")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    with transaction.atomic():
+        DailyNewsCount.objects.all().delete()
+        objs = DailyNewsCount.objects.bulk_create(
+            [
+                DailyNewsCount(day=r["day"], vehicle_id=r["vehicle_id"], media_type=r["vehicle__media_type"], total=r["total"])
+                for r in rows.iterator(chunk_size=5000)
+            ],
+            batch_size=1000,
+        )
+    return len(objs)
@@ -0,0 +1,249 @@
+# noticias/search.py
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import Q
+
+
+# =============================================================================
+# Busca textual de notícias (título, subtítulo e conteúdo)
+#   - SQLite: tabela FTS5 externa (noticias_news_fts) sobre noticias_news,
+#     tokenizer unicode61 sem acentos; triggers mantêm o índice em dia em todo
+#     INSERT/UPDATE/DELETE (inclusive bulk_create/bulk_update da importação).
+#     O FTS5 não tem stemmer de português: a consulta usa um radical leve +
+#     prefixo ("eleições" -> eleic*), o que casa singular/plural/flexões.
+#   - PostgreSQL: coluna gerada `search_vector` (tsvector, pesos A/B/C) com a
+#     configuração `pt_unaccent` (portuguese_stem + unaccent) e índice GIN.
+#   - Outros bancos (ou SQLite sem FTS5): cai no icontains de antes.
+#   Resultados ordenados por relevância (bm25 / ts_rank_cd).
+#   O tipo de índice de cada banco (`backend`) é descoberto uma vez por alias
+#   e guardado; install/uninstall/rebuild e o post_migrate limpam o cache.
+# =============================================================================
+
+FTS_TABLE = "noticias_news_fts"
+NEWS_TABLE = "noticias_news"
+PG_CONFIG = "pt_unaccent"
+
+# pesos: título, subtítulo, conteúdo
+SQLITE_RANK = f"bm25({FTS_TABLE}, 10.0, 4.0, 1.0)"
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, subtitle, content,
+        content='{NEWS_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {NEWS_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, subtitle, content)
+        VALUES (new.id, new.title, new.subtitle, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {NEWS_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, subtitle, content)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, subtitle, content ON {NEWS_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, subtitle, content)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, subtitle, content)
+        VALUES (new.id, new.title, new.subtitle, new.content);
+    END""",
+]
+
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+PG_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{PG_CONFIG}') THEN
+            CREATE TEXT SEARCH CONFIGURATION {PG_CONFIG} (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION {PG_CONFIG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+        END IF;
+    END $$""",
+    f"""ALTER TABLE {NEWS_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('{PG_CONFIG}'::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('{PG_CONFIG}'::regconfig, coalesce(subtitle, '')), 'B') ||
+            setweight(to_tsvector('{PG_CONFIG}'::regconfig, coalesce(content, '')), 'C')
+        ) STORED""",
+    f"CREATE INDEX IF NOT EXISTS {NEWS_TABLE}_search_gin ON {NEWS_TABLE} USING GIN (search_vector)",
+]
+
+PG_UNINSTALL = [
+    f"DROP INDEX IF EXISTS {NEWS_TABLE}_search_gin",
+    f"ALTER TABLE {NEWS_TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+
+# =============================================================================
+# Instalação / manutenção (migração, post_migrate e rebuild_search_index)
+# =============================================================================
+
+_BACKENDS: dict[str, str] = {}  # alias -> 'fts5' | 'postgres' | 'like'
+
+
+def clear_backend_cache(using: str | None = None) -> None:
+    """Esquece o tipo de índice detectado (de um alias ou de todos)."""
+    if using is None:
+        _BACKENDS.clear()
+    else:
+        _BACKENDS.pop(using, None)
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cur:
+        for sql in statements:
+            cur.execute(sql)
+
+
+def sqlite_has_fts5(connection) -> bool:
+    with connection.cursor() as cur:
+        cur.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cur.fetchone()[0]:
+            return True
+        cur.execute("PRAGMA module_list")
+        return any(row[0] == "fts5" for row in cur.fetchall())
+
+
+def install(connection) -> bool:
+    """Cria (se faltar) o índice de busca do banco. Idempotente."""
+    clear_backend_cache(connection.alias)
+    if connection.vendor == "sqlite":
+        if not sqlite_has_fts5(connection):
+            return False
+        _execute(connection, SQLITE_INSTALL)
+        return True
+    if connection.vendor == "postgresql":
+        _execute(connection, PG_INSTALL)
+        return True
+    return False
+
+
+def ensure_triggers(connection) -> None:
+    """
+    SQLite: recria os triggers se a tabela FTS existir. Roda em todo
+    post_migrate, porque migrações que refazem noticias_news (ALTER no SQLite
+    = copiar a tabela) descartam os triggers junto.
+    """
+    clear_backend_cache(connection.alias)  # a migração pode ter criado/removido o índice
+    if connection.vendor == "sqlite" and backend(connection.alias) == "fts5":
+        _execute(connection, SQLITE_INSTALL[1:])
+
+
+def uninstall(connection) -> None:
+    clear_backend_cache(connection.alias)
+    if connection.vendor == "sqlite":
+        _execute(connection, SQLITE_UNINSTALL)
+    elif connection.vendor == "postgresql":
+        _execute(connection, PG_UNINSTALL)
+
+
+def rebuild(connection) -> None:
+    """Reconstrói o índice a partir de noticias_news (e recria triggers/colunas que faltarem)."""
+    if not install(connection):
+        return
+    if connection.vendor == "sqlite":
+        _execute(connection, [f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"])
+    else:
+        _execute(connection, [f"REINDEX INDEX {NEWS_TABLE}_search_gin"])
+
+
+def backend(using: str = "default") -> str:
+    """'fts5' | 'postgres' | 'like', conforme o banco e o que estiver instalado (cache por alias)."""
+    kind = _BACKENDS.get(using)
+    if kind is None:
+        kind = _BACKENDS[using] = _detect_backend(connections[using])
+    return kind
+
+
+def _detect_backend(connection) -> str:
+    if connection.vendor == "postgresql":
+        return "postgres"
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cur:
+            cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            if cur.fetchone():
+                return "fts5"
+    return "like"
+
+
+# =============================================================================
+# Consulta
+# =============================================================================
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# terminações retiradas antes do prefixo (mais longas primeiro)
+_PT_SUFFIXES = (
+    "amentos", "imentos", "amento", "imento", "mente", "acoes", "icoes", "acao", "icao",
+    "oes", "aes", "ais", "eis", "ois", "ies", "es", "as", "os", "ao", "a", "o", "e", "s",
+)
+
+
+def _fold(word: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", word.casefold()) if not unicodedata.combining(c))
+
+
+def _stem(word: str) -> str:
+    """Radical leve para português (sem acento): 'eleicoes' -> 'eleic'."""
+    for suf in _PT_SUFFIXES:
+        if word.endswith(suf) and len(word) - len(suf) >= 4:
+            return word[: -len(suf)]
+    return word
+
+
+def fts5_query(text: str) -> str:
+    """Converte a busca do usuário numa expressão MATCH segura (termos em AND, com prefixo)."""
+    terms = []
+    for word in _WORD_RE.findall(text or ""):
+        w = _fold(word)
+        if len(w) >= 3:
+            terms.append(f'"{_stem(w)}"*')
+        elif w:
+            terms.append(f'"{w}"')
+    return " ".join(terms)
+
+
+def search_news(qs, text: str, ranked: bool = True, using: str = "default"):
+    """
+    Filtra `qs` (queryset de News) pela busca `text`. Com `ranked`, ordena por
+    relevância e anota `search_rank` (menor = melhor no SQLite; maior no PG).
+    """
+    text = (text or "").strip()
+    if not text:
+        return qs
+    kind = backend(using)
+
+    if kind == "fts5":
+        match = fts5_query(text)
+        if not match:
+            return qs.none()
+        qs = qs.extra(
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = {NEWS_TABLE}.id", f"{FTS_TABLE} MATCH %s"],
+            params=[match],
+        )
+        if ranked:
+            qs = qs.extra(select={"search_rank": SQLITE_RANK}, order_by=["search_rank"])
+        return qs
+
+    if kind == "postgres":
+        tsquery = f"websearch_to_tsquery('{PG_CONFIG}', %s)"
+        qs = qs.extra(where=[f"{NEWS_TABLE}.search_vector @@ {tsquery}"], params=[text])
+        if ranked:
+            qs = qs.extra(
+                select={"search_rank": f"ts_rank_cd({NEWS_TABLE}.search_vector, {tsquery})"},
+                select_params=[text],
+                order_by=["-search_rank"],
+            )
+        return qs
+
+    return qs.filter(Q(title__icontains=text) | Q(subtitle__icontains=text))
@@ -1,3 +1,211 @@
+from datetime import timedelta
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from veiculos.models import Section, Vehicle
+from . import search
+from .pagination import decode_cursor, encode_cursor, keyset_page
+from .models import News
+
+BIG = "x" * 100_000  # conteúdo "pesado" de cada notícia
+
+
+class NewsViewsQueryTests(TestCase):
+    """Número de queries constante e colunas pesadas fora das listagens."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        cls.section = Section.objects.create(vehicle=cls.vehicle, name="Política")
+
+    def _add_news(self, n, start=0):
+        News.objects.bulk_create([
+            News(vehicle=self.vehicle, section=self.section, url=f"https://v.example/{i}",
+                 title=f"Notícia {i}", subtitle="sub", content=BIG)
+            for i in range(start, start + n)
+        ])
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp, ctx.captured_queries
+
+    def test_list_constant_queries(self):
+        self._add_news(5)
+        _, small = self._get(reverse("news:news-list"))
+        self._add_news(60, start=5)
+        _, large = self._get(reverse("news:news-list"))
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), 3)
+
+    def test_list_does_not_load_content(self):
+        self._add_news(30)
+        for url in (reverse("news:news-list"), reverse("news:news-list") + "?page=2"):
+            resp, queries = self._get(url)
+            for q in queries:
+                self.assertNotIn('"noticias_news"."content"', q["sql"])
+            self.assertLess(len(resp.content), len(BIG))  # 20 linhas, nenhum texto completo
+
+    def test_keyset_next_page(self):
+        self._add_news(30)
+        resp, _ = self._get(reverse("news:news-list"))
+        cursor = resp.context["keyset"]["next_cursor"]
+        resp, queries = self._get(reverse("news:news-list") + f"?after={cursor}")
+        self.assertEqual(len(resp.context["items"]), 10)
+        self.assertLessEqual(len(queries), 3)
+
+    def test_detail(self):
+        self._add_news(1)
+        news = News.objects.get()
+        resp, queries = self._get(reverse("news:news-detail", args=[news.pk]))
+        self.assertLessEqual(len(queries), 1)
+        self.assertContains(resp, "Notícia 0")
+
+
+class NewsSearchTests(TestCase):
+    """Busca FTS5: sem acento, flexões pelo radical e índice em dia via triggers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+
+    def setUp(self):
+        if search.backend() != "fts5":
+            self.skipTest("SQLite sem FTS5")
+
+    def _add(self, title, content="texto", **kw):
+        return News.objects.create(vehicle=self.vehicle, url=f"https://v.example/{title}", title=title,
+                                   content=content, **kw)
+
+    def _found(self, text):
+        return set(search.search_news(News.objects.all(), text).values_list("title", flat=True))
+
+    def _indexed(self, text):
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT rowid FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH %s",
+                        [search.fts5_query(text)])
+            return {row[0] for row in cur.fetchall()}
+
+    def test_fts5_query(self):
+        self.assertEqual(search.fts5_query("Eleições"), '"eleic"*')
+        self.assertEqual(search.fts5_query('a "x" OR b'), '"a" "x" "or" "b"')  # sem operadores do usuário
+        self.assertEqual(search.fts5_query("!!"), "")
+
+    def test_accents_and_stemming(self):
+        self._add("Eleições municipais")
+        self._add("Resultado da eleição", content="apuração")
+        self._add("Esportes")
+        self.assertEqual(self._found("eleicoes"), {"Eleições municipais", "Resultado da eleição"})
+        self.assertEqual(self._found("ELEIÇÃO"), {"Eleições municipais", "Resultado da eleição"})
+        self.assertEqual(self._found("apuracao eleicao"), {"Resultado da eleição"})  # termos em AND
+        self.assertEqual(self._found("futebol"), set())
+
+    def test_rank_prefers_title(self):
+        self._add("Outra coisa", content="vacina " * 3)
+        self._add("Vacina aprovada")
+        self.assertEqual(list(search.search_news(News.objects.all(), "vacinas").values_list("title", flat=True))[0],
+                         "Vacina aprovada")
+
+    def test_triggers_follow_update_and_delete(self):
+        news = self._add("Chuva forte")
+        self.assertEqual(self._indexed("chuva"), {news.pk})
+
+        news.title = "Seca prolongada"
+        news.save()
+        self.assertEqual(self._indexed("chuva"), set())
+        self.assertEqual(self._found("seca"), {"Seca prolongada"})
+
+        News.objects.filter(pk=news.pk).update(content="incêndio")  # UPDATE em massa também
+        self.assertEqual(self._indexed("incendio"), {news.pk})
+
+        news.delete()
+        self.assertEqual(self._indexed("seca"), set())
+        self.assertEqual(self._indexed("incendio"), set())
+
+    def test_backend_cached_per_alias(self):
+        self._add("Chuva forte")
+        search.backend()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._found("chuva"), {"Chuva forte"})
+        self.assertEqual(len(ctx.captured_queries), 1)  # sem a consulta ao sqlite_master
+        self.assertNotIn("sqlite_master", ctx.captured_queries[0]["sql"])
+
+        search._BACKENDS["default"] = "like"  # ex.: detectado antes de a migração criar o índice
+        search.install(connection)  # install/uninstall/rebuild esquecem o detectado
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(search.backend(), "fts5")
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_bulk_create_indexed(self):
+        News.objects.bulk_create([
+            News(vehicle=self.vehicle, url=f"https://v.example/b{i}", title=f"Inflação {i}", content="x")
+            for i in range(3)
+        ])
+        self.assertEqual(len(self._found("inflacao")), 3)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor: ordem estável entre páginas, inclusive na passagem datadas -> sem data."""
+
+    @classmethod
+    def setUpTestData(cls):
+        vehicle = Vehicle.objects.create(name="Veículo", media_type="site", url="https://v.example/")
+        day = timezone.now().replace(microsecond=0)
+        News.objects.bulk_create([
+            # published_at repetido de 2 em 2: o desempate é captured_at/id
+            News(vehicle=vehicle, url=f"https://v.example/d{i}", title=f"d{i}", content="x",
+                 published_at=day - timedelta(hours=i // 2))
+            for i in range(7)
+        ] + [
+            News(vehicle=vehicle, url=f"https://v.example/u{i}", title=f"u{i}", content="x")
+            for i in range(4)
+        ])
+        rows = list(News.objects.all())
+        dated = sorted((n for n in rows if n.published_at), key=lambda n: (n.published_at, n.captured_at, n.pk))
+        undated = sorted((n for n in rows if not n.published_at), key=lambda n: (n.captured_at, n.pk))
+        cls.expected = [n.pk for n in reversed(dated)] + [n.pk for n in reversed(undated)]
+
+    def _pages(self, size, before=None):
+        """Todas as páginas a partir da primeira (ou de `before`, voltando)."""
+        pages = [keyset_page(News.objects.all(), size=size, before=before)]
+        while True:
+            page = pages[-1]
+            if before is not None:
+                if not page["has_previous"]:
+                    return pages
+                kw = {"before": page["previous_cursor"]}
+            else:
+                if not page["has_next"]:
+                    return pages
+                kw = {"after": page["next_cursor"]}
+            pages.append(keyset_page(News.objects.all(), size=size, **kw))
+
+    def test_forward_across_segments(self):
+        for size in (1, 3, 7, 11, 20):
+            pages = self._pages(size)
+            ids = [n.pk for p in pages for n in p["items"]]
+            self.assertEqual(ids, self.expected, f"size={size}")
+            self.assertFalse(pages[0]["has_previous"])
+            self.assertTrue(all(p["has_previous"] for p in pages[1:]))
+
+    def test_backward_matches_forward(self):
+        forward = self._pages(3)
+        last = forward[-1]
+        backward = self._pages(3, before=last["previous_cursor"])
+        ids = [n.pk for p in reversed(backward) for n in p["items"]] + [n.pk for n in last["items"]]
+        self.assertEqual(ids, self.expected)
+        self.assertTrue(all(p["has_next"] for p in backward))
+        self.assertFalse(backward[-1]["has_previous"])
+
+    def test_cursor_roundtrip(self):
+        undated = News.objects.get(pk=self.expected[-1])
+        self.assertEqual(decode_cursor(encode_cursor(undated)), (None, undated.captured_at, undated.pk))
+        self.assertIsNone(decode_cursor("lixo"))
+        page = keyset_page(News.objects.all(), after="lixo", size=3)  # cursor inválido = primeira página
+        self.assertEqual([n.pk for n in page["items"]], self.expected[:3])
 
-# Create your tests here.
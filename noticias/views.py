@@ -1,5 +1,7 @@
 from django.views.generic import ListView, DetailView
 from .models import News
+from .pagination import capped_count, keyset_page
+from .search import search_news
 
 class NewsListView(ListView):
     model = News
@@ -7,17 +9,56 @@ class NewsListView(ListView):
     context_object_name = "items"
     paginate_by = 20
 
+    # colunas da listagem: sem `content` (o texto completo só no detalhe)
+    list_fields = (
+        "id", "url", "title", "subtitle", "published_at", "captured_at",
+        "vehicle__id", "vehicle__name", "section__id", "section__name",
+    )
+
+    def keyset_mode(self) -> bool:
+        """
+        Cursor (?after= / ?before=) por padrão. ?page= mantém a paginação por
+        OFFSET antiga, e a busca (ordenada por relevância) também usa OFFSET.
+        """
+        GET = self.request.GET
+        return "page" not in GET and not GET.get("q")
+
+    def get_paginate_by(self, queryset):
+        return None if self.keyset_mode() else self.paginate_by
+
     def get_queryset(self):
-        qs = super().get_queryset().select_related("vehicle", "section")
+        qs = super().get_queryset().select_related("vehicle", "section").only(*self.list_fields)
         v = self.request.GET.get("vehicle")
         if v:
             qs = qs.filter(vehicle_id=v)
         q = self.request.GET.get("q")
         if q:
-            qs = qs.filter(title__icontains=q)
+            qs = search_news(qs, q)  # busca textual com ranking (FTS5 / tsvector)
         return qs
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        if self.keyset_mode():
+            page = keyset_page(
+                self.object_list,
+                after=self.request.GET.get("after"),
+                before=self.request.GET.get("before"),
+                size=self.paginate_by,
+            )
+            total, more = capped_count(self.object_list)
+            ctx.update({
+                "items": page["items"],
+                "object_list": page["items"],
+                "keyset": page,
+                "total_capped": total,
+                "total_more": more,
+            })
+        return ctx
+
 class NewsDetailView(DetailView):
     model = News
     template_name = "news/news_detail.html"
-    context_object_name = "item"
\ No newline at end of file
+    context_object_name = "item"
+
+    def get_queryset(self):
+        return super().get_queryset().select_related("vehicle", "section")
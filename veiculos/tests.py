@@ -1,3 +1,55 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from importacoes.models import ImportConfig
+from noticias.models import News
+from .models import Vehicle
+
+BIG = "x" * 100_000
+
+
+class VehicleViewsQueryTests(TestCase):
+    """Número de queries constante e sem carregar o conteúdo das notícias recentes."""
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp, ctx.captured_queries
+
+    def _vehicle(self, i, news=0):
+        v = Vehicle.objects.create(name=f"Veículo {i}", media_type="site", url=f"https://v{i}.example/")
+        ImportConfig.objects.create(
+            vehicle=v, name="padrão", listing_link_xpath="//a/@href",
+            article_title_xpath="//h1", article_content_xpath="//p",
+        )
+        News.objects.bulk_create([
+            News(vehicle=v, url=f"https://v{i}.example/{n}", title=f"Notícia {n}", content=BIG)
+            for n in range(news)
+        ])
+        return v
+
+    def test_list_constant_queries(self):
+        self._vehicle(0)
+        _, small = self._get(reverse("vehicles:vehicle-list"))
+        for i in range(1, 30):
+            self._vehicle(i)
+        _, large = self._get(reverse("vehicles:vehicle-list"))
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), 2)
+
+    def test_detail_recent_news_without_content(self):
+        v = self._vehicle(0, news=10)
+        resp, queries = self._get(reverse("vehicles:vehicle-detail", args=[v.pk]))
+        self.assertLessEqual(len(queries), 6)
+        for q in queries:
+            self.assertNotIn('"noticias_news"."content"', q["sql"])
+        self.assertLess(len(resp.content), len(BIG))
+        self.assertEqual(len(resp.context["recent_news"]), 5)
+
+    def test_delete_confirm(self):
+        v = self._vehicle(0, news=3)
+        _, queries = self._get(reverse("vehicles:vehicle-delete", args=[v.pk]))
+        self.assertLessEqual(len(queries), 4)
@@ -48,9 +48,11 @@ class VehicleDetailView(DetailView):
         }
         # listas compactas
         ctx["recent_imports"] = (ImportConfig.objects
-                                 .filter(vehicle=v).order_by("-last_run_at")[:5])
+                                 .filter(vehicle=v).order_by("-last_run_at")
+                                 .only("id", "name", "status", "last_run_at")[:5])
         ctx["recent_news"] = (News.objects
-                              .filter(vehicle=v).order_by("-captured_at")[:5])
+                              .filter(vehicle=v).order_by("-captured_at")
+                              .only("id", "url", "title", "published_at", "captured_at")[:5])
         return ctx
 
 class VehicleCreateView(CreateView):